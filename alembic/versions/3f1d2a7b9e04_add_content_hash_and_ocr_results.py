@@ -0,0 +1,45 @@
+"""Add content hash to documents and OCR results table
+
+Revision ID: 3f1d2a7b9e04
+Revises: cd0c2c992f4c
+Create Date: 2026-10-18 14:02:17.338571
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1d2a7b9e04'
+down_revision: Union[str, None] = 'cd0c2c992f4c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('documents', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.create_index(
+        op.f('ix_documents_content_hash'),
+        'documents',
+        ['content_hash'],
+        unique=False
+    )
+
+    op.create_table(
+        'ocr_results',
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('model', sa.String(length=255), nullable=False),
+        sa.Column('markdown', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('content_hash', 'model')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('ocr_results')
+    op.drop_index(op.f('ix_documents_content_hash'), table_name='documents')
+    op.drop_column('documents', 'content_hash')
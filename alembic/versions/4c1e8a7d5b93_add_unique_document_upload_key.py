@@ -0,0 +1,32 @@
+"""Add unique document upload key
+
+Revision ID: 4c1e8a7d5b93
+Revises: 7d2e9f4a1c68
+Create Date: 2026-10-19 10:42:18.316054
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4c1e8a7d5b93'
+down_revision: Union[str, None] = '7d2e9f4a1c68'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_documents_chatbot_file_url',
+        'documents',
+        ['chatbot_id', 'file_url'],
+        unique=True
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_documents_chatbot_file_url', table_name='documents')
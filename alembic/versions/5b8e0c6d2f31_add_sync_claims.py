@@ -0,0 +1,38 @@
+"""Add sync claims and pending sync indexes
+
+Revision ID: 5b8e0c6d2f31
+Revises: 3f1d2a7b9e04
+Create Date: 2026-10-18 19:48:05.114290
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b8e0c6d2f31'
+down_revision: Union[str, None] = '3f1d2a7b9e04'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in ('documents', 'dialogues'):
+        op.add_column(table, sa.Column('claimed_at', sa.DateTime(timezone=True), nullable=True))
+        op.create_index(
+            f'ix_{table}_pending_sync',
+            table,
+            ['id'],
+            unique=False,
+            postgresql_where=sa.text("sync_status IN ('NA', 'FAILED')")
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ('dialogues', 'documents'):
+        op.drop_index(f'ix_{table}_pending_sync', table_name=table)
+        op.drop_column(table, 'claimed_at')
@@ -0,0 +1,41 @@
+"""Add chatbot listing indexes
+
+Revision ID: 7d2e9f4a1c68
+Revises: 9a4c7e1b3d52
+Create Date: 2026-10-18 22:31:47.520913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d2e9f4a1c68'
+down_revision: Union[str, None] = '9a4c7e1b3d52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in ('documents', 'dialogues'):
+        op.create_index(
+            f'ix_{table}_chatbot_created',
+            table,
+            ['chatbot_id', 'created_at', 'id'],
+            unique=False
+        )
+        op.create_index(
+            f'ix_{table}_chatbot_status_created',
+            table,
+            ['chatbot_id', 'sync_status', 'created_at', 'id'],
+            unique=False
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ('dialogues', 'documents'):
+        op.drop_index(f'ix_{table}_chatbot_status_created', table_name=table)
+        op.drop_index(f'ix_{table}_chatbot_created', table_name=table)
@@ -0,0 +1,46 @@
+"""Notify sync listeners when documents or dialogues need syncing
+
+Revision ID: 9a4c7e1b3d52
+Revises: 5b8e0c6d2f31
+Create Date: 2026-10-18 20:11:42.507316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a4c7e1b3d52'
+down_revision: Union[str, None] = '5b8e0c6d2f31'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The payload is the table name; listeners claim the rows themselves.
+    # Claiming sets claimed_at, so it does not notify again.
+    op.execute("""
+        CREATE FUNCTION notify_sync_pending() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('sync_pending', TG_TABLE_NAME);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    for table in ('documents', 'dialogues'):
+        op.execute(f"""
+            CREATE TRIGGER {table}_sync_pending
+            AFTER INSERT OR UPDATE ON {table}
+            FOR EACH ROW
+            WHEN (NEW.sync_status = 'NA' AND NEW.claimed_at IS NULL)
+            EXECUTE FUNCTION notify_sync_pending()
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ('dialogues', 'documents'):
+        op.execute(f'DROP TRIGGER IF EXISTS {table}_sync_pending ON {table}')
+    op.execute('DROP FUNCTION IF EXISTS notify_sync_pending()')
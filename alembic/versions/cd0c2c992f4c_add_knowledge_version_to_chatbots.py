@@ -0,0 +1,36 @@
+"""Add knowledge version to chatbots
+
+Revision ID: cd0c2c992f4c
+Revises: 8c51fcae49ce
+Create Date: 2026-10-18 10:12:41.508113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'cd0c2c992f4c'
+down_revision: Union[str, None] = '8c51fcae49ce'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'chatbots',
+        sa.Column(
+            'knowledge_version',
+            sa.Integer(),
+            nullable=False,
+            server_default='0'
+        )
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('chatbots', 'knowledge_version')
@@ -1,13 +1,22 @@
 from typing import AsyncGenerator
+from uuid import UUID
+import logging
 from llama_index.core.agent.workflow import AgentWorkflow
 from llama_index.core.workflow import Context
 from llama_index.llms.openai import OpenAI
 from llama_index.core.agent.workflow import AgentStream
 from llama_index.core.workflow.handler import WorkflowHandler
 from llama_index.core.memory import ChatMemoryBuffer
+from llama_index.core.llms import ChatMessage, MessageRole
 from llama_index.storage.chat_store.postgres import PostgresChatStore
 import os
 from app.agents.tools import search_info_from_documents
+from app.schemas.chatbot_settings import ChatbotSettings
+from app.services.rag.answer_cache import answer_cache
+from app.services.rag.dialogue_matcher import dialogue_matcher
+from app.services.rag.embeddings import EmbeddingsService
+
+logger = logging.getLogger(__name__)
 
 DB_URL = os.getenv('DATABASE_URL')
 if not DB_URL:
@@ -17,36 +26,153 @@ if not DB_URL:
 class QaAgentWorkflow:
 
     chatbot_id: str
+    chatbot_settings: ChatbotSettings | None
+    knowledge_version: int | None
 
-    def __init__(self, chatbot_id: str):
+    def __init__(
+        self,
+        chatbot_id: str,
+        chatbot_settings: ChatbotSettings | None = None,
+        knowledge_version: int | None = None
+    ):
         self.chatbot_id = chatbot_id
+        self.chatbot_settings = chatbot_settings
+        self.knowledge_version = knowledge_version
 
     async def arespond(self, question: str, thread_id: str) -> AsyncGenerator[str, None]:
+        chat_store = PostgresChatStore.from_uri(DB_URL)
+        memory = ChatMemoryBuffer.from_defaults(
+            chat_store=chat_store,
+            chat_store_key=thread_id,
+        )
+        chat_history = memory.get_all()
+
+        # dialogues are curated answers, so they take precedence on every turn
+        dialogue_answer, question_embedding = await self._match_dialogue(question)
+        if dialogue_answer is not None:
+            memory.put(ChatMessage(role=MessageRole.USER, content=question))
+            memory.put(ChatMessage(role=MessageRole.ASSISTANT, content=dialogue_answer))
+            yield dialogue_answer
+            return
+
+        cache_embedding = None
+        if self._answer_cache_applies(chat_history):
+            if question_embedding is None:
+                question_embedding = await self._embed_question(question)
+            cache_embedding = question_embedding
+        if cache_embedding is not None:
+            cached_answer = answer_cache.lookup(
+                UUID(self.chatbot_id),
+                self.knowledge_version,
+                cache_embedding,
+                self.chatbot_settings.answer_cache.similarity_threshold,
+            )
+            if cached_answer is not None:
+                memory.put(ChatMessage(role=MessageRole.USER, content=question))
+                memory.put(ChatMessage(role=MessageRole.ASSISTANT, content=cached_answer))
+                yield cached_answer
+                return
+
+        answer = ''
+        async for answer in self._agenerate(question, question_embedding, memory, chat_history):
+            yield answer
+
+        if cache_embedding is not None and answer:
+            answer_cache.store(
+                UUID(self.chatbot_id),
+                self.knowledge_version,
+                question,
+                cache_embedding,
+                answer,
+            )
+
+    async def _agenerate(
+        self,
+        question: str,
+        question_embedding: list[float] | None,
+        memory: ChatMemoryBuffer,
+        chat_history: list[ChatMessage],
+    ) -> AsyncGenerator[str, None]:
+        """Stream the answer to the question, yielding the answer so far. Records the turn in `memory`."""
         llm = OpenAI(model='gpt-4o-mini')
 
+        initial_state = {'chatbot_id': self.chatbot_id}
+        if self.chatbot_settings is not None:
+            # lets the search tool reuse the cached index without looking up the chatbot again
+            initial_state['chatbot_settings'] = self.chatbot_settings.model_dump()
+
         workflow = AgentWorkflow.from_tools_or_functions(
             [search_info_from_documents],
             llm=llm,
             system_prompt=(
                 "You are a helpful assistant that helps answer questions from using internal knowledge base. Always call the search_info_from_documents tool to answer questions. If the answer is not found in the knowledge base, just say you don't have enough information to answer the question."
             ),
-            initial_state={'chatbot_id': self.chatbot_id}
+            initial_state=initial_state
         )
 
         ctx = Context(workflow)
-        chat_store = PostgresChatStore.from_uri(DB_URL)
-        memory = ChatMemoryBuffer.from_defaults(
-            chat_store=chat_store,
-            chat_store_key=thread_id,
-        )
         handler = workflow.run(
             # user_msg='How can dentist help with snoring? What causes snoring? How is sleep apnea diagnosed?',
             user_msg=question,
             ctx=ctx,
             memory=memory,
-            chat_history=memory.get_all()
+            chat_history=chat_history
         )
 
         async for event in handler.stream_events():
             if isinstance(event, AgentStream):
                 yield event.response
+
+    async def _match_dialogue(self, question: str) -> tuple[str | None, list[float] | None]:
+        """
+        Look for a dialogue answering the question.
+
+        Returns the dialogue answer, if any, and the question embedding when
+        one was computed so that the answer cache can reuse it.
+        """
+        if self.chatbot_settings is None or not self.chatbot_settings.dialogue_matching.enabled:
+            return None, None
+
+        em_settings = self.chatbot_settings.embedding_model
+        try:
+            index = await dialogue_matcher.get_index(
+                UUID(self.chatbot_id),
+                EmbeddingsService.get_embedding_model(em_settings),
+                (em_settings.name, em_settings.dimensions),
+            )
+        except Exception as e:
+            logger.warning(f'skipping dialogue matching, failed to load dialogues: {e}')
+            return None, None
+
+        answer = index.match_text(question)
+        if answer is not None:
+            dialogue_matcher.record(answer, exact=True)
+            return answer, None
+        if not len(index):
+            return None, None
+
+        question_embedding = await self._embed_question(question)
+        if question_embedding is not None:
+            answer = index.match_embedding(
+                question_embedding,
+                self.chatbot_settings.dialogue_matching.similarity_threshold,
+            )
+        dialogue_matcher.record(answer, exact=False)
+        return answer, question_embedding
+
+    def _answer_cache_applies(self, chat_history: list[ChatMessage]) -> bool:
+        if self.chatbot_settings is None or self.knowledge_version is None:
+            return False
+        if not self.chatbot_settings.answer_cache.enabled:
+            return False
+        # follow-up questions depend on the conversation, only first turns are cached
+        return not chat_history
+
+    async def _embed_question(self, question: str) -> list[float] | None:
+        try:
+            embedding_model = EmbeddingsService.get_embedding_model(self.chatbot_settings.embedding_model)
+            # the same embedding is served from the embedding cache when the tool retrieves
+            return await embedding_model.aget_query_embedding(question)
+        except Exception as e:
+            logger.warning(f'failed to embed question: {e}')
+            return None
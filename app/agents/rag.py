@@ -0,0 +1,76 @@
+from typing import AsyncGenerator
+from uuid import UUID
+import logging
+from llama_index.core.llms import ChatMessage, MessageRole
+from llama_index.core.memory import ChatMemoryBuffer
+from llama_index.core.schema import NodeWithScore, QueryBundle
+from llama_index.llms.openai import OpenAI
+from app.agents.qa import QaAgentWorkflow
+from app.schemas.chatbot_settings import ChatbotSettings
+from app.services.rag.vsi import VsiService
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = (
+    "You are a helpful assistant that answers questions using the internal knowledge base. "
+    "Answer only from the context below. If the answer is not in the context, just say you "
+    "don't have enough information to answer the question.\n\n"
+    "Context:\n{context}"
+)
+
+
+class RagWorkflow(QaAgentWorkflow):
+    """
+    Single-pass retrieval-augmented answering.
+
+    Retrieves once and streams one LLM completion over the retrieved chunks
+    and the chat history. Compared to the agent, this skips the tool-planning
+    call and the query engine's own synthesis call. Dialogue matching and the
+    answer cache apply as for the agent.
+    """
+
+    chatbot_settings: ChatbotSettings
+
+    def __init__(
+        self,
+        chatbot_id: str,
+        chatbot_settings: ChatbotSettings,
+        knowledge_version: int | None = None
+    ):
+        super().__init__(chatbot_id, chatbot_settings, knowledge_version)
+
+    async def _agenerate(
+        self,
+        question: str,
+        question_embedding: list[float] | None,
+        memory: ChatMemoryBuffer,
+        chat_history: list[ChatMessage],
+    ) -> AsyncGenerator[str, None]:
+        vsi = await VsiService.aget_vsi(UUID(self.chatbot_id), self.chatbot_settings)
+        retriever = vsi.as_retriever(**self.chatbot_settings.retrieval.retriever_kwargs())
+        # reuse the embedding computed for dialogue matching or the answer cache
+        nodes = await retriever.aretrieve(QueryBundle(query_str=question, embedding=question_embedding))
+        logger.debug(f'retrieved {len(nodes)} chunks for chatbot {self.chatbot_id}')
+
+        messages = [
+            ChatMessage(role=MessageRole.SYSTEM, content=SYSTEM_PROMPT.format(context=_format_context(nodes))),
+            # bounded by the memory's token limit, unlike the full history
+            *memory.get(),
+            ChatMessage(role=MessageRole.USER, content=question),
+        ]
+
+        # llm should be obtained from chatbot settings but j hard code it for now
+        llm = OpenAI(model='gpt-4o-mini')
+        answer = ''
+        async for response in await llm.astream_chat(messages):
+            answer = response.message.content or ''
+            yield answer
+
+        memory.put(ChatMessage(role=MessageRole.USER, content=question))
+        memory.put(ChatMessage(role=MessageRole.ASSISTANT, content=answer))
+
+
+def _format_context(nodes: list[NodeWithScore]) -> str:
+    if not nodes:
+        return '(no matching documents)'
+    return '\n\n---\n\n'.join(node.node.get_content() for node in nodes)
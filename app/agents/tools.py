@@ -2,6 +2,7 @@ from uuid import UUID
 from llama_index.core.workflow import Context
 from llama_index.llms.openai import OpenAI
 from app.services.rag.vsi import VsiService
+from app.schemas.chatbot_settings import ChatbotSettings
 
 
 async def search_info_from_documents(ctx: Context, question: str) -> str:
@@ -13,13 +14,17 @@ async def search_info_from_documents(ctx: Context, question: str) -> str:
         state = await ctx.get("state")
 
         chatbot_id = state['chatbot_id']
+        chatbot_settings = state.get('chatbot_settings')
+        if chatbot_settings is not None:
+            chatbot_settings = ChatbotSettings.model_validate(chatbot_settings)
 
-        vsi = VsiService.get_vsi(UUID(chatbot_id))
+        vsi = await VsiService.aget_vsi(UUID(chatbot_id), chatbot_settings)
 
         # llm should be obtained from chatbot settings but j hard code it for now
         llm = OpenAI(model="gpt-4o-mini")
 
-        query_engine = vsi.as_query_engine(llm=llm)
+        retriever_kwargs = chatbot_settings.retrieval.retriever_kwargs() if chatbot_settings else {}
+        query_engine = vsi.as_query_engine(llm=llm, **retriever_kwargs)
 
         response = await query_engine.aquery(question)
         return response.response
@@ -49,7 +49,7 @@ async def get_chatbot_owner(
     chatbot_id: UUID,
     user: Annotated[User, Depends(get_authenticated_user)]
 ) -> User:
-    chatbot = await ChatbotService.afind_by_id(chatbot_id)
+    chatbot = await ChatbotService.aget_cached(chatbot_id)
     if not chatbot:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -0,0 +1,96 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Generic, Hashable, TypeVar
+
+K = TypeVar('K', bound=Hashable)
+V = TypeVar('V')
+
+_MISSING = object()
+
+
+class TTLCache(Generic[K, V]):
+    """
+    Thread-safe, size-bounded LRU cache with per-entry time-to-live.
+
+    Entries are evicted when they are older than `ttl` seconds or when the
+    cache grows beyond `maxsize` (least recently used first).
+    """
+
+    def __init__(self, maxsize: int, ttl: float | None = None) -> None:
+        if maxsize <= 0:
+            raise ValueError('maxsize must be greater than 0')
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    def __contains__(self, key: K) -> bool:
+        return self.get(key, _MISSING, record=False) is not _MISSING
+
+    def get(self, key: K, default: Any = None, record: bool = True) -> V | Any:
+        """Return the cached value for `key`, or `default` if absent or expired."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and self._expired(item[0]):
+                del self._data[key]
+                self.evictions += 1
+                item = None
+            if item is None:
+                if record:
+                    self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            if record:
+                self.hits += 1
+            return item[1]
+
+    def set(self, key: K, value: V) -> None:
+        """Insert or replace `key`, evicting the least recently used entries if full."""
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (time.monotonic(), value)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: K, default: Any = None) -> V | Any:
+        """Remove `key` from the cache and return its value."""
+        with self._lock:
+            item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def invalidate_where(self, predicate: Callable[[K], bool]) -> int:
+        """Remove every entry whose key matches `predicate`. Returns the count removed."""
+        with self._lock:
+            keys = [k for k in self._data if predicate(k)]
+            for k in keys:
+                del self._data[k]
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': (self.hits / lookups) if lookups else 0.0,
+            }
+
+    def _expired(self, inserted_at: float) -> bool:
+        return self.ttl is not None and time.monotonic() - inserted_at > self.ttl
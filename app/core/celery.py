@@ -29,15 +29,20 @@ celery_app.conf.update(
     }
 )
 
+# New and edited rows are picked up right away by app.tasks.sync_listener;
+# the scans only catch what it missed (e.g. while it was down) and retry
+# failed syncs
+SYNC_SCAN_INTERVAL_SECONDS = float(os.getenv('SYNC_SCAN_INTERVAL_SECONDS', '900'))
+
 # Set up Celery Beat schedule for recurring tasks
 celery_app.conf.beat_schedule = {
     'find-documents-to-sync': {
         'task': 'app.tasks.documents.process_document_queue',
-        'schedule': 60.0,  # Run every 60 seconds
+        'schedule': SYNC_SCAN_INTERVAL_SECONDS,
     },
     'find-dialogues-to-sync': {
         'task': 'app.tasks.dialogues.process_dialogue_queue',
-        'schedule': 60.0,  # Run every 60 seconds
+        'schedule': SYNC_SCAN_INTERVAL_SECONDS,
     },
 }
 
@@ -0,0 +1,228 @@
+"""
+Cache invalidation across processes.
+
+Caches live in each API and sync worker process, so a write handled by one
+process leaves the others serving stale entries until their TTL runs out.
+Services publish the topic and key of what they changed after committing,
+and every process drops the matching entries from the caches subscribed to
+that topic.
+
+CACHE_INVALIDATION_BACKEND selects the transport:
+
+- local: only the publishing process, for single-process runs and tests
+- postgres: NOTIFY / LISTEN on the application database
+- redis: pub/sub on CACHE_INVALIDATION_REDIS_URL (or REDIS_URL)
+"""
+import asyncio
+import json
+import logging
+import os
+import uuid
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from contextlib import suppress
+from typing import Callable
+
+import asyncpg
+import redis
+import redis.asyncio as aioredis
+from sqlalchemy import func, select
+
+from app.db.client import DATABASE_URL, asyncpg_dsn, engine, sync_engine
+
+logger = logging.getLogger(__name__)
+
+# local, postgres or redis
+CACHE_INVALIDATION_BACKEND = os.getenv('CACHE_INVALIDATION_BACKEND', 'local')
+CACHE_INVALIDATION_CHANNEL = os.getenv('CACHE_INVALIDATION_CHANNEL', 'cache_invalidation')
+CACHE_INVALIDATION_REDIS_URL = os.getenv('CACHE_INVALIDATION_REDIS_URL') or os.getenv('REDIS_URL')
+CACHE_INVALIDATION_RECONNECT_SECONDS = float(os.getenv('CACHE_INVALIDATION_RECONNECT_SECONDS', '5'))
+
+# Topics, both keyed by chatbot id
+# the chatbot row itself: settings, metadata or knowledge version
+CHATBOT = 'chatbot'
+# the chatbot's dialogues
+DIALOGUES = 'dialogues'
+
+# Called with the invalidated key, or None to drop every entry of the topic
+Handler = Callable[[str | None], None]
+
+
+class LocalInvalidationBus:
+    """Invalidates the caches of the publishing process only."""
+
+    def __init__(self) -> None:
+        # messages of this process come back from the transport, skip them
+        self.origin = uuid.uuid4().hex
+        self._handlers: dict[str, list[Handler]] = defaultdict(list)
+
+    def subscribe(self, topic: str, handler: Handler) -> None:
+        self._handlers[topic].append(handler)
+
+    def publish(self, topic: str, key: object) -> None:
+        """Invalidate `key` of `topic` in every process, from synchronous code."""
+        self._dispatch(topic, str(key))
+        try:
+            self._send(self._encode(topic, key))
+        except Exception as e:
+            # the other processes catch up when their entries expire
+            logger.warning(f'failed to publish invalidation of {topic} {key}: {e}')
+
+    async def apublish(self, topic: str, key: object) -> None:
+        """Invalidate `key` of `topic` in every process."""
+        self._dispatch(topic, str(key))
+        try:
+            await self._asend(self._encode(topic, key))
+        except Exception as e:
+            logger.warning(f'failed to publish invalidation of {topic} {key}: {e}')
+
+    async def start(self) -> None:
+        """Start receiving the invalidations published by other processes."""
+
+    async def stop(self) -> None:
+        pass
+
+    def _send(self, message: str) -> None:
+        pass
+
+    async def _asend(self, message: str) -> None:
+        pass
+
+    def _encode(self, topic: str, key: object) -> str:
+        return json.dumps({'origin': self.origin, 'topic': topic, 'key': str(key)})
+
+    def _receive(self, message: str | bytes) -> None:
+        try:
+            data = json.loads(message)
+        except ValueError:
+            logger.warning(f'ignoring malformed invalidation message {message!r}')
+            return
+        if data.get('origin') != self.origin:
+            self._dispatch(data.get('topic'), data.get('key'))
+
+    def _dispatch(self, topic: str, key: str | None) -> None:
+        for handler in self._handlers.get(topic, ()):
+            try:
+                handler(key)
+            except Exception as e:
+                logger.exception(f'failed to invalidate {topic} {key}: {e}')
+
+    def _dispatch_all(self) -> None:
+        for topic in list(self._handlers):
+            self._dispatch(topic, None)
+
+
+class _ListeningInvalidationBus(LocalInvalidationBus, ABC):
+    """Receives invalidations in a background task that reconnects when the connection drops."""
+
+    def __init__(self, channel: str) -> None:
+        super().__init__()
+        self.channel = channel
+        self._listener: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen_forever())
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._listener
+            self._listener = None
+
+    async def _listen_forever(self) -> None:
+        while True:
+            try:
+                await self._listen()
+            except (OSError, asyncpg.PostgresError, redis.RedisError) as e:
+                logger.warning(f'cache invalidation connection lost, reconnecting: {e}')
+            await asyncio.sleep(CACHE_INVALIDATION_RECONNECT_SECONDS)
+
+    @abstractmethod
+    async def _listen(self) -> None:
+        """Receive messages until the connection is lost."""
+
+
+class PostgresInvalidationBus(_ListeningInvalidationBus):
+    """Publishes with pg_notify and listens on a dedicated connection."""
+
+    def __init__(self, dsn: str, channel: str = CACHE_INVALIDATION_CHANNEL) -> None:
+        super().__init__(channel)
+        self.dsn = dsn
+
+    def _send(self, message: str) -> None:
+        with sync_engine.begin() as connection:
+            connection.execute(select(func.pg_notify(self.channel, message)))
+
+    async def _asend(self, message: str) -> None:
+        async with engine.begin() as connection:
+            await connection.execute(select(func.pg_notify(self.channel, message)))
+
+    async def _listen(self) -> None:
+        connection = await asyncpg.connect(self.dsn)
+        lost = asyncio.Event()
+        connection.add_termination_listener(lambda _: lost.set())
+        try:
+            await connection.add_listener(self.channel, lambda *args: self._receive(args[-1]))
+            logger.info(f'listening for cache invalidations on {self.channel}')
+            # anything may have changed while not listening
+            self._dispatch_all()
+            await lost.wait()
+        finally:
+            if not connection.is_closed():
+                await connection.close()
+
+
+class RedisInvalidationBus(_ListeningInvalidationBus):
+    """Publishes and listens with Redis pub/sub."""
+
+    def __init__(self, url: str, channel: str = CACHE_INVALIDATION_CHANNEL) -> None:
+        super().__init__(channel)
+        self._redis = redis.Redis.from_url(url)
+        self._aredis = aioredis.Redis.from_url(url)
+
+    def _send(self, message: str) -> None:
+        self._redis.publish(self.channel, message)
+
+    async def _asend(self, message: str) -> None:
+        await self._aredis.publish(self.channel, message)
+
+    async def _listen(self) -> None:
+        pubsub = self._aredis.pubsub()
+        try:
+            await pubsub.subscribe(self.channel)
+            logger.info(f'listening for cache invalidations on {self.channel}')
+            self._dispatch_all()
+            async for message in pubsub.listen():
+                if message['type'] == 'message':
+                    self._receive(message['data'])
+        finally:
+            await pubsub.aclose()
+
+
+def by_chatbot_id(invalidate: Callable[[uuid.UUID], None], clear: Callable[[], None]) -> Handler:
+    """Handler for a cache keyed by chatbot id."""
+
+    def handler(key: str | None) -> None:
+        if key is None:
+            clear()
+        else:
+            invalidate(uuid.UUID(key))
+
+    return handler
+
+
+def get_invalidation_bus() -> LocalInvalidationBus:
+    if CACHE_INVALIDATION_BACKEND == 'local':
+        return LocalInvalidationBus()
+    if CACHE_INVALIDATION_BACKEND == 'postgres':
+        return PostgresInvalidationBus(asyncpg_dsn(DATABASE_URL))
+    if CACHE_INVALIDATION_BACKEND == 'redis':
+        if not CACHE_INVALIDATION_REDIS_URL:
+            raise ValueError('CACHE_INVALIDATION_REDIS_URL or REDIS_URL must be set for the redis invalidation bus')
+        return RedisInvalidationBus(CACHE_INVALIDATION_REDIS_URL)
+    raise ValueError(f'Unknown cache invalidation backend {CACHE_INVALIDATION_BACKEND}')
+
+
+invalidation_bus = get_invalidation_bus()
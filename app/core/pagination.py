@@ -0,0 +1,59 @@
+import base64
+import os
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Generic, TypeVar
+
+from sqlalchemy import Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+T = TypeVar('T')
+
+LIST_PAGE_SIZE_DEFAULT = int(os.getenv('LIST_PAGE_SIZE_DEFAULT', '50'))
+LIST_PAGE_SIZE_MAX = int(os.getenv('LIST_PAGE_SIZE_MAX', '500'))
+
+
+@dataclass
+class Page(Generic[T]):
+    items: list[T]
+    # None on the last page
+    next_cursor: str | None
+
+
+def encode_cursor(created_at: datetime, id: uuid.UUID) -> str:
+    return base64.urlsafe_b64encode(f'{created_at.isoformat()}|{id}'.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    """Raises ValueError for a cursor not made by `encode_cursor`."""
+    try:
+        created_at, id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(created_at), uuid.UUID(id)
+    except (ValueError, UnicodeError) as e:
+        raise ValueError(f'Invalid cursor {cursor!r}') from e
+
+
+async def apaginate(
+    session: AsyncSession,
+    query: Select,
+    model: Any,
+    limit: int,
+    cursor: str | None = None,
+) -> Page[Any]:
+    """
+    Fetch one page of `query`, newest first.
+
+    Keyset pagination on (created_at, id) of `model`: the cursor points at
+    the last row of the previous page, so each page is an index range scan
+    no matter how deep it is, and rows inserted meanwhile do not shift pages.
+    """
+    if cursor is not None:
+        query = query.where(tuple_(model.created_at, model.id) < decode_cursor(cursor))
+    query = query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1)
+
+    rows = list((await session.execute(query)).all())
+    if len(rows) <= limit:
+        return Page(items=rows, next_cursor=None)
+    last = rows[limit - 1]
+    return Page(items=rows[:limit], next_cursor=encode_cursor(last.created_at, last.id))
@@ -0,0 +1,15 @@
+import re
+import unicodedata
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize text for cache keys and exact matching.
+
+    Applies unicode NFKC normalization, case folding and whitespace collapsing
+    so that trivially different spellings of the same text compare equal.
+    """
+    text = unicodedata.normalize('NFKC', text)
+    return _WHITESPACE.sub(' ', text).strip().casefold()
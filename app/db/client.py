@@ -6,6 +6,7 @@ from sqlalchemy.orm import sessionmaker
 
 import os
 import logging
+from typing import Any
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -52,4 +53,55 @@ async_session_factory = async_sessionmaker(
 sync_session_factory = sessionmaker(
     sync_engine,
     expire_on_commit=False
-)
\ No newline at end of file
+)
+
+# Shared engines for the per-chatbot pgvector tables. Every PGVectorStore
+# runs on these instead of opening its own pools, see VectorStoreService.
+VECTOR_STORE_POOL_SIZE = int(os.getenv('VECTOR_STORE_POOL_SIZE', '5'))
+VECTOR_STORE_MAX_OVERFLOW = int(os.getenv('VECTOR_STORE_MAX_OVERFLOW', '10'))
+
+vector_store_engine = create_async_engine(
+    DATABASE_URL,
+    pool_size=VECTOR_STORE_POOL_SIZE,
+    max_overflow=VECTOR_STORE_MAX_OVERFLOW,
+    pool_timeout=30,
+    pool_recycle=1800,
+    pool_pre_ping=True,
+    echo=False
+)
+
+vector_store_sync_engine = create_engine(
+    SYNC_DATABASE_URL,
+    pool_size=VECTOR_STORE_POOL_SIZE,
+    max_overflow=VECTOR_STORE_MAX_OVERFLOW,
+    pool_timeout=30,
+    pool_recycle=1800,
+    pool_pre_ping=True,
+    echo=False
+)
+
+
+def asyncpg_dsn(database_url: str) -> str:
+    """DSN for connecting with asyncpg directly, e.g. to LISTEN."""
+    # DATABASE_URL is a SQLAlchemy URL, e.g. postgresql+asyncpg://...
+    scheme, rest = database_url.split('://', 1)
+    return f"{scheme.split('+', 1)[0]}://{rest}"
+
+
+def get_pool_stats() -> dict[str, dict[str, Any]]:
+    """Connection pool usage for every engine in the process."""
+    pools = {
+        'app': engine.pool,
+        'app_sync': sync_engine.pool,
+        'vector_store': vector_store_engine.pool,
+        'vector_store_sync': vector_store_sync_engine.pool,
+    }
+    return {
+        name: {
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': pool.overflow(),
+        }
+        for name, pool in pools.items()
+    }
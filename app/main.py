@@ -15,7 +15,16 @@ from app.routers import dialogues
 
 from app.routers import document
 from app.core.logging import setup_logging
+from app.core.invalidation import invalidation_bus
 from app.db.client import engine, async_session_factory
+from app.db.client import vector_store_engine, vector_store_sync_engine
+from app.db.client import get_pool_stats
+from app.services.rag.embedding_cache import embedding_cache
+from app.services.rag.answer_cache import answer_cache
+from app.services.rag.dialogue_matcher import dialogue_matcher
+from app.services.chatbot import ChatbotService
+from app.services.rag.vsi import VsiService
+from app.services.s3 import S3Service
 
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
@@ -30,11 +39,15 @@ setup_logging()
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     conn = await engine.connect()
+    await invalidation_bus.start()
     try:
         yield
     finally:
+        await invalidation_bus.stop()
         await conn.close()
         await engine.dispose()
+        await vector_store_engine.dispose()
+        vector_store_sync_engine.dispose()
 
 app = FastAPI(
     title='ChatterBox API',
@@ -71,7 +84,8 @@ app.add_middleware(
 app.add_middleware(
     CognitoAuthMiddleware,
     exclude_paths=['/docs', '/redoc', '/openapi.json', '/', '/health', 
-                  '/health/db', '/api/v1/chatbots/public/chat-test', 
+                  '/health/db', '/health/db/pool', '/health/cache',
+                  '/api/v1/chatbots/public/chat-test', 
                   '/api/v1/chatbots/public/chat'],
     exclude_methods=['OPTIONS'],
 )
@@ -111,3 +125,19 @@ async def db_health_check():
         # Return 503 Service Unavailable to indicate database issues
         return {'status': 'unhealthy', 'error': str(e)}, 503
 
+
+@app.get("/health/db/pool")
+async def db_pool_stats():
+    return {'pools': get_pool_stats()}
+
+
+@app.get("/health/cache")
+async def cache_stats():
+    return {
+        'chatbots': ChatbotService.cache_stats(),
+        'vsi': VsiService.cache_stats(),
+        'embeddings': embedding_cache.stats(),
+        'answers': answer_cache.stats(),
+        'dialogues': dialogue_matcher.stats(),
+        'presigned_urls': S3Service.cache_stats(),
+    }
@@ -3,6 +3,7 @@ from .users import User
 from .chatbot import Chatbot
 from .document import Document
 from .dialogue import Dialogue
+from .ocr_result import OcrResult
 
 # Export models
-__all__ = ['Base', 'User', 'Chatbot', 'Document', 'Dialogue']
+__all__ = ['Base', 'User', 'Chatbot', 'Document', 'Dialogue', 'OcrResult']
@@ -1,5 +1,5 @@
 from datetime import datetime, timezone
-from sqlalchemy import JSON, String, DateTime, ForeignKey
+from sqlalchemy import JSON, String, DateTime, ForeignKey, Integer
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.orm import Mapped
@@ -37,6 +37,14 @@ class Chatbot(Base):
         nullable=False, 
         default_factory=load_default_chatbot_settings_dict
     )
+    # Bumped whenever a document or dialogue of the chatbot is synced or
+    # removed, so caches of answers know the knowledge base has changed
+    knowledge_version: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default='0'
+    )
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), 
         nullable=False, 
@@ -1,6 +1,6 @@
 from datetime import datetime, timezone
 from enum import Enum
-from sqlalchemy import ARRAY, String, DateTime, ForeignKey
+from sqlalchemy import ARRAY, String, DateTime, ForeignKey, Index, text
 from sqlalchemy import Enum as SQLAlchemyEnum
 from sqlalchemy.orm import relationship
 from sqlalchemy.orm import Mapped
@@ -21,6 +21,17 @@ class SyncStatus(str, Enum):
 
 class Dialogue(Base):
     __tablename__ = 'dialogues'
+    __table_args__ = (
+        # only the sync backlog is indexed, it stays small as dialogues sync
+        Index(
+            'ix_dialogues_pending_sync',
+            'id',
+            postgresql_where=text("sync_status IN ('NA', 'FAILED')"),
+        ),
+        # keyset pagination of a chatbot's dialogues, see apaginate
+        Index('ix_dialogues_chatbot_created', 'chatbot_id', 'created_at', 'id'),
+        Index('ix_dialogues_chatbot_status_created', 'chatbot_id', 'sync_status', 'created_at', 'id'),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True),
@@ -49,5 +60,7 @@ class Dialogue(Base):
         default=SyncStatus.NA,
         nullable=False
     )
+    # When a scheduler last claimed the dialogue for sync, see app.services.sync_queue
+    claimed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True, default=None)
     # Set init=False for the relationship so it doesn't need to be in __init__
     chatbot: Mapped['Chatbot'] = relationship(back_populates='dialogues', init=False)
\ No newline at end of file
@@ -4,6 +4,8 @@ from enum import Enum
 from sqlalchemy import String
 from sqlalchemy import DateTime
 from sqlalchemy import ForeignKey
+from sqlalchemy import Index
+from sqlalchemy import text
 from sqlalchemy import Enum as SQLAlchemyEnum
 from sqlalchemy.orm import relationship
 from sqlalchemy.orm import Mapped
@@ -26,6 +28,19 @@ class SyncStatus(str, Enum):
 
 class Document(Base):
     __tablename__ = 'documents'
+    __table_args__ = (
+        # only the sync backlog is indexed, it stays small as documents sync
+        Index(
+            'ix_documents_pending_sync',
+            'id',
+            postgresql_where=text("sync_status IN ('NA', 'FAILED')"),
+        ),
+        # keyset pagination of a chatbot's documents, see apaginate
+        Index('ix_documents_chatbot_created', 'chatbot_id', 'created_at', 'id'),
+        Index('ix_documents_chatbot_status_created', 'chatbot_id', 'sync_status', 'created_at', 'id'),
+        # an uploaded file is indexed once per chatbot, see acreate_from_upload
+        Index('ix_documents_chatbot_file_url', 'chatbot_id', 'file_url', unique=True),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True),
@@ -59,5 +74,9 @@ class Document(Base):
         default=SyncStatus.NA,
         nullable=False
     )
+    # SHA-256 of the uploaded file, used to reuse OCR results of identical files
+    content_hash: Mapped[str | None] = mapped_column(String(64), nullable=True, default=None, index=True)
+    # When a scheduler last claimed the document for sync, see app.services.sync_queue
+    claimed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True, default=None)
 
     chatbot: Mapped['Chatbot'] = relationship(back_populates='documents', init=False)
\ No newline at end of file
@@ -0,0 +1,20 @@
+from datetime import datetime, timezone
+from sqlalchemy import String, Text, DateTime
+from sqlalchemy.orm import Mapped
+from sqlalchemy.orm import mapped_column
+from app.models.base import Base
+
+
+class OcrResult(Base):
+    """OCR output of a file, shared by every document with the same content."""
+    __tablename__ = 'ocr_results'
+
+    content_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    model: Mapped[str] = mapped_column(String(255), primary_key=True)
+    markdown: Mapped[str] = mapped_column(Text, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        default_factory=lambda: datetime.now(timezone.utc),
+        init=False
+    )
@@ -16,6 +16,7 @@ import asyncio
 from fastapi.responses import StreamingResponse
 import json
 from app.agents.qa import QaAgentWorkflow
+from app.agents.rag import RagWorkflow
 
 logger = logging.getLogger(__name__)
 
@@ -72,6 +73,8 @@ async def create_chatbot(
     await VectorStoreService.create_vector_store(
         table_name=str(chatbot.id),
         embed_dim=chatbot_settings.embedding_model.dimensions,
+        vector_index=chatbot_settings.vector_index,
+        retrieval=chatbot_settings.retrieval,
     )
     return ChatbotCreateResponse.model_validate(chatbot)
 
@@ -98,7 +101,9 @@ async def get_all_chatbots(
 async def get_chatbots_by_id(
     chatbot_id: uuid.UUID
 ):
-    chatbot = ChatbotService.find_by_id(str(chatbot_id))
+    chatbot = await ChatbotService.aget_cached(chatbot_id)
+    if not chatbot:
+        raise HTTPException(status_code=404, detail='Chatbot not found')
     return chatbot
 
 
@@ -173,7 +178,7 @@ async def chat_with_chatbot(
     request: Request,
     chat_request: Annotated[ChatRequest, Body(...)],
 ):
-    chatbot = ChatbotService.find_by_id(chat_request.chatbot_id)
+    chatbot = await ChatbotService.aget_cached(chat_request.chatbot_id)
     if not chatbot:
         raise HTTPException(status_code=404, detail='Chatbot not found')
     # logger.info(f'chatbot found: {chatbot.id}')
@@ -184,7 +189,13 @@ async def chat_with_chatbot(
         thread_id = uuid.uuid4()
     thread_id = str(thread_id)
 
-    qa_agent = QaAgentWorkflow(str(chat_request.chatbot_id))
+    chatbot_settings = chatbot.settings
+    workflow_class = RagWorkflow if chatbot_settings.chat.mode == 'rag' else QaAgentWorkflow
+    qa_agent = workflow_class(
+        str(chat_request.chatbot_id),
+        chatbot_settings,
+        chatbot.knowledge_version
+    )
 
     message_id = str(uuid.uuid4())
 
@@ -1,12 +1,14 @@
 from typing import Annotated
 import uuid
-from fastapi import APIRouter, Depends, Security
+from fastapi import APIRouter, Depends, HTTPException, Query, Security
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import logging
 from app.schemas.dialogue import DialogueAnswerResponse, DialogueEditRequest, DialogueGetAllFromChatbotResponse, DialogueResponse, DialogueCreateRequest
 from app.auth.dependencies import get_authenticated_user
 from app.auth.dependencies import security
 from app.models.users import User
+from app.core.pagination import LIST_PAGE_SIZE_DEFAULT, LIST_PAGE_SIZE_MAX
+from app.models.dialogue import SyncStatus
 from app.services.dialogues import DialogueService
 #from app.services.dialogues import
 
@@ -92,14 +94,23 @@ async def delete_dialogue_endpoint(
     "/chatbot/{chatbot_id}", 
     response_model=DialogueGetAllFromChatbotResponse,
     summary="Get Dialogue",
-    description="find the dialogue object using id"
+    description=(
+        "find the dialogue objects using chatbot_id, newest first. Pass the"
+        " returned next_cursor as cursor to get the next page."
+    )
 )
 async def find_dialogue_by_chatbot_endpoint(
-    chatbot_id: uuid.UUID
+    chatbot_id: uuid.UUID,
+    limit: Annotated[int, Query(ge=1, le=LIST_PAGE_SIZE_MAX)] = LIST_PAGE_SIZE_DEFAULT,
+    cursor: Annotated[str | None, Query()] = None,
+    sync_status: Annotated[SyncStatus | None, Query()] = None,
 ):
-    dialogues = await DialogueService.find_dialogue_by_chatbot(chatbot_id)
-    
-    return DialogueGetAllFromChatbotResponse(dialogues=dialogues)
+    try:
+        page = await DialogueService.list_dialogues_by_chatbot(chatbot_id, limit, cursor, sync_status)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return DialogueGetAllFromChatbotResponse(dialogues=page.items, next_cursor=page.next_cursor)
 
 # @router.get(
 #     "/question/{question}/{chatbot_id}", 
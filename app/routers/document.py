@@ -1,17 +1,24 @@
+import asyncio
 from typing import Annotated
 from fastapi import (
-    APIRouter, Depends, Path, UploadFile, File, Form, HTTPException, status
+    APIRouter, Depends, Path, Query, UploadFile, File, Form, HTTPException, status
 )
 import logging
 from uuid import UUID
 from app.auth.dependencies import get_authenticated_user, security
+from app.models.document import Document
 from app.models.users import User
 from app.schemas.document import DocumentCreate, DocumentGetAllFromChatbotResponse
 from app.schemas.document import DocumentCreateResponse
 from app.schemas.document import DocumentBaseResponse
+from app.schemas.document import DocumentUploadComplete, DocumentUploadRequest, DocumentUploadResponse
+from app.schemas.document import DocumentBulkCreateResponse
 
+from app.core.pagination import LIST_PAGE_SIZE_DEFAULT, LIST_PAGE_SIZE_MAX
 from app.services.document import DocumentService
-from app.services.s3 import S3Service
+from app.services.parse import OCR_MAX_CONCURRENT_RANGES
+from app.services.s3 import S3_UPLOAD_MAX_BYTES, S3_UPLOAD_URL_EXPIRY, FileTooLargeError, S3Service
+import os
 import uuid
 
 from app.services.chatbot import ChatbotService
@@ -19,10 +26,18 @@ from app.models.document import SyncStatus
 
 # from app.tasks.documents import process_document_queue_temporal
 from app.temporal.client import get_client
-from app.temporal.workflows import DocumentSyncWorkflow
-from app.temporal.shared import SYNC_DOCUMENT_TASK_QUEUE
+from temporalio.exceptions import WorkflowAlreadyStartedError
+from app.temporal.workflows import DocumentBatchSyncWorkflow, DocumentSyncWorkflow
+from app.temporal.activities.documents import DocumentBatchSyncRequest
+from app.temporal.shared import (
+    DOCUMENT_BATCH_EMBED_SIZE, DOCUMENT_BATCH_MAX_CONCURRENCY, SYNC_DOCUMENT_TASK_QUEUE
+)
 logger = logging.getLogger(__name__)
 
+# Files accepted per bulk upload, and how many of them are uploaded to S3 at once
+DOCUMENT_BULK_MAX_FILES = int(os.getenv('DOCUMENT_BULK_MAX_FILES', '100'))
+DOCUMENT_BULK_UPLOAD_CONCURRENCY = int(os.getenv('DOCUMENT_BULK_UPLOAD_CONCURRENCY', '4'))
+
 # Define router
 router = APIRouter(
     prefix='/api/v1/documents',
@@ -66,7 +81,7 @@ async def create_document(
         # upload to s3
         key = file.filename or str(uuid.uuid4())
 
-        await S3Service.upload_file(file, key)
+        content_hash = await S3Service.upload_file(file, key)
         logger.debug(f'File uploaded to S3: {key}')
 
         # create document
@@ -75,20 +90,163 @@ async def create_document(
                 chatbot_id=chatbot_id,
                 title=title,
                 key=key,
-                mime_type=file.content_type or 'application/octet-stream'
+                mime_type=file.content_type or 'application/octet-stream',
+                content_hash=content_hash
             )
         )
         # await process_document_queue_temporal(document.id)
         
         # start temporal workflow to sync document
+        await _astart_document_sync(document.id)
+
+        return document
+    except FileTooLargeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.exception(f"Error creating document: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error creating document: {str(e)}"
+        )
+
+@router.post(
+    '/bulk',
+    response_model=DocumentBulkCreateResponse,
+    summary='Index several documents for a chatbot',
+    description=(
+        'Index several documents for a chatbot at once. The documents are '
+        'created together and synced by a single background workflow.'
+    )
+)
+async def create_documents(
+    files: Annotated[list[UploadFile], File(...)],
+    chatbot_id: Annotated[UUID, Form(...)],
+    user: Annotated[User, Depends(get_authenticated_user)]
+):
+    await _get_owned_chatbot(chatbot_id, user)
+
+    if len(files) > DOCUMENT_BULK_MAX_FILES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {DOCUMENT_BULK_MAX_FILES} files can be uploaded at once"
+        )
+
+    try:
+        documents = await _acreate_uploaded_documents(files, chatbot_id)
+
+        workflow_id = f"document-batch-sync-{uuid.uuid4()}"
         client = await get_client()
         await client.start_workflow(
-                DocumentSyncWorkflow.run,
-                document.id,
-                id=f"document-sync-{document.id}",
+                DocumentBatchSyncWorkflow.run,
+                DocumentBatchSyncRequest(
+                    document_ids=[document.id for document in documents],
+                    max_concurrency=DOCUMENT_BATCH_MAX_CONCURRENCY,
+                    embed_batch_size=DOCUMENT_BATCH_EMBED_SIZE,
+                    ocr_max_concurrency=OCR_MAX_CONCURRENT_RANGES,
+                ),
+                id=workflow_id,
                 task_queue=SYNC_DOCUMENT_TASK_QUEUE
             )
 
+        return DocumentBulkCreateResponse(documents=documents, workflow_id=workflow_id)
+    except FileTooLargeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.exception(f"Error creating documents: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error creating documents: {str(e)}"
+        )
+
+
+@router.post(
+    '/uploads',
+    response_model=DocumentUploadResponse,
+    summary='Request a direct upload of a document',
+    description=(
+        'Get a presigned POST to upload a file directly to storage. Once the '
+        'file is uploaded, complete the upload to index it.'
+    )
+)
+async def request_document_upload(
+    upload_request: DocumentUploadRequest,
+    user: Annotated[User, Depends(get_authenticated_user)]
+):
+    await _get_owned_chatbot(upload_request.chatbot_id, user)
+
+    filename = os.path.basename(upload_request.filename) or 'file'
+    key = f'{_upload_prefix(upload_request.chatbot_id)}{uuid.uuid4()}/{filename}'
+    presigned_post = await S3Service.agenerate_presigned_post(key, upload_request.content_type)
+
+    return DocumentUploadResponse(
+        key=key,
+        url=presigned_post['url'],
+        fields=presigned_post['fields'],
+        max_bytes=S3_UPLOAD_MAX_BYTES,
+        expires_in=S3_UPLOAD_URL_EXPIRY,
+    )
+
+
+@router.post(
+    '/uploads/complete',
+    response_model=DocumentCreateResponse,
+    summary='Index a directly uploaded document',
+    description=(
+        'Index a document uploaded with a presigned POST. The document will '
+        'be queued for processing and indexing in the background.'
+    )
+)
+async def complete_document_upload(
+    upload_complete: DocumentUploadComplete,
+    user: Annotated[User, Depends(get_authenticated_user)]
+):
+    await _get_owned_chatbot(upload_complete.chatbot_id, user)
+
+    # keys are issued per chatbot, this stops claiming another chatbot's files
+    if not upload_complete.key.startswith(_upload_prefix(upload_complete.chatbot_id)):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Upload key does not belong to this chatbot"
+        )
+
+    # completing twice (e.g. a client retry) returns the same document
+    document = await DocumentService.afind_by_key(upload_complete.chatbot_id, upload_complete.key)
+    if document:
+        return document
+
+    head = await S3Service.ahead_object(upload_complete.key)
+    if not head:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Uploaded file not found"
+        )
+    if head['ContentLength'] > S3_UPLOAD_MAX_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File exceeds the maximum upload size of {S3_UPLOAD_MAX_BYTES} bytes"
+        )
+
+    try:
+        # the content hash is computed by the sync workflow, which reads the file anyway
+        document, created = await DocumentService.acreate_from_upload(
+            DocumentCreate(
+                chatbot_id=upload_complete.chatbot_id,
+                title=upload_complete.title,
+                key=upload_complete.key,
+                mime_type=head.get('ContentType') or 'application/octet-stream',
+            )
+        )
+
+        # only the request that created the document starts its sync
+        if created:
+            await _astart_document_sync(document.id)
+
         return document
     except Exception as e:
         logger.exception(f"Error creating document: {e}")
@@ -97,18 +255,101 @@ async def create_document(
             detail=f"Error creating document: {str(e)}"
         )
 
+
+async def _get_owned_chatbot(chatbot_id: UUID, user: User):
+    chatbot = await ChatbotService.afind_by_id(chatbot_id)
+    if not chatbot:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Chatbot not found"
+        )
+
+    if chatbot.owner_id != user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User does not have permission to access this chatbot"
+        )
+    return chatbot
+
+
+async def _astart_document_sync(document_id: UUID) -> None:
+    """Start the sync workflow of a document, unless a scheduler already did."""
+    client = await get_client()
+    try:
+        await client.start_workflow(
+                DocumentSyncWorkflow.run,
+                document_id,
+                id=f"document-sync-{document_id}",
+                task_queue=SYNC_DOCUMENT_TASK_QUEUE
+            )
+    except WorkflowAlreadyStartedError:
+        logger.debug(f'Sync of document {document_id} already started')
+
+
+def _upload_prefix(chatbot_id: UUID) -> str:
+    return f'uploads/{chatbot_id}/'
+
+
+async def _acreate_uploaded_documents(files: list[UploadFile], chatbot_id: UUID) -> list[Document]:
+    """
+    Upload the files to S3 and create their documents in one transaction.
+
+    If any upload or the insert fails, the files already uploaded are
+    deleted so no object is left without a document.
+    """
+    semaphore = asyncio.Semaphore(DOCUMENT_BULK_UPLOAD_CONCURRENCY)
+    uploaded: list[str] = []
+
+    async def upload(file: UploadFile) -> DocumentCreate:
+        filename = os.path.basename(file.filename or '') or 'file'
+        key = f'{_upload_prefix(chatbot_id)}{uuid.uuid4()}/{filename}'
+        async with semaphore:
+            content_hash = await S3Service.upload_file(file, key)
+        uploaded.append(key)
+        return DocumentCreate(
+            chatbot_id=chatbot_id,
+            title=filename,
+            key=key,
+            mime_type=file.content_type or 'application/octet-stream',
+            content_hash=content_hash
+        )
+
+    try:
+        # let every upload settle, so none finishes after the cleanup below
+        results = await asyncio.gather(*(upload(file) for file in files), return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return await DocumentService.acreate_many(results)
+    except BaseException:
+        try:
+            await S3Service.adelete_files(uploaded)
+        except Exception as e:
+            logger.exception(f"Error deleting the uploads of failed documents {uploaded}: {e}")
+        raise
+
+
 @router.get(
     "/{chatbot_id}", 
     response_model=DocumentGetAllFromChatbotResponse,
     summary="Get Document by chatbot_id",
-    description="find the document object using chatbot_id"
+    description=(
+        "find the document objects using chatbot_id, newest first. Pass the"
+        " returned next_cursor as cursor to get the next page."
+    )
 )
 async def find_document_by_chatbot_endpoint(
-    chatbot_id: uuid.UUID
+    chatbot_id: uuid.UUID,
+    limit: Annotated[int, Query(ge=1, le=LIST_PAGE_SIZE_MAX)] = LIST_PAGE_SIZE_DEFAULT,
+    cursor: Annotated[str | None, Query()] = None,
+    sync_status: Annotated[SyncStatus | None, Query()] = None,
 ):
-    documents = await DocumentService.get_documents_by_chatbot_id(chatbot_id)
-    
-    return DocumentGetAllFromChatbotResponse(documents=documents)
+    try:
+        page = await DocumentService.get_documents_by_chatbot_id(chatbot_id, limit, cursor, sync_status)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    return DocumentGetAllFromChatbotResponse(documents=page.items, next_cursor=page.next_cursor)
 
 # @router.patch(
 #     '/{document_id}',
@@ -1,5 +1,20 @@
-from typing import Annotated
-from pydantic import BaseModel, Field
+import hashlib
+from typing import Annotated, Any, Literal
+from pydantic import BaseModel, Field, model_validator
+
+# pgvector cannot index `vector` columns above 2000 dimensions, `halfvec` up to 4000
+MAX_VECTOR_INDEX_DIMENSIONS = 2000
+MAX_HALFVEC_INDEX_DIMENSIONS = 4000
+
+
+# Full output size of the supported embedding models
+NATIVE_EMBEDDING_DIMENSIONS = {
+    'text-embedding-ada-002': 1536,
+    'text-embedding-3-small': 1536,
+    'text-embedding-3-large': 3072,
+}
+# Models trained so that their embeddings can be shortened (Matryoshka representation)
+SHORTENABLE_EMBEDDING_MODELS = {'text-embedding-3-small', 'text-embedding-3-large'}
 
 
 class EmbeddingModel(BaseModel):
@@ -10,10 +25,201 @@ class EmbeddingModel(BaseModel):
         description="The name of the embedding model"
     )]
     dimensions: Annotated[int, Field(
-        description="The dimensions of the embedding model"
+        gt=0,
+        description=(
+            "The dimensions of the embedding model. text-embedding-3 models "
+            "return embeddings shortened to this size"
+        )
+    )]
+
+    @model_validator(mode='after')
+    def check_dimensions(self) -> 'EmbeddingModel':
+        native = NATIVE_EMBEDDING_DIMENSIONS.get(self.name)
+        if native is None:
+            return self
+        if self.dimensions > native:
+            raise ValueError(f'{self.name} embeddings have at most {native} dimensions')
+        if self.dimensions != native and self.name not in SHORTENABLE_EMBEDDING_MODELS:
+            raise ValueError(f'{self.name} embeddings always have {native} dimensions')
+        return self
+
+
+class AnswerCacheSettings(BaseModel):
+    enabled: Annotated[bool, Field(
+        default=True,
+        description="Whether answers to similar questions are served from cache"
+    )]
+    similarity_threshold: Annotated[float, Field(
+        default=0.95,
+        ge=0.0,
+        le=1.0,
+        description="Minimum cosine similarity between questions to reuse an answer"
+    )]
+
+
+class DialogueMatchingSettings(BaseModel):
+    enabled: Annotated[bool, Field(
+        default=True,
+        description="Whether questions matching a dialogue are answered with its answer"
+    )]
+    similarity_threshold: Annotated[float, Field(
+        default=0.9,
+        ge=0.0,
+        le=1.0,
+        description="Minimum cosine similarity to a dialogue question to use its answer"
+    )]
+
+
+class VectorIndexSettings(BaseModel):
+    type: Annotated[Literal['none', 'hnsw', 'ivfflat'], Field(
+        default='none',
+        description="Approximate nearest neighbour index on the chatbot's vector table"
+    )]
+    m: Annotated[int, Field(
+        default=16,
+        ge=2,
+        le=100,
+        description="HNSW: maximum number of connections per layer"
+    )]
+    ef_construction: Annotated[int, Field(
+        default=64,
+        ge=4,
+        le=1000,
+        description="HNSW: size of the candidate list when building the index"
+    )]
+    ef_search: Annotated[int, Field(
+        default=40,
+        ge=1,
+        le=1000,
+        description="HNSW: size of the candidate list when querying"
+    )]
+    lists: Annotated[int, Field(
+        default=100,
+        ge=1,
+        le=32768,
+        description="IVFFlat: number of inverted lists, roughly rows / 1000"
+    )]
+    probes: Annotated[int, Field(
+        default=10,
+        ge=1,
+        description="IVFFlat: number of lists searched when querying"
+    )]
+    halfvec: Annotated[bool | None, Field(
+        default=None,
+        description=(
+            "Store embeddings as half precision. Unset means only when the "
+            "dimensions are too large to index as `vector`"
+        )
+    )]
+
+    def use_halfvec(self, dimensions: int) -> bool:
+        if self.halfvec is not None:
+            return self.halfvec
+        return self.type != 'none' and dimensions > MAX_VECTOR_INDEX_DIMENSIONS
+
+    def search_parameters(self) -> dict[str, int]:
+        """Postgres settings to apply to each similarity query."""
+        if self.type == 'hnsw':
+            return {'hnsw.ef_search': self.ef_search}
+        if self.type == 'ivfflat':
+            return {'ivfflat.probes': self.probes}
+        return {}
+
+
+class RetrievalSettings(BaseModel):
+    mode: Annotated[Literal['dense', 'hybrid'], Field(
+        default='dense',
+        description=(
+            "dense: vector similarity only. hybrid: vector similarity and "
+            "full-text search fused by reciprocal rank"
+        )
+    )]
+    top_k: Annotated[int, Field(
+        default=2,
+        ge=1,
+        le=50,
+        description="Number of chunks passed to the LLM"
+    )]
+    candidates: Annotated[int, Field(
+        default=10,
+        ge=1,
+        le=200,
+        description="Hybrid: number of chunks fetched from each search before fusion"
+    )]
+    rrf_k: Annotated[int, Field(
+        default=60,
+        ge=1,
+        description="Hybrid: reciprocal rank fusion constant, higher values flatten rank differences"
+    )]
+    text_search_config: Annotated[str, Field(
+        default='english',
+        pattern=r'^[a-z_]+$',
+        description="Hybrid: Postgres text search configuration used to index chunks"
+    )]
+
+    def retriever_kwargs(self) -> dict[str, Any]:
+        """Keyword arguments for `VectorStoreIndex.as_retriever` / `as_query_engine`."""
+        if self.mode == 'hybrid':
+            return {
+                'vector_store_query_mode': 'hybrid',
+                'similarity_top_k': max(self.candidates, self.top_k),
+                'sparse_top_k': max(self.candidates, self.top_k),
+                'hybrid_top_k': self.top_k,
+            }
+        return {'similarity_top_k': self.top_k}
+
+
+class ChatSettings(BaseModel):
+    mode: Annotated[Literal['agent', 'rag'], Field(
+        default='agent',
+        description=(
+            "agent: an LLM agent decides when to search the knowledge base. "
+            "rag: search once and stream a single completion over the results"
+        )
     )]
 
 
 class ChatbotSettings(BaseModel):
     embedding_model: EmbeddingModel
-    
\ No newline at end of file
+    answer_cache: Annotated[AnswerCacheSettings, Field(
+        default_factory=AnswerCacheSettings,
+        description="Semantic cache of previous answers"
+    )]
+    dialogue_matching: Annotated[DialogueMatchingSettings, Field(
+        default_factory=DialogueMatchingSettings,
+        description="Answering from dialogues before invoking the agent"
+    )]
+    vector_index: Annotated[VectorIndexSettings, Field(
+        default_factory=VectorIndexSettings,
+        description="Index used for similarity search over the chatbot's chunks"
+    )]
+    retrieval: Annotated[RetrievalSettings, Field(
+        default_factory=RetrievalSettings,
+        description="How chunks are retrieved for a question"
+    )]
+    chat: Annotated[ChatSettings, Field(
+        default_factory=ChatSettings,
+        description="How answers are generated"
+    )]
+
+    @model_validator(mode='after')
+    def check_vector_index(self) -> 'ChatbotSettings':
+        dimensions = self.embedding_model.dimensions
+        if self.vector_index.type == 'none':
+            return self
+        limit = (
+            MAX_HALFVEC_INDEX_DIMENSIONS
+            if self.vector_index.use_halfvec(dimensions)
+            else MAX_VECTOR_INDEX_DIMENSIONS
+        )
+        if dimensions > limit:
+            raise ValueError(
+                f'{self.vector_index.type} indexes support at most {limit} dimensions, '
+                f'embedding model has {dimensions}'
+            )
+        return self
+
+    @property
+    def version(self) -> str:
+        """Stable fingerprint of the settings, used to key caches built from them."""
+        return hashlib.sha256(self.model_dump_json().encode()).hexdigest()[:16]
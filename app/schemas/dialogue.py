@@ -29,6 +29,7 @@ class DialogueResponse(BaseModel):
         
 class DialogueGetAllFromChatbotResponse(BaseModel):
     dialogues: Annotated[list[DialogueResponse], Field(description='The list of dialogues for the chatbot')]
+    next_cursor: Annotated[str | None, Field(default=None, description='Cursor of the next page, absent on the last page')]
 
 class DialogueAnswerResponse(BaseModel):
     answer: Annotated[str, Field(description="answer to question")]
@@ -52,14 +52,78 @@ class DocumentCreate(BaseModel):
         str, 
         Field(description='The MIME type of the document')
     ]
+    content_hash: Annotated[
+        str | None,
+        Field(default=None, description='The SHA-256 of the uploaded file')
+    ]
 
 
 class DocumentCreateResponse(DocumentBaseResponse):
     pass
 # endregion: Create Document 
 
+
+# region: Bulk Create Documents
+class DocumentBulkCreateResponse(BaseModel):
+    documents: Annotated[
+        list[DocumentBaseResponse],
+        Field(description='The created documents')
+    ]
+    workflow_id: Annotated[
+        str,
+        Field(description='The ID of the workflow syncing the documents')
+    ]
+# endregion: Bulk Create Documents
+
+
+# region: Direct Upload
+class DocumentUploadRequest(BaseModel):
+    chatbot_id: Annotated[
+        UUID,
+        Field(description='The ID of the chatbot the document will belong to')
+    ]
+    filename: Annotated[str, Field(description='The name of the file to upload')]
+    content_type: Annotated[
+        str,
+        Field(description='The MIME type of the file, the upload must use the same')
+    ]
+
+
+class DocumentUploadResponse(BaseModel):
+    key: Annotated[
+        str,
+        Field(description='The key of the file, to pass when completing the upload')
+    ]
+    url: Annotated[str, Field(description='The URL to POST the file to')]
+    fields: Annotated[
+        dict[str, str],
+        Field(description='The form fields to send along with the file')
+    ]
+    max_bytes: Annotated[int, Field(description='The maximum size of the file')]
+    expires_in: Annotated[
+        int,
+        Field(description='The number of seconds the upload URL is valid for')
+    ]
+
+
+class DocumentUploadComplete(BaseModel):
+    chatbot_id: Annotated[
+        UUID,
+        Field(description='The ID of the chatbot this document belongs to')
+    ]
+    title: Annotated[str, Field(description='The title of the document')]
+    key: Annotated[
+        str,
+        Field(description='The key returned when the upload was requested')
+    ]
+# endregion: Direct Upload
+
 class DocumentGetAllFromChatbotResponse(BaseModel):
     documents: Annotated[list[DocumentBaseResponse], Field(description='The list of dialogues for the chatbot')]
+    next_cursor: Annotated[
+        str | None,
+        Field(default=None, description='Cursor of the next page, absent on the last page')
+    ]
 
 
 class DocumentSyncStatusUpdateRequest(BaseModel):
@@ -1,11 +1,64 @@
-from sqlalchemy import select
+from sqlalchemy import select, update
+from sqlalchemy.sql.dml import Update
 from sqlalchemy.orm import selectinload
-from typing import Sequence
+from dataclasses import dataclass
+from typing import Any, Sequence
+from app.core.cache import TTLCache
+from app.core.invalidation import CHATBOT, by_chatbot_id, invalidation_bus
 from app.models.chatbot import Chatbot
 from app.db.client import async_session_factory, sync_session_factory
 from app.schemas.chatbot import ChatbotCreate
+from app.schemas.chatbot_settings import ChatbotSettings
+from datetime import datetime, timezone
+import os
 import uuid
 
+CHATBOT_CACHE_MAX_SIZE = int(os.getenv('CHATBOT_CACHE_MAX_SIZE', '1024'))
+# Also bounds how long a change made by another process, such as a knowledge
+# version bump by a sync worker, can go unnoticed
+CHATBOT_CACHE_TTL_SECONDS = float(os.getenv('CHATBOT_CACHE_TTL_SECONDS', '30'))
+
+
+@dataclass(frozen=True)
+class CachedChatbot:
+    """
+    Chatbot columns with the settings already parsed, as served from the cache.
+
+    Shared between requests, so treat `settings` as read-only.
+    """
+    id: uuid.UUID
+    name: str
+    description: str | None
+    owner_id: uuid.UUID
+    is_public: bool
+    settings: ChatbotSettings
+    knowledge_version: int
+    created_at: datetime
+    updated_at: datetime
+
+    @classmethod
+    def from_model(cls, chatbot: Chatbot) -> 'CachedChatbot':
+        return cls(
+            id=chatbot.id,
+            name=chatbot.name,
+            description=chatbot.description,
+            owner_id=chatbot.owner_id,
+            is_public=chatbot.is_public,
+            settings=ChatbotSettings.model_validate(chatbot.settings),
+            knowledge_version=chatbot.knowledge_version,
+            created_at=chatbot.created_at,
+            updated_at=chatbot.updated_at,
+        )
+
+
+# Process-wide cache of chatbots looked up on the request path
+_chatbot_cache: TTLCache[uuid.UUID, CachedChatbot] = TTLCache(
+    maxsize=CHATBOT_CACHE_MAX_SIZE,
+    ttl=CHATBOT_CACHE_TTL_SECONDS,
+)
+# bumped on invalidation so that a lookup racing with an update is not cached
+_cache_generation = 0
+
 
 class ChatbotService:
     """Service for chatbot related operations."""
@@ -70,7 +123,79 @@ class ChatbotService:
             query = query.where(Chatbot.id == id)
             result = session.execute(query)
             return result.scalar_one_or_none()
-        
+
+    @staticmethod
+    async def aget_cached(id: uuid.UUID) -> CachedChatbot | None:
+        """
+        Find a chatbot by its ID, served from the in-process cache when possible.
+
+        Use this on the request path where the columns and settings are all
+        that is needed; missing chatbots are not cached.
+        """
+        chatbot = _chatbot_cache.get(id)
+        if chatbot is not None:
+            return chatbot
+
+        generation = _cache_generation
+        found = await ChatbotService.afind_by_id(id)
+        if found is None:
+            return None
+        chatbot = CachedChatbot.from_model(found)
+        if _cache_generation == generation:
+            _chatbot_cache.set(id, chatbot)
+        return chatbot
+
+    @staticmethod
+    def invalidate(id: uuid.UUID) -> None:
+        """
+        Drop the cached copy of the chatbot in this process.
+
+        Writers publish to the invalidation bus instead, which calls this in
+        every process.
+        """
+        global _cache_generation
+        _cache_generation += 1
+        _chatbot_cache.pop(id)
+
+    @staticmethod
+    def clear_cache() -> None:
+        global _cache_generation
+        _cache_generation += 1
+        _chatbot_cache.clear()
+
+    @staticmethod
+    def cache_stats() -> dict[str, Any]:
+        return _chatbot_cache.stats()
+
+    @staticmethod
+    async def update_settings(id: uuid.UUID, settings: ChatbotSettings) -> Chatbot | None:
+        """Replace a chatbot's settings and drop anything cached from the old ones."""
+        async with async_session_factory() as session:
+            chatbot = await session.get(Chatbot, id)
+            if not chatbot:
+                return None
+            chatbot.settings = settings.model_dump()
+            chatbot.updated_at = datetime.now(timezone.utc)
+            await session.commit()
+            await session.refresh(chatbot)
+
+        await invalidation_bus.apublish(CHATBOT, id)
+        return chatbot
+
+    @staticmethod
+    def bump_knowledge_version(chatbot_id: uuid.UUID) -> Update:
+        """
+        Statement marking the chatbot's knowledge base as changed.
+
+        Execute it in the same transaction as the sync status change so the
+        version only moves when that change is committed.
+        """
+        return (
+            update(Chatbot)
+            .where(Chatbot.id == chatbot_id)
+            .values(knowledge_version=Chatbot.knowledge_version + 1)
+        )
+
     @staticmethod
     async def find_by_owner(owner_id: uuid.UUID) -> Chatbot:
         """Find a chatbot by its owner ID."""
@@ -80,3 +205,4 @@ class ChatbotService:
             return result.scalar_one_or_none()
 
 
+invalidation_bus.subscribe(CHATBOT, by_chatbot_id(ChatbotService.invalidate, ChatbotService.clear_cache))
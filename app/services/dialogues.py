@@ -2,14 +2,30 @@ import logging
 from typing import Sequence
 import uuid
 from uuid import UUID
-from sqlalchemy import select
+from sqlalchemy import Row, select
 
+from app.core.pagination import LIST_PAGE_SIZE_DEFAULT, Page, apaginate
 from app.models.dialogue import Dialogue, SyncStatus
 from app.db.client import async_session_factory, sync_session_factory
+from app.services.sync_queue import claim_pending
+from app.services.chatbot import ChatbotService
+from app.core.invalidation import CHATBOT, DIALOGUES, invalidation_bus
 from sqlalchemy import select
 
 logger = logging.getLogger(__name__)
 
+# Columns of DialogueResponse, loaded for dialogue lists
+LIST_COLUMNS = (
+    Dialogue.id,
+    Dialogue.name,
+    Dialogue.questions,
+    Dialogue.answer,
+    Dialogue.chatbot_id,
+    Dialogue.sync_status,
+    Dialogue.created_at,
+    Dialogue.updated_at,
+)
+
 class DialogueService:
     
     @classmethod
@@ -32,6 +48,7 @@ class DialogueService:
             session.add(dialogue)
             await session.commit()
             await session.refresh(dialogue)
+            await invalidation_bus.apublish(DIALOGUES, chatbot)
             return dialogue
         
     @classmethod
@@ -49,6 +66,26 @@ class DialogueService:
             query = select(Dialogue).where(Dialogue.chatbot_id == chatbot_id)
             result = await session.execute(query)
             return result.scalars().all()
+
+    @classmethod
+    async def list_dialogues_by_chatbot(
+        cls,
+        chatbot_id: uuid.UUID,
+        limit: int = LIST_PAGE_SIZE_DEFAULT,
+        cursor: str | None = None,
+        sync_status: SyncStatus | None = None,
+    ) -> Page[Row]:
+        """
+        Return a page of the chatbot's dialogues, newest first.
+
+        Only the columns shown in dialogue lists are loaded. Raises
+        ValueError for an invalid cursor.
+        """
+        query = select(*LIST_COLUMNS).where(Dialogue.chatbot_id == chatbot_id)
+        if sync_status is not None:
+            query = query.where(Dialogue.sync_status == sync_status)
+        async with async_session_factory() as session:
+            return await apaginate(session, query, Dialogue, limit, cursor)
             
     # @classmethod
     # async def find_answer_by_question(cls, question:str, chatbot_id: uuid.UUID) -> Dialogue:
@@ -88,9 +125,12 @@ class DialogueService:
             dialogue.questions = questions
             dialogue.answer = answer
             dialogue.sync_status = SyncStatus.NA
+            # an edit is synced on the next scheduler run, not after the lease
+            dialogue.claimed_at = None
 
             await session.commit()
             await session.refresh(dialogue)
+            await invalidation_bus.apublish(DIALOGUES, dialogue.chatbot_id)
 
             return dialogue
                 
@@ -104,7 +144,10 @@ class DialogueService:
                 result = await session.execute(query)
                 dialogue =  result.scalar_one_or_none()
                 await session.delete(dialogue)
+                await session.execute(ChatbotService.bump_knowledge_version(dialogue.chatbot_id))
                 await session.commit()
+                await invalidation_bus.apublish(CHATBOT, dialogue.chatbot_id)
+                await invalidation_bus.apublish(DIALOGUES, dialogue.chatbot_id)
                 return dialogue
             
     @classmethod
@@ -131,11 +174,26 @@ class DialogueService:
                     dialogue.sync_msg = sync_msg
                 
                 session.add(dialogue)
+                if sync_status == SyncStatus.SYNCED:
+                    session.execute(ChatbotService.bump_knowledge_version(dialogue.chatbot_id))
                 session.commit()
                 session.refresh(dialogue)
+                if sync_status == SyncStatus.SYNCED:
+                    invalidation_bus.publish(CHATBOT, dialogue.chatbot_id)
                 
                 return dialogue
         
+    @classmethod
+    async def aclaim_chatbot_ids_to_sync(cls, limit: int) -> list[UUID]:
+        """
+        Claim up to `limit` dialogues waiting to be synced and return their chatbots.
+
+        Dialogues are synced per chatbot; concurrent callers claim disjoint
+        dialogues, see `claim_pending`.
+        """
+        chatbot_ids = await claim_pending(Dialogue, limit, returning=Dialogue.chatbot_id)
+        return list(dict.fromkeys(chatbot_ids))
+
     @classmethod
     def get_dialogues_to_sync(cls, limit: int = 10) -> list[Dialogue]:
         with sync_session_factory() as session:
@@ -1,11 +1,17 @@
 import logging
 import uuid
+from datetime import datetime, timezone
 from uuid import UUID
+from app.core.invalidation import CHATBOT, invalidation_bus
+from app.core.pagination import LIST_PAGE_SIZE_DEFAULT, Page, apaginate
 from app.db.client import async_session_factory, sync_session_factory
+from app.services.sync_queue import claim_pending
 from app.models.document import Document, SyncStatus
 from app.schemas.document import DocumentCreate
-from sqlalchemy import select
+from sqlalchemy import Row, select, update
+from sqlalchemy.dialects.postgresql import insert
 from app.services.s3 import S3Service
+from app.services.chatbot import ChatbotService
 from app.services.parse import DocumentParserService
 from app.services.rag.embeddings import EmbeddingsService
 from app.services.rag.vectorstore import VectorStoreService
@@ -16,6 +22,18 @@ from llama_index.core.ingestion import IngestionPipeline
 
 logger = logging.getLogger(__name__)
 
+# Columns of DocumentBaseResponse, loaded for document lists
+LIST_COLUMNS = (
+    Document.id,
+    Document.chatbot_id,
+    Document.title,
+    Document.file_url,
+    Document.mime_type,
+    Document.sync_status,
+    Document.created_at,
+    Document.updated_at,
+)
+
 
 class DocumentService:
     
@@ -29,7 +47,11 @@ class DocumentService:
                 file_url=document_create.key,
                 mime_type=document_create.mime_type,
                 sync_status=SyncStatus.NA,
-                sync_msg=''
+                sync_msg='',
+                content_hash=document_create.content_hash,
+                # the caller starts its sync; claimed rows do not notify the sync listener
+                # and are only scanned again once the claim lease runs out
+                claimed_at=datetime.now(timezone.utc)
             )
             
             session.add(document)
@@ -38,6 +60,77 @@ class DocumentService:
             
             return document
             
+    @classmethod
+    async def acreate_many(cls, document_creates: list[DocumentCreate]) -> list[Document]:
+        """Create document records in one transaction, claimed like `acreate`."""
+        now = datetime.now(timezone.utc)
+        async with async_session_factory() as session:
+            documents = [
+                Document(
+                    chatbot_id=document_create.chatbot_id,
+                    title=document_create.title,
+                    file_url=document_create.key,
+                    mime_type=document_create.mime_type,
+                    sync_status=SyncStatus.NA,
+                    sync_msg='',
+                    content_hash=document_create.content_hash,
+                    claimed_at=now
+                )
+                for document_create in document_creates
+            ]
+
+            session.add_all(documents)
+            # all defaults are set client side, so no refresh is needed
+            await session.commit()
+
+            return documents
+
+    @classmethod
+    async def acreate_from_upload(cls, document_create: DocumentCreate) -> tuple[Document, bool]:
+        """
+        Create the document of an uploaded file, claimed like `acreate`.
+
+        Completing the same upload concurrently creates one document; the
+        others get it back with `False`, so only one request starts its sync.
+        """
+        async with async_session_factory() as session:
+            now = datetime.now(timezone.utc)
+            statement = insert(Document).values(
+                id=uuid.uuid4(),
+                chatbot_id=document_create.chatbot_id,
+                title=document_create.title,
+                file_url=document_create.key,
+                mime_type=document_create.mime_type,
+                sync_status=SyncStatus.NA,
+                sync_msg='',
+                content_hash=document_create.content_hash,
+                created_at=now,
+                updated_at=now,
+                claimed_at=now,
+            ).on_conflict_do_nothing(index_elements=['chatbot_id', 'file_url']).returning(Document)
+            document = (await session.execute(statement)).scalar_one_or_none()
+            await session.commit()
+
+        if document:
+            return document, True
+        return await cls.afind_by_key(document_create.chatbot_id, document_create.key), False
+
+    @classmethod
+    async def afind_by_key(cls, chatbot_id: uuid.UUID, key: str) -> Document | None:
+        """Find the document of a chatbot created from the given S3 key."""
+        async with async_session_factory() as session:
+            query = select(Document).where(Document.chatbot_id == chatbot_id, Document.file_url == key)
+            return (await session.execute(query)).scalars().first()
+
+    @classmethod
+    async def aset_content_hash(cls, document_id: uuid.UUID, content_hash: str) -> None:
+        """Record the SHA-256 of a document's file, for files hashed after upload."""
+        async with async_session_factory() as session:
+            await session.execute(
+                update(Document).where(Document.id == document_id).values(content_hash=content_hash)
+            )
+            await session.commit()
+
     @classmethod
     async def aget_document(cls, document_id: uuid.UUID) -> Document | None:
         """Get a document by ID."""
@@ -53,11 +146,24 @@ class DocumentService:
             return document
 
     @classmethod
-    async def get_documents_by_chatbot_id(cls, chatbot_id: uuid.UUID) -> list[Document]:
-        """Return a list of documents associated with the given chatbot_id."""
-        with sync_session_factory() as session:
-            documents = session.query(Document).filter(Document.chatbot_id == chatbot_id).all()
-            return documents
+    async def get_documents_by_chatbot_id(
+        cls,
+        chatbot_id: uuid.UUID,
+        limit: int = LIST_PAGE_SIZE_DEFAULT,
+        cursor: str | None = None,
+        sync_status: SyncStatus | None = None,
+    ) -> Page[Row]:
+        """
+        Return a page of the chatbot's documents, newest first.
+
+        Only the columns shown in document lists are loaded. Raises
+        ValueError for an invalid cursor.
+        """
+        query = select(*LIST_COLUMNS).where(Document.chatbot_id == chatbot_id)
+        if sync_status is not None:
+            query = query.where(Document.sync_status == sync_status)
+        async with async_session_factory() as session:
+            return await apaginate(session, query, Document, limit, cursor)
 
     @classmethod
     def update_sync_status(
@@ -83,11 +189,24 @@ class DocumentService:
                 document.sync_msg = sync_msg
             
             session.add(document)
+            if sync_status == SyncStatus.SYNCED:
+                session.execute(ChatbotService.bump_knowledge_version(document.chatbot_id))
             session.commit()
             session.refresh(document)
+            if sync_status == SyncStatus.SYNCED:
+                invalidation_bus.publish(CHATBOT, document.chatbot_id)
             
             return document
     
+    @classmethod
+    async def aclaim_ids_to_sync(cls, limit: int) -> list[UUID]:
+        """
+        Claim up to `limit` documents waiting to be synced and return their ids.
+
+        Concurrent callers get disjoint ids; see `claim_pending`.
+        """
+        return await claim_pending(Document, limit)
+
     @classmethod
     def get_documents_to_sync(cls, limit: int = 10) -> list[Document]:
         with sync_session_factory() as session:
@@ -123,7 +242,11 @@ class DocumentService:
 
             chatbot_settings = ChatbotSettings.model_validate(document.chatbot.settings)
             em_settings = EmbeddingModel.model_validate(chatbot_settings.embedding_model)
-            vector_store = VectorStoreService.get_vector_store(str(document.chatbot.id), em_settings.dimensions)
+            vector_store = VectorStoreService.get_vector_store(
+                str(document.chatbot.id),
+                em_settings.dimensions,
+                vector_index=chatbot_settings.vector_index
+            )
             embedding_model = EmbeddingsService.get_embedding_model(em_settings)
 
             doc_to_parse = LlamaIndexDocument(id_=str(document_id), text=parsed_markdown)
@@ -135,7 +258,9 @@ class DocumentService:
             pipeline.run(documents=[doc_to_parse])
 
             document.sync_status = SyncStatus.SYNCED
+            session.execute(ChatbotService.bump_knowledge_version(document.chatbot_id))
             session.commit()
+            invalidation_bus.publish(CHATBOT, document.chatbot_id)
 
     @staticmethod
     def get_by_id(document_id: UUID) -> Document:
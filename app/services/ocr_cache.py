@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Protocol
+
+from botocore.exceptions import ClientError
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.db.client import async_session_factory
+from app.models.ocr_result import OcrResult
+
+logger = logging.getLogger(__name__)
+
+# postgres, disk, s3 or none
+OCR_CACHE_BACKEND = os.getenv('OCR_CACHE_BACKEND', 'postgres')
+OCR_CACHE_PATH = os.getenv('OCR_CACHE_PATH', os.path.join(tempfile.gettempdir(), 'ocr-cache'))
+OCR_CACHE_BUCKET = os.getenv('OCR_CACHE_BUCKET') or os.getenv('S3_BUCKET_NAME')
+OCR_CACHE_PREFIX = os.getenv('OCR_CACHE_PREFIX', 'ocr-cache/')
+
+
+class OcrCache(Protocol):
+    """OCR output keyed by the SHA-256 of the file and the OCR model."""
+
+    async def get(self, content_hash: str, model: str) -> str | None:
+        ...
+
+    async def set(self, content_hash: str, model: str, markdown: str) -> None:
+        ...
+
+
+class NullOcrCache:
+
+    async def get(self, content_hash: str, model: str) -> str | None:
+        return None
+
+    async def set(self, content_hash: str, model: str, markdown: str) -> None:
+        return None
+
+
+class PostgresOcrCache:
+    """Stores OCR output in the `ocr_results` table."""
+
+    async def get(self, content_hash: str, model: str) -> str | None:
+        async with async_session_factory() as session:
+            query = select(OcrResult.markdown).where(
+                OcrResult.content_hash == content_hash,
+                OcrResult.model == model,
+            )
+            return (await session.execute(query)).scalar_one_or_none()
+
+    async def set(self, content_hash: str, model: str, markdown: str) -> None:
+        async with async_session_factory() as session:
+            statement = insert(OcrResult).values(
+                content_hash=content_hash,
+                model=model,
+                markdown=markdown,
+            ).on_conflict_do_nothing()
+            await session.execute(statement)
+            await session.commit()
+
+
+class DiskOcrCache:
+    """Stores OCR output as files in a local directory."""
+
+    def __init__(self, root: str | Path) -> None:
+        self.root = Path(root)
+
+    async def get(self, content_hash: str, model: str) -> str | None:
+        path = self._path(content_hash, model)
+        try:
+            return await asyncio.to_thread(path.read_text, encoding='utf-8')
+        except FileNotFoundError:
+            return None
+
+    async def set(self, content_hash: str, model: str, markdown: str) -> None:
+        await asyncio.to_thread(self._write, self._path(content_hash, model), markdown)
+
+    def _path(self, content_hash: str, model: str) -> Path:
+        return self.root / model / f'{content_hash}.md'
+
+    @staticmethod
+    def _write(path: Path, markdown: str) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # write then rename so a concurrent reader never sees a partial file
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=path.parent, delete=False) as f:
+            f.write(markdown)
+        os.replace(f.name, path)
+
+
+class S3OcrCache:
+    """Stores OCR output as objects under a prefix of an S3 bucket."""
+
+    def __init__(self, bucket: str, prefix: str = OCR_CACHE_PREFIX) -> None:
+        self.bucket = bucket
+        self.prefix = prefix
+
+    async def get(self, content_hash: str, model: str) -> str | None:
+        from app.services.s3 import S3Service
+
+        def read() -> str | None:
+            try:
+                response = S3Service.get_s3_client().get_object(Bucket=self.bucket, Key=self._key(content_hash, model))
+            except ClientError as e:
+                if e.response.get('Error', {}).get('Code') == 'NoSuchKey':
+                    return None
+                raise
+            return response['Body'].read().decode('utf-8')
+
+        return await asyncio.to_thread(read)
+
+    async def set(self, content_hash: str, model: str, markdown: str) -> None:
+        from app.services.s3 import S3Service
+
+        await asyncio.to_thread(
+            S3Service.get_s3_client().put_object,
+            Bucket=self.bucket,
+            Key=self._key(content_hash, model),
+            Body=markdown.encode('utf-8'),
+            ContentType='text/markdown; charset=utf-8',
+        )
+
+    def _key(self, content_hash: str, model: str) -> str:
+        return f'{self.prefix}{model}/{content_hash}.md'
+
+
+def get_ocr_cache() -> OcrCache:
+    if OCR_CACHE_BACKEND == 'postgres':
+        return PostgresOcrCache()
+    if OCR_CACHE_BACKEND == 'disk':
+        return DiskOcrCache(OCR_CACHE_PATH)
+    if OCR_CACHE_BACKEND == 's3':
+        if not OCR_CACHE_BUCKET:
+            raise ValueError('OCR_CACHE_BUCKET or S3_BUCKET_NAME must be set for the s3 OCR cache')
+        return S3OcrCache(OCR_CACHE_BUCKET)
+    if OCR_CACHE_BACKEND == 'none':
+        return NullOcrCache()
+    raise ValueError(f'Unknown OCR cache backend {OCR_CACHE_BACKEND}')
+
+
+ocr_cache = get_ocr_cache()
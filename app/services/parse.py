@@ -1,9 +1,33 @@
+import asyncio
+import io
+import logging
+import unicodedata
 from typing import Any
 from mistralai import Mistral
 import os
+import pypdf
+
+logger = logging.getLogger(__name__)
 
 client = Mistral(api_key=os.getenv('MISTRAL_API_KEY'))
 
+OCR_MODEL = 'mistral-ocr-latest'
+
+# Extract the text layer of PDF pages locally and only OCR pages without one
+PDF_TEXT_LAYER_ENABLED = os.getenv('PDF_TEXT_LAYER_ENABLED', 'true').lower() == 'true'
+# Pages with less extracted text than this are treated as scanned
+PDF_TEXT_LAYER_MIN_CHARS = int(os.getenv('PDF_TEXT_LAYER_MIN_CHARS', '50'))
+# Pages where more than this share of the characters are not printable have a
+# broken text layer (missing font mappings) and are OCRed as well
+PDF_TEXT_LAYER_MAX_GARBAGE_RATIO = float(os.getenv('PDF_TEXT_LAYER_MAX_GARBAGE_RATIO', '0.1'))
+
+# Large PDFs are OCRed in ranges of this many pages, in parallel
+OCR_PAGE_RANGE_SIZE = int(os.getenv('OCR_PAGE_RANGE_SIZE', '20'))
+OCR_MAX_CONCURRENT_RANGES = int(os.getenv('OCR_MAX_CONCURRENT_RANGES', '8'))
+
+# Identifies the parser output, e.g. for caching results
+PDF_PARSER = f'{OCR_MODEL}+text-layer' if PDF_TEXT_LAYER_ENABLED else OCR_MODEL
+
 
 class DocumentParserService:
     
@@ -20,7 +44,7 @@ class DocumentParserService:
         """
         include_image_base64 = kwargs.get('include_image_base64', False)
         ocr_response = client.ocr.process(
-            model="mistral-ocr-latest",
+            model=OCR_MODEL,
             document={
                 "type": "document_url",
                 "document_url": document_url,
@@ -31,3 +55,138 @@ class DocumentParserService:
         markdown = '\n\n'.join([page.markdown for page in ocr_response.pages])
         
         return markdown
+
+    @classmethod
+    async def aparse_pdf_to_markdown(cls, document_url: str, **kwargs: Any) -> str:
+        """
+        Asynchronous version of parse method, safe to call from the event loop.
+        
+        Args:
+            document_url: URL to the document to parse
+            
+        Returns:
+            Extracted text from the document
+        """
+        include_image_base64 = kwargs.get('include_image_base64', False)
+        ocr_response = await client.ocr.process_async(
+            model=OCR_MODEL,
+            document={
+                "type": "document_url",
+                "document_url": document_url,
+            },
+            include_image_base64=include_image_base64,
+        )
+        
+        return '\n\n'.join([page.markdown for page in ocr_response.pages])
+
+    @classmethod
+    async def aparse_pdf(cls, document_url: str, content: bytes) -> str:
+        """
+        Parse a PDF, extracting the text layer locally where it is usable.
+
+        Only the pages without a usable text layer (scans, images) are sent
+        to OCR, in a single request; the markdown of all pages is joined back
+        in page order.
+
+        Args:
+            document_url: URL to the document, used for OCR
+            content: the PDF file
+
+        Returns:
+            Extracted text from the document
+        """
+        pages, ocr_pages = await cls.aplan_pdf(content)
+        if ocr_pages:
+            pages.update(await cls.aocr_pages(document_url, ocr_pages))
+        return cls.merge_pages(pages)
+
+    @classmethod
+    async def aplan_pdf(cls, content: bytes) -> tuple[dict[int, str], list[int]]:
+        """
+        Extract the usable text layer of a PDF and find the pages left to OCR.
+
+        Returns:
+            The text of the pages with a usable text layer by page index, and
+            the indexes of the pages to OCR
+
+        Raises:
+            ValueError: the PDF cannot be read, so its pages are unknown
+        """
+        try:
+            if not PDF_TEXT_LAYER_ENABLED:
+                page_count = await asyncio.to_thread(cls.count_pages, content)
+                return {}, list(range(page_count))
+            texts = await asyncio.to_thread(cls.extract_text_layer, content)
+        except Exception as e:
+            raise ValueError(f'could not read the PDF: {e}') from e
+
+        pages = {index: text for index, text in enumerate(texts) if text is not None}
+        ocr_pages = [index for index, text in enumerate(texts) if text is None]
+        logger.info(f'{len(pages)} of {len(texts)} PDF pages have a text layer')
+        return pages, ocr_pages
+
+    @classmethod
+    async def aocr_pages(cls, document_url: str, pages: list[int] | None = None) -> dict[int, str]:
+        """
+        OCR some pages of a document.
+
+        Args:
+            document_url: URL to the document
+            pages: indexes of the pages to OCR, all pages when None
+
+        Returns:
+            The markdown of each page by page index
+        """
+        ocr_response = await client.ocr.process_async(
+            model=OCR_MODEL,
+            document={
+                "type": "document_url",
+                "document_url": document_url,
+            },
+            pages=pages,
+            include_image_base64=False,
+        )
+        return {page.index: page.markdown for page in ocr_response.pages}
+
+    @staticmethod
+    def merge_pages(pages: dict[int, str]) -> str:
+        """Join the markdown of pages in page order."""
+        return '\n\n'.join(pages[index] for index in sorted(pages) if pages[index])
+
+    @staticmethod
+    def split_page_ranges(pages: list[int], size: int = OCR_PAGE_RANGE_SIZE) -> list[list[int]]:
+        """Split page indexes into consecutive chunks of at most `size` pages."""
+        return [pages[i:i + size] for i in range(0, len(pages), size)]
+
+    @classmethod
+    def count_pages(cls, content: bytes) -> int:
+        return len(pypdf.PdfReader(io.BytesIO(content)).pages)
+
+    @classmethod
+    def extract_text_layer(cls, content: bytes) -> list[str | None]:
+        """
+        Extract the text layer of each page of a PDF.
+
+        Returns:
+            The text of each page, None for pages without a usable text layer
+        """
+        reader = pypdf.PdfReader(io.BytesIO(content))
+        return [_usable_text(page.extract_text() or '') for page in reader.pages]
+
+
+def _usable_text(text: str) -> str | None:
+    text = text.strip()
+    if len(text) < PDF_TEXT_LAYER_MIN_CHARS:
+        return None
+    garbage = sum(1 for c in text if _is_garbage(c))
+    if garbage / len(text) > PDF_TEXT_LAYER_MAX_GARBAGE_RATIO:
+        return None
+    return text
+
+
+def _is_garbage(c: str) -> bool:
+    # replacement characters, private use glyphs and control characters are
+    # what unmapped fonts extract to
+    if c == '\ufffd':
+        return True
+    return not c.isspace() and unicodedata.category(c) in ('Co', 'Cn', 'Cc')
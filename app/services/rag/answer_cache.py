@@ -0,0 +1,164 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any
+
+import numpy as np
+
+from app.core.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+ANSWER_CACHE_MAX_CHATBOTS = int(os.getenv('ANSWER_CACHE_MAX_CHATBOTS', '1000'))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv('ANSWER_CACHE_MAX_ENTRIES', '500'))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv('ANSWER_CACHE_TTL_SECONDS', '3600'))
+
+
+@dataclass
+class _ChatbotAnswers:
+    """Cached answers of one chatbot, valid for a single knowledge version."""
+    knowledge_version: int
+    questions: list[str] = field(default_factory=list)
+    answers: list[str] = field(default_factory=list)
+    created_at: list[float] = field(default_factory=list)
+    # one L2-normalized question embedding per row
+    embeddings: np.ndarray | None = None
+
+
+class AnswerCache:
+    """
+    Per-chatbot semantic cache of answers.
+
+    A question hits when its embedding's cosine similarity to a cached
+    question reaches the chatbot's threshold and the chatbot's knowledge
+    version is unchanged since the answer was produced. Entries for an older
+    knowledge version are discarded on first access.
+    """
+
+    def __init__(
+        self,
+        max_chatbots: int = ANSWER_CACHE_MAX_CHATBOTS,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+        ttl: float = ANSWER_CACHE_TTL_SECONDS,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._chatbots: TTLCache[uuid.UUID, _ChatbotAnswers] = TTLCache(maxsize=max_chatbots)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(
+        self,
+        chatbot_id: uuid.UUID,
+        knowledge_version: int,
+        embedding: list[float],
+        similarity_threshold: float,
+    ) -> str | None:
+        """Return the cached answer closest to `embedding`, if it is close enough."""
+        with self._lock:
+            entry = self._current(chatbot_id, knowledge_version, len(embedding))
+            answer = None
+            if entry is not None and entry.embeddings is not None:
+                self._expire(entry)
+                if entry.answers:
+                    similarities = entry.embeddings @ _normalize(embedding)
+                    best = int(np.argmax(similarities))
+                    if similarities[best] >= similarity_threshold:
+                        logger.debug(
+                            f'answer cache hit for chatbot {chatbot_id} '
+                            f'(similarity {similarities[best]:.3f})'
+                        )
+                        answer = entry.answers[best]
+            if answer is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return answer
+
+    def store(
+        self,
+        chatbot_id: uuid.UUID,
+        knowledge_version: int,
+        question: str,
+        embedding: list[float],
+        answer: str,
+    ) -> None:
+        with self._lock:
+            entry = self._current(chatbot_id, knowledge_version, len(embedding))
+            if entry is None:
+                entry = _ChatbotAnswers(knowledge_version=knowledge_version)
+                self._chatbots.set(chatbot_id, entry)
+
+            row = _normalize(embedding)[np.newaxis, :]
+            if entry.embeddings is None:
+                entry.embeddings = row
+            else:
+                entry.embeddings = np.vstack([entry.embeddings, row])
+            entry.questions.append(question)
+            entry.answers.append(answer)
+            entry.created_at.append(time.monotonic())
+
+            overflow = len(entry.answers) - self.max_entries
+            if overflow > 0:
+                self._drop(entry, overflow)
+
+    def invalidate(self, chatbot_id: uuid.UUID) -> None:
+        with self._lock:
+            self._chatbots.pop(chatbot_id)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'chatbots': len(self._chatbots),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / lookups) if lookups else 0.0,
+            }
+
+    def _current(
+        self,
+        chatbot_id: uuid.UUID,
+        knowledge_version: int,
+        dimensions: int,
+    ) -> _ChatbotAnswers | None:
+        entry = self._chatbots.get(chatbot_id, record=False)
+        if entry is None:
+            return None
+        # drop answers produced before the knowledge base was last synced, or
+        # with a different embedding model
+        stale_version = entry.knowledge_version != knowledge_version
+        stale_model = entry.embeddings is not None and entry.embeddings.shape[1] != dimensions
+        if stale_version or stale_model:
+            self._chatbots.pop(chatbot_id)
+            return None
+        return entry
+
+    def _expire(self, entry: _ChatbotAnswers) -> None:
+        cutoff = time.monotonic() - self.ttl
+        expired = 0
+        # entries are appended in order so expired ones are always at the front
+        while expired < len(entry.created_at) and entry.created_at[expired] < cutoff:
+            expired += 1
+        if expired:
+            self._drop(entry, expired)
+
+    @staticmethod
+    def _drop(entry: _ChatbotAnswers, count: int) -> None:
+        del entry.questions[:count]
+        del entry.answers[:count]
+        del entry.created_at[:count]
+        entry.embeddings = entry.embeddings[count:] if entry.answers else None
+
+
+def _normalize(embedding: list[float]) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+answer_cache = AnswerCache()
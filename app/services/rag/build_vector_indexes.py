@@ -0,0 +1,87 @@
+"""
+Build or update the indexes of existing chatbot vector tables.
+
+Tables created before vector indexes were configurable have no ANN index and
+a plain `vector` column, and no full-text column for hybrid retrieval. Run
+this after deploying to upgrade them, or after changing `vector_index` or
+`retrieval` in a chatbot's settings:
+
+    python -m app.services.rag.build_vector_indexes --type hnsw --retrieval hybrid
+    python -m app.services.rag.build_vector_indexes --rebuild <chatbot id> ...
+
+With `--type` or `--retrieval`, the chatbots' settings are updated once their
+tables are ready, so queries only switch over after the columns exist.
+"""
+import argparse
+import asyncio
+import logging
+import uuid
+
+from sqlalchemy import select
+
+from app.db.client import async_session_factory
+from app.models.chatbot import Chatbot
+from app.schemas.chatbot_settings import ChatbotSettings
+from app.services.chatbot import ChatbotService
+from app.services.rag.vectorstore import VectorStoreService
+
+logger = logging.getLogger(__name__)
+
+
+async def build_vector_indexes(
+    chatbot_ids: list[uuid.UUID],
+    index_type: str | None = None,
+    retrieval_mode: str | None = None,
+    rebuild: bool = False,
+) -> None:
+    async with async_session_factory() as session:
+        query = select(Chatbot.id, Chatbot.settings)
+        if chatbot_ids:
+            query = query.where(Chatbot.id.in_(chatbot_ids))
+        chatbots = (await session.execute(query)).all()
+
+    for chatbot_id, raw_settings in chatbots:
+        current = ChatbotSettings.model_validate(raw_settings)
+        updates = current.model_dump()
+        if index_type is not None:
+            updates['vector_index']['type'] = index_type
+        if retrieval_mode is not None:
+            updates['retrieval']['mode'] = retrieval_mode
+
+        try:
+            # validates the index type against the embedding dimensions
+            settings = ChatbotSettings.model_validate(updates)
+            await VectorStoreService.build_index(
+                table_name=str(chatbot_id),
+                embed_dim=settings.embedding_model.dimensions,
+                vector_index=settings.vector_index,
+                rebuild=rebuild,
+            )
+            if settings.retrieval.mode == 'hybrid':
+                await VectorStoreService.ensure_text_search(
+                    table_name=str(chatbot_id),
+                    text_search_config=settings.retrieval.text_search_config,
+                )
+        except Exception as e:
+            logger.error(f'failed to build vector index for chatbot {chatbot_id}: {e}')
+            continue
+
+        if settings != current:
+            await ChatbotService.update_settings(chatbot_id, settings)
+        logger.info(f'vector index ready for chatbot {chatbot_id}')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Build ANN indexes on chatbot vector tables.')
+    parser.add_argument('chatbot_ids', nargs='*', type=uuid.UUID, help='chatbots to index, all when omitted')
+    parser.add_argument('--type', choices=['none', 'hnsw', 'ivfflat'], help='switch the chatbots to this index type')
+    parser.add_argument('--retrieval', choices=['dense', 'hybrid'], help='switch the chatbots to this retrieval mode')
+    parser.add_argument('--rebuild', action='store_true', help='drop and rebuild existing indexes')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(build_vector_indexes(args.chatbot_ids, args.type, args.retrieval, args.rebuild))
+
+
+if __name__ == '__main__':
+    main()
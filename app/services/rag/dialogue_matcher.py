@@ -0,0 +1,185 @@
+import asyncio
+import logging
+import os
+import threading
+import uuid
+from typing import Any, Sequence
+
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding
+
+from app.core.cache import TTLCache
+from app.core.invalidation import DIALOGUES, by_chatbot_id, invalidation_bus
+from app.core.text import normalize_text
+from app.models.dialogue import Dialogue
+
+logger = logging.getLogger(__name__)
+
+DIALOGUE_MATCHER_MAX_CHATBOTS = int(os.getenv('DIALOGUE_MATCHER_MAX_CHATBOTS', '1000'))
+DIALOGUE_MATCHER_TTL_SECONDS = float(os.getenv('DIALOGUE_MATCHER_TTL_SECONDS', '3600'))
+
+
+class DialogueIndex:
+    """
+    Lookup structure over the questions of one chatbot's dialogues.
+
+    Exact matches (after text normalization) are answered from a dict; other
+    questions are compared against a matrix of L2-normalized question
+    embeddings with a single matrix-vector product.
+    """
+
+    def __init__(
+        self,
+        questions: list[str],
+        answers: list[str],
+        embeddings: np.ndarray | None,
+        embedding_key: tuple[str, int],
+    ) -> None:
+        self.answers = answers
+        self.embeddings = embeddings
+        self.embedding_key = embedding_key
+        # row i of `embeddings` belongs to questions[i] and answers[i]
+        self._exact = {normalize_text(q): a for q, a in zip(questions, answers)}
+
+    def __len__(self) -> int:
+        return len(self.answers)
+
+    @classmethod
+    async def build(
+        cls,
+        dialogues: Sequence[Dialogue],
+        embedding_model: BaseEmbedding,
+        embedding_key: tuple[str, int],
+    ) -> 'DialogueIndex':
+        questions: list[str] = []
+        answers: list[str] = []
+        for dialogue in dialogues:
+            for question in dialogue.questions:
+                if question and question.strip():
+                    questions.append(question)
+                    answers.append(dialogue.answer)
+
+        embeddings = None
+        if questions:
+            vectors = await embedding_model.aget_text_embedding_batch(questions)
+            embeddings = _normalize_rows(np.asarray(vectors, dtype=np.float32))
+        return cls(questions, answers, embeddings, embedding_key)
+
+    def match_text(self, question: str) -> str | None:
+        return self._exact.get(normalize_text(question))
+
+    def match_embedding(self, embedding: list[float], similarity_threshold: float) -> str | None:
+        if self.embeddings is None or self.embeddings.shape[1] != len(embedding):
+            return None
+        similarities = self.embeddings @ _normalize_rows(np.asarray(embedding, dtype=np.float32))
+        best = int(np.argmax(similarities))
+        if similarities[best] < similarity_threshold:
+            return None
+        logger.debug(f'dialogue matched with similarity {similarities[best]:.3f}')
+        return self.answers[best]
+
+
+class DialogueMatcher:
+    """
+    Per-chatbot cache of dialogue indexes.
+
+    Indexes are built on first use from the chatbot's dialogues and dropped
+    whenever a dialogue of the chatbot is created, edited or deleted.
+    Concurrent requests for a missing index share a single build.
+    """
+
+    def __init__(
+        self,
+        max_chatbots: int = DIALOGUE_MATCHER_MAX_CHATBOTS,
+        ttl: float = DIALOGUE_MATCHER_TTL_SECONDS,
+    ) -> None:
+        self._indexes: TTLCache[uuid.UUID, DialogueIndex] = TTLCache(maxsize=max_chatbots, ttl=ttl)
+        # bumped on invalidation so that a build racing with an edit is not cached
+        self._generations: dict[uuid.UUID, int] = {}
+        self._epoch = 0
+        # builds in flight, keyed by chatbot, embedding model and generation
+        self._builds: dict[tuple, asyncio.Task[DialogueIndex]] = {}
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    async def get_index(
+        self,
+        chatbot_id: uuid.UUID,
+        embedding_model: BaseEmbedding,
+        embedding_key: tuple[str, int],
+    ) -> DialogueIndex:
+        index = self._indexes.get(chatbot_id)
+        if index is not None and index.embedding_key == embedding_key:
+            return index
+
+        generation = self._generation(chatbot_id)
+        key = (chatbot_id, embedding_key, generation)
+        build = self._builds.get(key)
+        if build is None:
+            build = asyncio.create_task(self._build(chatbot_id, embedding_model, embedding_key, generation))
+            self._builds[key] = build
+            build.add_done_callback(lambda _: self._builds.pop(key, None))
+        # a cancelled request must not cancel the build other requests wait for
+        return await asyncio.shield(build)
+
+    async def _build(
+        self,
+        chatbot_id: uuid.UUID,
+        embedding_model: BaseEmbedding,
+        embedding_key: tuple[str, int],
+        generation: tuple[int, int],
+    ) -> DialogueIndex:
+        from app.services.dialogues import DialogueService
+
+        dialogues = await DialogueService.find_dialogue_by_chatbot(chatbot_id)
+        index = await DialogueIndex.build(dialogues, embedding_model, embedding_key)
+        if self._generation(chatbot_id) == generation:
+            self._indexes.set(chatbot_id, index)
+        logger.debug(f'dialogue index built for chatbot {chatbot_id} with {len(index)} questions')
+        return index
+
+    def invalidate(self, chatbot_id: uuid.UUID) -> None:
+        with self._lock:
+            self._generations[chatbot_id] = self._generations.get(chatbot_id, 0) + 1
+            self._indexes.pop(chatbot_id)
+
+    def invalidate_all(self) -> None:
+        with self._lock:
+            self._epoch += 1
+            self._indexes.clear()
+
+    def record(self, answer: str | None, exact: bool) -> None:
+        with self._lock:
+            if answer is None:
+                self.misses += 1
+            elif exact:
+                self.exact_hits += 1
+            else:
+                self.semantic_hits += 1
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            hits = self.exact_hits + self.semantic_hits
+            lookups = hits + self.misses
+            return {
+                'chatbots': len(self._indexes),
+                'exact_hits': self.exact_hits,
+                'semantic_hits': self.semantic_hits,
+                'misses': self.misses,
+                'hit_rate': (hits / lookups) if lookups else 0.0,
+            }
+
+    def _generation(self, chatbot_id: uuid.UUID) -> tuple[int, int]:
+        with self._lock:
+            return self._epoch, self._generations.get(chatbot_id, 0)
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+dialogue_matcher = DialogueMatcher()
+invalidation_bus.subscribe(DIALOGUES, by_chatbot_id(dialogue_matcher.invalidate, dialogue_matcher.invalidate_all))
@@ -0,0 +1,271 @@
+import hashlib
+import logging
+import os
+import threading
+from array import array
+from typing import Any, Awaitable, Callable, List
+
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from pydantic import Field, PrivateAttr
+import redis
+import redis.asyncio as aioredis
+
+from app.core.cache import TTLCache
+from app.core.text import normalize_text
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_CACHE_MAX_SIZE = int(os.getenv('EMBEDDING_CACHE_MAX_SIZE', '10000'))
+EMBEDDING_CACHE_TTL_SECONDS = float(os.getenv('EMBEDDING_CACHE_TTL_SECONDS', '86400'))
+# Optional shared tier, e.g. redis://redis:6379/1. Leave unset for memory only.
+EMBEDDING_CACHE_REDIS_URL = os.getenv('EMBEDDING_CACHE_REDIS_URL')
+
+
+class EmbeddingCache:
+    """
+    Two-tier cache of embedding vectors.
+
+    Keys are (model name, dimensions, text). The first tier is an
+    in-process LRU; the optional second tier is Redis so that API workers and
+    Temporal workers share embeddings. Errors talking to Redis are logged and
+    treated as misses, the cache never fails an embedding call.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = EMBEDDING_CACHE_MAX_SIZE,
+        ttl: float = EMBEDDING_CACHE_TTL_SECONDS,
+        redis_url: str | None = EMBEDDING_CACHE_REDIS_URL,
+    ) -> None:
+        self.ttl = ttl
+        self._memory: TTLCache[str, Embedding] = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._redis = redis.Redis.from_url(redis_url) if redis_url else None
+        self._aredis = aioredis.Redis.from_url(redis_url) if redis_url else None
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.round_trips_saved = 0
+
+    @staticmethod
+    def make_key(model_name: str, dimensions: int, text: str, normalize: bool = False) -> str:
+        """
+        Cache key of an embedding.
+
+        Only normalize queries: a stored document vector must belong to exactly
+        the text stored next to it, while queries differing in case or spacing
+        are close enough to share one.
+        """
+        if normalize:
+            text = normalize_text(text)
+        digest = hashlib.sha256(text.encode()).hexdigest()
+        return f'emb:{model_name}:{dimensions}:{digest}'
+
+    def get_many(self, keys: list[str]) -> list[Embedding | None]:
+        found = [self._memory.get(key, record=False) for key in keys]
+        memory_hits = sum(1 for value in found if value is not None)
+        shared_hits = 0
+        missing = [i for i, value in enumerate(found) if value is None]
+        if missing and self._redis is not None:
+            try:
+                values = self._redis.mget([keys[i] for i in missing])
+                shared_hits = self._fill_from_shared(keys, found, missing, values)
+            except redis.RedisError as e:
+                logger.warning(f'embedding cache redis read failed: {e}')
+        self._record(memory_hits, shared_hits, len(missing) - shared_hits)
+        return found
+
+    async def aget_many(self, keys: list[str]) -> list[Embedding | None]:
+        found = [self._memory.get(key, record=False) for key in keys]
+        memory_hits = sum(1 for value in found if value is not None)
+        shared_hits = 0
+        missing = [i for i, value in enumerate(found) if value is None]
+        if missing and self._aredis is not None:
+            try:
+                values = await self._aredis.mget([keys[i] for i in missing])
+                shared_hits = self._fill_from_shared(keys, found, missing, values)
+            except redis.RedisError as e:
+                logger.warning(f'embedding cache redis read failed: {e}')
+        self._record(memory_hits, shared_hits, len(missing) - shared_hits)
+        return found
+
+    def set_many(self, items: dict[str, Embedding]) -> None:
+        for key, embedding in items.items():
+            self._memory.set(key, embedding)
+        if items and self._redis is not None:
+            try:
+                with self._redis.pipeline(transaction=False) as pipe:
+                    for key, embedding in items.items():
+                        pipe.set(key, _pack(embedding), ex=int(self.ttl))
+                    pipe.execute()
+            except redis.RedisError as e:
+                logger.warning(f'embedding cache redis write failed: {e}')
+
+    async def aset_many(self, items: dict[str, Embedding]) -> None:
+        for key, embedding in items.items():
+            self._memory.set(key, embedding)
+        if items and self._aredis is not None:
+            try:
+                async with self._aredis.pipeline(transaction=False) as pipe:
+                    for key, embedding in items.items():
+                        pipe.set(key, _pack(embedding), ex=int(self.ttl))
+                    await pipe.execute()
+            except redis.RedisError as e:
+                logger.warning(f'embedding cache redis write failed: {e}')
+
+    def record_saved_round_trip(self) -> None:
+        with self._lock:
+            self.round_trips_saved += 1
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.memory_hits + self.shared_hits + self.misses
+            hits = self.memory_hits + self.shared_hits
+            return {
+                'size': len(self._memory),
+                'shared_tier': self._redis is not None,
+                'memory_hits': self.memory_hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'hit_rate': (hits / lookups) if lookups else 0.0,
+                'round_trips_saved': self.round_trips_saved,
+            }
+
+    def _fill_from_shared(
+        self,
+        keys: list[str],
+        found: list[Embedding | None],
+        missing: list[int],
+        values: list[bytes | None],
+    ) -> int:
+        hits = 0
+        for i, value in zip(missing, values):
+            if value is None:
+                continue
+            found[i] = _unpack(value)
+            self._memory.set(keys[i], found[i])
+            hits += 1
+        return hits
+
+    def _record(self, memory_hits: int, shared_hits: int, misses: int) -> None:
+        with self._lock:
+            self.memory_hits += memory_hits
+            self.shared_hits += shared_hits
+            self.misses += misses
+
+
+embedding_cache = EmbeddingCache()
+
+
+class CachedEmbedding(BaseEmbedding):
+    """
+    Embedding model that consults the embedding cache before the wrapped model.
+
+    Only cache misses are sent to the provider, so a batch with a few new
+    chunks costs one request for just those chunks. Queries and documents
+    share entries, which holds for the OpenAI models where both are embedded
+    the same way. Query keys are normalized, document keys are the exact text.
+    """
+
+    dimensions: int = Field(description='The dimensions of the embedding vectors.')
+
+    _inner: BaseEmbedding = PrivateAttr()
+    _cache: EmbeddingCache = PrivateAttr()
+
+    def __init__(
+        self,
+        inner: BaseEmbedding,
+        dimensions: int,
+        cache: EmbeddingCache | None = None,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(
+            model_name=inner.model_name,
+            embed_batch_size=inner.embed_batch_size,
+            num_workers=inner.num_workers,
+            dimensions=dimensions,
+            **kwargs,
+        )
+        self._inner = inner
+        self._cache = cache or embedding_cache
+
+    @classmethod
+    def class_name(cls) -> str:
+        return 'CachedEmbedding'
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        return self._embed(
+            [query],
+            lambda texts: [self._inner._get_query_embedding(texts[0])],
+            normalize=True,
+        )[0]
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        async def fetch(texts: List[str]) -> List[Embedding]:
+            return [await self._inner._aget_query_embedding(texts[0])]
+
+        return (await self._aembed([query], fetch, normalize=True))[0]
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self._embed([text], lambda texts: [self._inner._get_text_embedding(texts[0])])[0]
+
+    async def _aget_text_embedding(self, text: str) -> Embedding:
+        async def fetch(texts: List[str]) -> List[Embedding]:
+            return [await self._inner._aget_text_embedding(texts[0])]
+
+        return (await self._aembed([text], fetch))[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        return self._embed(texts, self._inner._get_text_embeddings)
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        return await self._aembed(texts, self._inner._aget_text_embeddings)
+
+    def _keys(self, texts: List[str], normalize: bool) -> list[str]:
+        return [EmbeddingCache.make_key(self.model_name, self.dimensions, text, normalize) for text in texts]
+
+    def _embed(
+        self,
+        texts: List[str],
+        fetch: Callable[[List[str]], List[Embedding]],
+        normalize: bool = False,
+    ) -> List[Embedding]:
+        keys = self._keys(texts, normalize)
+        found = self._cache.get_many(keys)
+        missing = [i for i, embedding in enumerate(found) if embedding is None]
+        if not missing:
+            self._cache.record_saved_round_trip()
+            return found
+
+        fetched = fetch([texts[i] for i in missing])
+        for i, embedding in zip(missing, fetched):
+            found[i] = embedding
+        self._cache.set_many({keys[i]: found[i] for i in missing})
+        return found
+
+    async def _aembed(
+        self,
+        texts: List[str],
+        fetch: Callable[[List[str]], Awaitable[List[Embedding]]],
+        normalize: bool = False,
+    ) -> List[Embedding]:
+        keys = self._keys(texts, normalize)
+        found = await self._cache.aget_many(keys)
+        missing = [i for i, embedding in enumerate(found) if embedding is None]
+        if not missing:
+            self._cache.record_saved_round_trip()
+            return found
+
+        fetched = await fetch([texts[i] for i in missing])
+        for i, embedding in zip(missing, fetched):
+            found[i] = embedding
+        await self._cache.aset_many({keys[i]: found[i] for i in missing})
+        return found
+
+
+def _pack(embedding: Embedding) -> bytes:
+    return array('f', embedding).tobytes()
+
+
+def _unpack(value: bytes) -> Embedding:
+    return array('f', value).tolist()
@@ -3,6 +3,7 @@ from llama_index.core.base.embeddings.base import BaseEmbedding
 import os
 from llama_index.embeddings.openai import OpenAIEmbedding
 from app.schemas.chatbot_settings import EmbeddingModel
+from app.services.rag.embedding_cache import CachedEmbedding
 
 class EmbeddingsService:
     
@@ -12,13 +13,24 @@ class EmbeddingsService:
             api_key = os.getenv("OPENAI_API_KEY")
 
             if em_settings.name == "text-embedding-ada-002":
-                return OpenAIEmbedding(api_key=api_key, model="text-embedding-ada-002")
+                model = OpenAIEmbedding(api_key=api_key, model="text-embedding-ada-002")
             elif em_settings.name == "text-embedding-3-large":
-                return OpenAIEmbedding(api_key=api_key, model="text-embedding-3-large")
+                model = OpenAIEmbedding(
+                    api_key=api_key,
+                    model="text-embedding-3-large",
+                    dimensions=em_settings.dimensions
+                )
             elif em_settings.name == "text-embedding-3-small":
-                return OpenAIEmbedding(api_key=api_key, model="text-embedding-3-small")
+                model = OpenAIEmbedding(
+                    api_key=api_key,
+                    model="text-embedding-3-small",
+                    dimensions=em_settings.dimensions
+                )
             else:
                 raise ValueError("Invalid embedding model")
+
+            # serve repeated queries and chunks from the embedding cache
+            return CachedEmbedding(model, dimensions=em_settings.dimensions)
         
         else:
             raise ValueError("Invalid embedding model")
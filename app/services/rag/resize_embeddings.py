@@ -0,0 +1,110 @@
+"""
+Change the embedding dimensions of existing chatbots.
+
+Shortening text-embedding-3 embeddings is done in place by truncating and
+re-normalizing the stored vectors, without calling the embedding API:
+
+    python -m app.services.rag.resize_embeddings --dimensions 1024 <chatbot id> ...
+
+Growing the dimensions (or `--reembed`) recreates the chatbot's vector table
+and marks its documents and dialogues for sync, so they are embedded again
+by the sync workers. The chatbot answers from an empty knowledge base until
+that has finished.
+"""
+import argparse
+import asyncio
+import logging
+import uuid
+
+from sqlalchemy import select, update
+
+from app.core.invalidation import CHATBOT, invalidation_bus
+from app.db.client import async_session_factory
+from app.models.chatbot import Chatbot
+from app.models.dialogue import Dialogue, SyncStatus as DialogueSyncStatus
+from app.models.document import Document, SyncStatus as DocumentSyncStatus
+from app.schemas.chatbot_settings import SHORTENABLE_EMBEDDING_MODELS, ChatbotSettings
+from app.services.chatbot import ChatbotService
+from app.services.rag.vectorstore import VectorStoreService
+
+logger = logging.getLogger(__name__)
+
+
+async def resize_embeddings(chatbot_id: uuid.UUID, dimensions: int, reembed: bool = False) -> None:
+    chatbot = await ChatbotService.afind_by_id(chatbot_id)
+    if not chatbot:
+        raise ValueError(f'chatbot {chatbot_id} not found')
+
+    current = ChatbotSettings.model_validate(chatbot.settings)
+    current_dimensions = current.embedding_model.dimensions
+    # validates the new size against the model and the vector index
+    settings = ChatbotSettings.model_validate({
+        **current.model_dump(),
+        'embedding_model': {**current.embedding_model.model_dump(), 'dimensions': dimensions},
+    })
+    if dimensions == current_dimensions and not reembed:
+        logger.info(f'chatbot {chatbot_id} already uses {dimensions} dimensions')
+        return
+
+    table_name = str(chatbot_id)
+    shorten = (
+        not reembed
+        and dimensions < current_dimensions
+        and settings.embedding_model.name in SHORTENABLE_EMBEDDING_MODELS
+    )
+    if shorten:
+        await VectorStoreService.shorten_embeddings(table_name, dimensions, settings.vector_index)
+        await ChatbotService.update_settings(chatbot_id, settings)
+        logger.info(f'shortened embeddings of chatbot {chatbot_id} to {dimensions} dimensions')
+        return
+
+    await VectorStoreService.drop_vector_store(table_name)
+    await ChatbotService.update_settings(chatbot_id, settings)
+    await VectorStoreService.create_vector_store(
+        table_name=table_name,
+        embed_dim=dimensions,
+        vector_index=settings.vector_index,
+        retrieval=settings.retrieval,
+    )
+    async with async_session_factory() as session:
+        await session.execute(
+            update(Document)
+            .where(Document.chatbot_id == chatbot_id)
+            .values(sync_status=DocumentSyncStatus.NA, sync_msg='', claimed_at=None)
+        )
+        await session.execute(
+            update(Dialogue)
+            .where(Dialogue.chatbot_id == chatbot_id)
+            .values(sync_status=DialogueSyncStatus.NA, sync_msg='', claimed_at=None)
+        )
+        await session.execute(ChatbotService.bump_knowledge_version(chatbot_id))
+        await session.commit()
+    await invalidation_bus.apublish(CHATBOT, chatbot_id)
+    logger.info(f'recreated vector table of chatbot {chatbot_id} with {dimensions} dimensions, queued for sync')
+
+
+async def resize_all(chatbot_ids: list[uuid.UUID], dimensions: int, reembed: bool) -> None:
+    if not chatbot_ids:
+        async with async_session_factory() as session:
+            chatbot_ids = list((await session.execute(select(Chatbot.id))).scalars().all())
+
+    for chatbot_id in chatbot_ids:
+        try:
+            await resize_embeddings(chatbot_id, dimensions, reembed)
+        except Exception as e:
+            logger.error(f'failed to resize embeddings of chatbot {chatbot_id}: {e}')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Change the embedding dimensions of chatbots.')
+    parser.add_argument('chatbot_ids', nargs='*', type=uuid.UUID, help='chatbots to resize, all when omitted')
+    parser.add_argument('--dimensions', type=int, required=True, help='new embedding dimensions')
+    parser.add_argument('--reembed', action='store_true', help='embed documents again instead of shortening')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(resize_all(args.chatbot_ids, args.dimensions, args.reembed))
+
+
+if __name__ == '__main__':
+    main()
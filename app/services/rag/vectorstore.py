@@ -1,46 +1,391 @@
-from typing import Any
+import asyncio
+import logging
+from typing import Any, List, Optional
+from llama_index.core.vector_stores.types import MetadataFilters, VectorStoreQuery
 from llama_index.vector_stores.postgres import PGVectorStore
-import os
+from llama_index.vector_stores.postgres.base import DBEmbeddingRow
+from pydantic import PrivateAttr
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
 
-from pydantic import BaseModel
+from app.db.client import (
+    DATABASE_URL,
+    SYNC_DATABASE_URL,
+    vector_store_engine,
+    vector_store_sync_engine,
+)
+from app.schemas.chatbot_settings import RetrievalSettings, VectorIndexSettings
 
-DB_HOST = os.getenv('DB_HOST')
-DB_PORT = os.getenv('DB_PORT')
-DB_USER = os.getenv('DB_USER')
-DB_PASSWORD = os.getenv('DB_PASSWORD')
-DB_NAME = os.getenv('DB_NAME')
+logger = logging.getLogger(__name__)
+
+SCHEMA_NAME = 'public'
+
+
+class SharedEnginePGVectorStore(PGVectorStore):
+    """
+    PGVectorStore that runs on the process-wide vector store engines.
+
+    The stock store creates a sync and an async engine per instance; with one
+    table per chatbot that means a pair of pools per request. This subclass
+    reuses the engines from `app.db.client` for every table instead.
+
+    Index search parameters (`hnsw.ef_search`, `ivfflat.probes`) are applied
+    with SET LOCAL so they never leak to other queries on a pooled connection.
+    Hybrid queries fuse the vector and full-text results by reciprocal rank
+    instead of the stock concatenation, which ignores the full-text ranking.
+    """
+
+    _search_parameters: dict[str, int] = PrivateAttr(default_factory=dict)
+    _rrf_k: int = PrivateAttr(default=60)
+
+    def __init__(
+        self,
+        *args: Any,
+        search_parameters: dict[str, int] | None = None,
+        rrf_k: int = 60,
+        **kwargs: Any
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self._search_parameters = search_parameters or {}
+        self._rrf_k = rrf_k
+
+    def _connect(self) -> Any:
+        self._engine = vector_store_sync_engine
+        self._session = sessionmaker(vector_store_sync_engine)
+        self._async_engine = vector_store_engine
+        self._async_session = sessionmaker(vector_store_engine, class_=AsyncSession)
+
+    async def close(self) -> None:
+        # the engines are shared with every other store and disposed on shutdown
+        return None
+
+    def _search_statements(self) -> list[Any]:
+        return [text(f'SET LOCAL {name} = {int(value)}') for name, value in self._search_parameters.items()]
+
+    def _query_with_score(
+        self,
+        embedding: Optional[List[float]],
+        limit: int = 10,
+        metadata_filters: Optional[MetadataFilters] = None,
+        **kwargs: Any,
+    ) -> List[DBEmbeddingRow]:
+        stmt = self._build_query(embedding, limit, metadata_filters)
+        with self._session() as session, session.begin():
+            for statement in self._search_statements():
+                session.execute(statement)
+            res = session.execute(stmt)
+            return _to_rows(res.all())
+
+    async def _aquery_with_score(
+        self,
+        embedding: Optional[List[float]],
+        limit: int = 10,
+        metadata_filters: Optional[MetadataFilters] = None,
+        **kwargs: Any,
+    ) -> List[DBEmbeddingRow]:
+        stmt = self._build_query(embedding, limit, metadata_filters)
+        async with self._async_session() as async_session, async_session.begin():
+            for statement in self._search_statements():
+                await async_session.execute(statement)
+            res = await async_session.execute(stmt)
+            return _to_rows(res.all())
+
+    def _hybrid_query(self, query: VectorStoreQuery, **kwargs: Any) -> List[DBEmbeddingRow]:
+        dense_results = self._query_with_score(
+            query.query_embedding,
+            query.similarity_top_k,
+            query.filters,
+            **kwargs,
+        )
+        sparse_results = self._sparse_query_with_rank(
+            query.query_str,
+            query.sparse_top_k or query.similarity_top_k,
+            query.filters,
+        )
+        fused = reciprocal_rank_fusion([dense_results, sparse_results], self._rrf_k)
+        return fused[:query.hybrid_top_k or query.similarity_top_k]
+
+    async def _async_hybrid_query(self, query: VectorStoreQuery, **kwargs: Any) -> List[DBEmbeddingRow]:
+        dense_results, sparse_results = await asyncio.gather(
+            self._aquery_with_score(
+                query.query_embedding,
+                query.similarity_top_k,
+                query.filters,
+                **kwargs,
+            ),
+            self._async_sparse_query_with_rank(
+                query.query_str,
+                query.sparse_top_k or query.similarity_top_k,
+                query.filters,
+            ),
+        )
+        fused = reciprocal_rank_fusion([dense_results, sparse_results], self._rrf_k)
+        return fused[:query.hybrid_top_k or query.similarity_top_k]
+
+
+def reciprocal_rank_fusion(result_lists: list[List[DBEmbeddingRow]], k: int = 60) -> List[DBEmbeddingRow]:
+    """
+    Merge ranked result lists by reciprocal rank fusion.
+
+    Each row scores the sum of 1 / (k + rank) over the lists it appears in,
+    so rows ranked well by several searches come first without having to
+    compare cosine similarities with full-text ranks. The fused score is
+    returned as the row's similarity.
+    """
+    scores: dict[str, float] = {}
+    rows: dict[str, DBEmbeddingRow] = {}
+    for results in result_lists:
+        for rank, row in enumerate(results, start=1):
+            scores[row.node_id] = scores.get(row.node_id, 0.0) + 1.0 / (k + rank)
+            rows.setdefault(row.node_id, row)
+
+    ranked = sorted(scores, key=scores.__getitem__, reverse=True)
+    return [
+        DBEmbeddingRow(
+            node_id=node_id,
+            text=rows[node_id].text,
+            metadata=rows[node_id].metadata,
+            similarity=scores[node_id],
+        )
+        for node_id in ranked
+    ]
+
+
+def _to_rows(items: list[Any]) -> List[DBEmbeddingRow]:
+    return [
+        DBEmbeddingRow(
+            node_id=item.node_id,
+            text=item.text,
+            metadata=item.metadata_,
+            similarity=(1 - item.distance) if item.distance is not None else 0,
+        )
+        for item in items
+    ]
 
 
 class VectorStoreService:
-    
+
     @staticmethod
-    def get_vector_store(table_name: str, embed_dim: int, **kwargs: Any) -> PGVectorStore:
-        vector_store = PGVectorStore.from_params(
-            host=DB_HOST,
-            port=DB_PORT,
-            database=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD,
+    def get_vector_store(
+        table_name: str,
+        embed_dim: int,
+        vector_index: VectorIndexSettings | None = None,
+        retrieval: RetrievalSettings | None = None,
+        **kwargs: Any
+    ) -> PGVectorStore:
+        vector_index = vector_index or VectorIndexSettings()
+        retrieval = retrieval or RetrievalSettings()
+        vector_store = SharedEnginePGVectorStore(
+            connection_string=SYNC_DATABASE_URL,
+            async_connection_string=DATABASE_URL,
             table_name=table_name,
+            schema_name=SCHEMA_NAME,
             perform_setup=False,
             embed_dim=embed_dim,
+            use_halfvec=vector_index.use_halfvec(embed_dim),
+            hybrid_search=retrieval.mode == 'hybrid',
+            text_search_config=retrieval.text_search_config,
+            search_parameters=vector_index.search_parameters(),
+            rrf_k=retrieval.rrf_k,
             **kwargs
         )
 
         return vector_store
-    
+
     @staticmethod
-    async def create_vector_store(table_name: str, embed_dim: int, **kwargs: Any) -> None:
-        vector_store = PGVectorStore.from_params(
-            host=DB_HOST,
-            port=DB_PORT,
-            database=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD,
+    async def create_vector_store(
+        table_name: str,
+        embed_dim: int,
+        vector_index: VectorIndexSettings | None = None,
+        retrieval: RetrievalSettings | None = None,
+        **kwargs: Any
+    ) -> None:
+        vector_index = vector_index or VectorIndexSettings()
+        retrieval = retrieval or RetrievalSettings()
+        vector_store = SharedEnginePGVectorStore(
+            connection_string=SYNC_DATABASE_URL,
+            async_connection_string=DATABASE_URL,
             table_name=table_name,
+            schema_name=SCHEMA_NAME,
             perform_setup=True,
             embed_dim=embed_dim,
+            use_halfvec=vector_index.use_halfvec(embed_dim),
+            # the full-text column is always created so that chatbots can
+            # switch to hybrid retrieval without a migration
+            hybrid_search=True,
+            text_search_config=retrieval.text_search_config,
             **kwargs
         )
         vector_store._initialize()
+        # ivfflat picks its list centroids from existing rows, so it is only
+        # built once the table has data
+        if vector_index.type == 'hnsw':
+            await VectorStoreService.build_index(table_name, embed_dim, vector_index)
         await vector_store.close()
+
+    @staticmethod
+    async def build_index(
+        table_name: str,
+        embed_dim: int,
+        vector_index: VectorIndexSettings,
+        rebuild: bool = False,
+    ) -> None:
+        """
+        Bring the ANN index of an existing vector table in line with `vector_index`.
+
+        Converts the embedding column between `vector` and `halfvec` when the
+        storage type changed and drops an index built with other parameters
+        (or any index when `rebuild` is set), then creates the index. It is built
+        CONCURRENTLY so the table stays writable, which can take a while on
+        large tables.
+        """
+        table = _table_name(table_name)
+        index = _index_name(table_name)
+        use_halfvec = vector_index.use_halfvec(embed_dim)
+        column_type = _column_type(embed_dim, use_halfvec)
+
+        async with vector_store_engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level='AUTOCOMMIT')
+            current_type = await conn.scalar(
+                text(
+                    'SELECT format_type(a.atttypid, a.atttypmod) '
+                    'FROM pg_attribute a '
+                    'WHERE a.attrelid = CAST(:table AS regclass) AND a.attname = :column'
+                ),
+                {'table': f'"{SCHEMA_NAME}".{table}', 'column': 'embedding'},
+            )
+            if current_type != column_type:
+                logger.info(f'converting {table} embeddings from {current_type} to {column_type}')
+                await conn.execute(text(f'DROP INDEX IF EXISTS "{SCHEMA_NAME}".{index}'))
+                await conn.execute(text(
+                    f'ALTER TABLE "{SCHEMA_NAME}".{table} ALTER COLUMN embedding '
+                    f'TYPE {column_type} USING embedding::{column_type}'
+                ))
+            else:
+                indexdef = await conn.scalar(
+                    text('SELECT indexdef FROM pg_indexes WHERE schemaname = :schema AND indexname = :index'),
+                    {'schema': SCHEMA_NAME, 'index': index.strip('"')},
+                )
+                if indexdef is not None and (rebuild or not _index_matches(indexdef, vector_index, use_halfvec)):
+                    logger.info(f'dropping outdated index on {table}')
+                    await conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{SCHEMA_NAME}".{index}'))
+
+            statement = _create_index_statement(table, index, vector_index, use_halfvec)
+            if statement is not None:
+                logger.info(f'building {vector_index.type} index on {table}')
+                await conn.execute(text(statement))
+
+    @staticmethod
+    async def shorten_embeddings(
+        table_name: str,
+        embed_dim: int,
+        vector_index: VectorIndexSettings,
+    ) -> None:
+        """
+        Shorten the stored embeddings of a vector table to `embed_dim` in place.
+
+        Only valid for models trained for shortening (text-embedding-3), whose
+        shortened embeddings are the leading dimensions re-normalized to unit
+        length, i.e. what the API returns when asked for fewer dimensions.
+        """
+        table = _table_name(table_name)
+        column_type = _column_type(embed_dim, vector_index.use_halfvec(embed_dim))
+
+        async with vector_store_engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level='AUTOCOMMIT')
+            await conn.execute(text(f'DROP INDEX IF EXISTS "{SCHEMA_NAME}".{_index_name(table_name)}'))
+            logger.info(f'shortening {table} embeddings to {column_type}')
+            await conn.execute(text(
+                f'ALTER TABLE "{SCHEMA_NAME}".{table} ALTER COLUMN embedding TYPE {column_type} '
+                f'USING l2_normalize(subvector(embedding, 1, {embed_dim}))::{column_type}'
+            ))
+        await VectorStoreService.build_index(table_name, embed_dim, vector_index)
+
+    @staticmethod
+    async def ensure_text_search(table_name: str, text_search_config: str) -> None:
+        """
+        Add the full-text search column and its GIN index to an existing vector table.
+
+        Tables created before hybrid retrieval was supported lack both. The
+        column is recreated if it was generated with another text search
+        configuration.
+        """
+        table = _table_name(table_name)
+        expression = f"to_tsvector('{text_search_config}'::regconfig, (text)::text)"
+
+        async with vector_store_engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level='AUTOCOMMIT')
+            current = await conn.scalar(
+                text(
+                    'SELECT pg_get_expr(d.adbin, d.adrelid) '
+                    'FROM pg_attrdef d JOIN pg_attribute a '
+                    'ON a.attrelid = d.adrelid AND a.attnum = d.adnum '
+                    'WHERE d.adrelid = CAST(:table AS regclass) AND a.attname = :column'
+                ),
+                {'table': f'"{SCHEMA_NAME}".{table}', 'column': 'text_search_tsv'},
+            )
+            # pg_get_expr renders the generated column the way `expression` is written
+            if current != expression:
+                if current is not None:
+                    logger.info(f'dropping full-text column of {table} generated with another configuration')
+                    await conn.execute(text(f'ALTER TABLE "{SCHEMA_NAME}".{table} DROP COLUMN text_search_tsv'))
+                logger.info(f'adding full-text column to {table}')
+                await conn.execute(text(
+                    f'ALTER TABLE "{SCHEMA_NAME}".{table} ADD COLUMN text_search_tsv tsvector '
+                    f"GENERATED ALWAYS AS (to_tsvector('{text_search_config}', text)) STORED"
+                ))
+            # named like the index PGVectorStore creates for hybrid tables
+            await conn.execute(text(
+                f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{table_name.lower()}_idx" '
+                f'ON "{SCHEMA_NAME}".{table} USING gin (text_search_tsv)'
+            ))
+
+    @staticmethod
+    async def drop_vector_store(table_name: str) -> None:
+        async with vector_store_engine.begin() as conn:
+            await conn.execute(text(f'DROP TABLE IF EXISTS "{SCHEMA_NAME}".{_table_name(table_name)}'))
+
+
+def _column_type(embed_dim: int, use_halfvec: bool) -> str:
+    return f'halfvec({embed_dim})' if use_halfvec else f'vector({embed_dim})'
+
+
+def _table_name(table_name: str) -> str:
+    # PGVectorStore lowercases the name and prefixes it with `data_`
+    return f'"data_{table_name.lower()}"'
+
+
+def _index_name(table_name: str) -> str:
+    return f'"data_{table_name.lower()}_embedding_idx"'
+
+
+def _operator_class(use_halfvec: bool) -> str:
+    return 'halfvec_cosine_ops' if use_halfvec else 'vector_cosine_ops'
+
+
+def _index_matches(indexdef: str, vector_index: VectorIndexSettings, use_halfvec: bool) -> bool:
+    """Whether an index definition from pg_indexes was built from these settings."""
+    if f'USING {vector_index.type} (embedding {_operator_class(use_halfvec)})' not in indexdef:
+        return False
+    if vector_index.type == 'hnsw':
+        return f"m='{vector_index.m}'" in indexdef and f"ef_construction='{vector_index.ef_construction}'" in indexdef
+    return f"lists='{vector_index.lists}'" in indexdef
+
+
+def _create_index_statement(
+    table: str,
+    index: str,
+    vector_index: VectorIndexSettings,
+    use_halfvec: bool,
+) -> str | None:
+    ops = _operator_class(use_halfvec)
+    prefix = f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {index} ON "{SCHEMA_NAME}".{table}'
+    if vector_index.type == 'hnsw':
+        return (
+            f'{prefix} USING hnsw (embedding {ops}) '
+            f'WITH (m = {vector_index.m}, ef_construction = {vector_index.ef_construction})'
+        )
+    if vector_index.type == 'ivfflat':
+        return f'{prefix} USING ivfflat (embedding {ops}) WITH (lists = {vector_index.lists})'
+    return None
@@ -1,7 +1,10 @@
+import os
 import uuid
 from typing import Any
 from pydantic import BaseModel
 
+from app.core.cache import TTLCache
+from app.core.invalidation import CHATBOT, by_chatbot_id, invalidation_bus
 from app.services.chatbot import ChatbotService
 from llama_index.core import VectorStoreIndex
 from app.services.rag.embeddings import EmbeddingsService
@@ -11,34 +14,77 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+VSI_CACHE_MAX_SIZE = int(os.getenv('VSI_CACHE_MAX_SIZE', '256'))
+VSI_CACHE_TTL_SECONDS = float(os.getenv('VSI_CACHE_TTL_SECONDS', '900'))
+
+# Process-wide cache of ready-to-query indexes, keyed by (chatbot id, settings version)
+_vsi_cache: TTLCache[tuple[uuid.UUID, str], VectorStoreIndex] = TTLCache(
+    maxsize=VSI_CACHE_MAX_SIZE,
+    ttl=VSI_CACHE_TTL_SECONDS,
+)
+
 
 class VsiService(BaseModel):
-    
+
     @staticmethod
-    def get_vsi(chatbot_id: uuid.UUID, **kwargs: Any) -> VectorStoreIndex:
+    async def aget_vsi(
+        chatbot_id: uuid.UUID,
+        chatbot_settings: ChatbotSettings | None = None,
+        **kwargs: Any
+    ) -> VectorStoreIndex:
+        """
+        Get the vector store index for a chatbot, building it on first use.
+
+        Pass `chatbot_settings` when the caller already has them to skip the
+        chatbot lookup entirely.
+        """
         try:
-            
-            chatbot = ChatbotService.find_by_id(chatbot_id)
-            if not chatbot:
-                raise ValueError("Chatbot not found")
+            if chatbot_settings is None:
+                chatbot = await ChatbotService.aget_cached(chatbot_id)
+                if not chatbot:
+                    raise ValueError("Chatbot not found")
+                chatbot_settings = chatbot.settings
+
+            cache_key = (chatbot_id, chatbot_settings.version)
+            vsi = _vsi_cache.get(cache_key)
+            if vsi is not None:
+                logger.debug('vsi cache hit for chatbot')
+                return vsi
 
             # get the embedding model
-            chatbot_settings = ChatbotSettings.model_validate(chatbot.settings)
             embedding_model = EmbeddingsService.get_embedding_model(chatbot_settings.embedding_model)
             logger.debug('embedding model found for chatbot')
-            
+
             vector_store = VectorStoreService.get_vector_store(
                 table_name=f'{str(chatbot_id)}',
-                embed_dim=chatbot_settings.embedding_model.dimensions
+                embed_dim=chatbot_settings.embedding_model.dimensions,
+                vector_index=chatbot_settings.vector_index,
+                retrieval=chatbot_settings.retrieval
             )
             logger.debug('vector store gotten for chatbot')
-            
+
             vsi = VectorStoreIndex.from_vector_store(
                 vector_store=vector_store,
                 embed_model=embedding_model
             )
             logger.debug('vsi created for chatbot')
+
+            # drop indexes built from older settings before caching the new one
+            VsiService.invalidate(chatbot_id)
+            _vsi_cache.set(cache_key, vsi)
             return vsi
         except Exception as e:
-            logger.error(f'error in get_vsi: {e}')
+            logger.error(f'error in aget_vsi: {e}')
             raise e
+
+    @staticmethod
+    def invalidate(chatbot_id: uuid.UUID) -> None:
+        """Drop every cached index for the chatbot, e.g. after its settings change."""
+        _vsi_cache.invalidate_where(lambda key: key[0] == chatbot_id)
+
+    @staticmethod
+    def cache_stats() -> dict[str, Any]:
+        return _vsi_cache.stats()
+
+
+invalidation_bus.subscribe(CHATBOT, by_chatbot_id(VsiService.invalidate, _vsi_cache.clear))
@@ -1,36 +1,193 @@
+import asyncio
+import hashlib
 import os
+import threading
+from typing import Any
 import boto3
 import logging
 from fastapi import UploadFile
+from botocore.config import Config
 from botocore.exceptions import ClientError
+from app.core.cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
 # Get S3 configuration from environment variables
 S3_BUCKET_NAME = os.getenv('S3_BUCKET_NAME')
 S3_REGION = os.getenv('AWS_REGION')
+# Connections of the shared client, enough for concurrent part uploads and downloads
+S3_MAX_POOL_CONNECTIONS = int(os.getenv('S3_MAX_POOL_CONNECTIONS', '50'))
+
+# Presigned GET URLs are reused for this long, so they stay valid for at
+# least their expiry minus this
+S3_PRESIGNED_URL_CACHE_TTL_SECONDS = float(os.getenv('S3_PRESIGNED_URL_CACHE_TTL_SECONDS', '300'))
+S3_PRESIGNED_URL_CACHE_MAX_SIZE = int(os.getenv('S3_PRESIGNED_URL_CACHE_MAX_SIZE', '1024'))
+
+# Uploads are streamed to S3 in parts of this size (S3 requires at least 5 MiB)
+S3_UPLOAD_PART_SIZE = max(int(os.getenv('S3_UPLOAD_PART_SIZE', str(8 * 1024 * 1024))), 5 * 1024 * 1024)
+# Parts uploaded at once per file, which also bounds the memory held per upload
+S3_UPLOAD_MAX_CONCURRENT_PARTS = int(os.getenv('S3_UPLOAD_MAX_CONCURRENT_PARTS', '4'))
+S3_UPLOAD_MAX_BYTES = int(os.getenv('S3_UPLOAD_MAX_BYTES', str(100 * 1024 * 1024)))
+# Validity of the presigned POSTs for direct uploads from clients
+S3_UPLOAD_URL_EXPIRY = int(os.getenv('S3_UPLOAD_URL_EXPIRY', '900'))
+
+
+class FileTooLargeError(Exception):
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        super().__init__(f'File exceeds the maximum upload size of {max_bytes} bytes')
+
+
+# boto3 clients are thread-safe, one is shared by the process
+_s3_client = None
+_s3_client_lock = threading.Lock()
+
+# Keyed by (object key, expiry)
+_presigned_url_cache: TTLCache[tuple[str, int], str] = TTLCache(
+    maxsize=S3_PRESIGNED_URL_CACHE_MAX_SIZE,
+    ttl=S3_PRESIGNED_URL_CACHE_TTL_SECONDS,
+)
 
 
 class S3Service:
     @classmethod
     def get_s3_client(cls):
-        """Get a boto3 S3 client with the configured AWS region."""
-        return boto3.client('s3', region_name=S3_REGION)
+        """Get the process-wide boto3 S3 client with the configured AWS region."""
+        global _s3_client
+        if _s3_client is None:
+            with _s3_client_lock:
+                if _s3_client is None:
+                    _s3_client = boto3.client(
+                        's3',
+                        region_name=S3_REGION,
+                        config=Config(max_pool_connections=S3_MAX_POOL_CONNECTIONS),
+                    )
+        return _s3_client
     
     @classmethod
-    async def upload_file(cls, file: UploadFile, key: str) -> None:
-        content = await file.read()
-        
+    async def upload_file(cls, file: UploadFile, key: str, max_bytes: int = S3_UPLOAD_MAX_BYTES) -> str:
+        """
+        Stream the file to S3 and return the SHA-256 hex digest of its content.
+
+        The file is read in parts and hashed as it is read. Files larger than
+        one part go through a multipart upload whose parts are uploaded
+        concurrently in threads, so at most a few parts are held in memory.
+
+        Raises:
+            FileTooLargeError: the file is larger than `max_bytes`; nothing
+                is left in the bucket
+        """
+        content_type = file.content_type or 'application/octet-stream'
+        content_hash = hashlib.sha256()
+        size = 0
         s3_client = cls.get_s3_client()
-        s3_client.put_object(
+
+        async def read_part() -> bytes:
+            nonlocal size
+            chunk = await file.read(S3_UPLOAD_PART_SIZE)
+            size += len(chunk)
+            if size > max_bytes:
+                raise FileTooLargeError(max_bytes)
+            content_hash.update(chunk)
+            return chunk
+
+        first = await read_part()
+        second = await read_part()
+        if not second:
+            await asyncio.to_thread(
+                s3_client.put_object,
+                Bucket=S3_BUCKET_NAME,
+                Key=key,
+                Body=first,
+                ContentType=content_type
+            )
+            return content_hash.hexdigest()
+
+        upload = await asyncio.to_thread(
+            s3_client.create_multipart_upload,
             Bucket=S3_BUCKET_NAME,
             Key=key,
-            Body=content,
-            ContentType=file.content_type or 'application/octet-stream'
+            ContentType=content_type
         )
+        upload_id = upload['UploadId']
+        semaphore = asyncio.Semaphore(S3_UPLOAD_MAX_CONCURRENT_PARTS)
+        tasks: list[asyncio.Task] = []
+
+        async def upload_part(part_number: int, body: bytes) -> dict:
+            try:
+                response = await asyncio.to_thread(
+                    s3_client.upload_part,
+                    Bucket=S3_BUCKET_NAME,
+                    Key=key,
+                    UploadId=upload_id,
+                    PartNumber=part_number,
+                    Body=body
+                )
+                return {'PartNumber': part_number, 'ETag': response['ETag']}
+            finally:
+                semaphore.release()
+
+        async def schedule(body: bytes) -> None:
+            # wait for a free slot first, so reading does not outrun the uploads
+            await semaphore.acquire()
+            tasks.append(asyncio.create_task(upload_part(len(tasks) + 1, body)))
+
+        try:
+            await schedule(first)
+            await schedule(second)
+            del first, second
+            while chunk := await read_part():
+                await schedule(chunk)
+
+            parts = await asyncio.gather(*tasks)
+            await asyncio.to_thread(
+                s3_client.complete_multipart_upload,
+                Bucket=S3_BUCKET_NAME,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={'Parts': parts}
+            )
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await asyncio.to_thread(
+                s3_client.abort_multipart_upload,
+                Bucket=S3_BUCKET_NAME,
+                Key=key,
+                UploadId=upload_id
+            )
+            raise
+
+        return content_hash.hexdigest()
         
     @classmethod
     def generate_presigned_url(cls, object_key: str, expiry: int = 3600) -> str:
+        """
+        Generate a pre-signed GET URL, reusing a recent one for the same object.
+
+        URLs are only cached when `expiry` is at least twice the cache TTL,
+        so a cached URL always has most of its validity left.
+        """
+        return cls._cached_presigned_url(object_key, expiry) or cls._sign_url(object_key, expiry)
+
+    @classmethod
+    async def agenerate_presigned_url(cls, object_key: str, expiry: int = 3600) -> str:
+        """Generate a pre-signed URL without blocking the event loop on boto3."""
+        # cache hits are answered on the loop, without a thread hop
+        url = cls._cached_presigned_url(object_key, expiry)
+        if url is not None:
+            return url
+        return await asyncio.to_thread(cls._sign_url, object_key, expiry)
+
+    @classmethod
+    def _cached_presigned_url(cls, object_key: str, expiry: int) -> str | None:
+        if expiry < 2 * S3_PRESIGNED_URL_CACHE_TTL_SECONDS:
+            return None
+        return _presigned_url_cache.get((object_key, expiry))
+
+    @classmethod
+    def _sign_url(cls, object_key: str, expiry: int) -> str:
         try:
             s3_client = cls.get_s3_client()
             url = s3_client.generate_presigned_url(
@@ -41,6 +198,8 @@ class S3Service:
                 },
                 ExpiresIn=expiry
             )
+            if expiry >= 2 * S3_PRESIGNED_URL_CACHE_TTL_SECONDS:
+                _presigned_url_cache.set((object_key, expiry), url)
             return url
         except ClientError as e:
             logger.exception(f"Error generating pre-signed URL: {e}")
@@ -48,3 +207,76 @@ class S3Service:
         except Exception as e:
             logger.exception(f"Unexpected error generating pre-signed URL: {e}")
             raise
+
+    @classmethod
+    def cache_stats(cls) -> dict[str, Any]:
+        return _presigned_url_cache.stats()
+
+    @classmethod
+    async def adownload_file(cls, object_key: str) -> bytes:
+        """Download an object without blocking the event loop on boto3."""
+        def download() -> bytes:
+            response = cls.get_s3_client().get_object(Bucket=S3_BUCKET_NAME, Key=object_key)
+            return response['Body'].read()
+
+        return await asyncio.to_thread(download)
+
+    @classmethod
+    def generate_presigned_post(
+        cls,
+        key: str,
+        content_type: str,
+        max_bytes: int = S3_UPLOAD_MAX_BYTES,
+        expiry: int = S3_UPLOAD_URL_EXPIRY,
+    ) -> dict:
+        """
+        Generate a presigned POST for uploading a file directly to S3.
+
+        S3 rejects uploads to another key, with another content type or
+        larger than `max_bytes`.
+
+        Returns:
+            The `url` to post to and the form `fields` to send with the file
+        """
+        s3_client = cls.get_s3_client()
+        return s3_client.generate_presigned_post(
+            Bucket=S3_BUCKET_NAME,
+            Key=key,
+            Fields={'Content-Type': content_type},
+            Conditions=[
+                {'Content-Type': content_type},
+                ['content-length-range', 1, max_bytes],
+            ],
+            ExpiresIn=expiry
+        )
+
+    @classmethod
+    async def agenerate_presigned_post(cls, key: str, content_type: str, max_bytes: int = S3_UPLOAD_MAX_BYTES) -> dict:
+        return await asyncio.to_thread(cls.generate_presigned_post, key, content_type, max_bytes)
+
+    @classmethod
+    async def ahead_object(cls, object_key: str) -> dict | None:
+        """Get the metadata of an object, None if it does not exist."""
+        def head() -> dict | None:
+            try:
+                return cls.get_s3_client().head_object(Bucket=S3_BUCKET_NAME, Key=object_key)
+            except ClientError as e:
+                if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                    return None
+                raise
+
+        return await asyncio.to_thread(head)
+
+    @classmethod
+    async def adelete_files(cls, object_keys: list[str]) -> None:
+        """Delete objects, in requests of at most the 1000 keys S3 accepts."""
+        def delete(keys: list[str]) -> None:
+            response = cls.get_s3_client().delete_objects(
+                Bucket=S3_BUCKET_NAME,
+                Delete={'Objects': [{'Key': key} for key in keys], 'Quiet': True},
+            )
+            for error in response.get('Errors', []):
+                logger.warning(f"Failed to delete {error.get('Key')} from S3: {error.get('Message')}")
+
+        for i in range(0, len(object_keys), 1000):
+            await asyncio.to_thread(delete, object_keys[i:i + 1000])
@@ -0,0 +1,58 @@
+import os
+from datetime import timedelta
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import func, or_, select, update
+
+from app.db.client import async_session_factory
+from app.models.dialogue import Dialogue
+from app.models.document import Document
+
+# A claimed row is not handed out again for this long; if its workflow did
+# not start (or it failed again), another scheduler picks it up after that
+SYNC_CLAIM_LEASE_SECONDS = int(os.getenv('SYNC_CLAIM_LEASE_SECONDS', '300'))
+
+# shared by the documents' and the dialogues' SyncStatus, which have the same names
+PENDING_SYNC_STATUSES = ['NA', 'FAILED']
+
+
+async def claim_pending(
+    model: type[Document] | type[Dialogue],
+    limit: int,
+    lease_seconds: int = SYNC_CLAIM_LEASE_SECONDS,
+    returning: Any = None,
+) -> list[Any]:
+    """
+    Claim up to `limit` rows waiting to be synced.
+
+    Rows are locked with SKIP LOCKED and stamped with `claimed_at` in one
+    statement, so concurrent schedulers never claim the same row. Rows whose
+    claim is older than the lease are claimable again.
+
+    Returns:
+        The `returning` column of the claimed rows, their ids by default
+    """
+    cutoff = func.now() - timedelta(seconds=lease_seconds)
+    claimable = (
+        select(model.id)
+        .where(
+            model.sync_status.in_(PENDING_SYNC_STATUSES),
+            or_(model.claimed_at.is_(None), model.claimed_at < cutoff),
+        )
+        .order_by(model.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .cte('claimable')
+    )
+    statement = (
+        update(model)
+        .where(model.id == claimable.c.id)
+        .values(claimed_at=func.now())
+        .returning(model.id if returning is None else returning)
+    )
+
+    async with async_session_factory() as session:
+        result = await session.execute(statement)
+        await session.commit()
+        return list(result.scalars().all())
@@ -16,9 +16,10 @@ from app.services.rag.embeddings import EmbeddingsService
 from app.services.rag.vectorstore import VectorStoreService
 from app.schemas.chatbot_settings import ChatbotSettings, EmbeddingModel
 
-import asyncio
 from app.temporal.client import get_client
 from app.temporal.workflows import DialogueSyncWorkflow
+from app.temporal.shared import DIALOGUE_SYNC_BATCH_SIZE, SYNC_DOCUMENT_TASK_QUEUE
+from app.tasks.drain import DrainResult, drain, run_drain, single_page
 from typing import Optional
 
 logger = logging.getLogger(__name__)
@@ -26,35 +27,41 @@ logger = logging.getLogger(__name__)
 markdown_parser = MarkdownNodeParser()
 
 
-async def process_dialogue_queue_temporal(dialogue_id: Optional[UUID] = None):
+async def process_dialogue_queue_temporal(dialogue_id: Optional[UUID] = None) -> DrainResult:
     logger.info("Scanning for dialogues to sync (Temporal)")
 
-    try:
-        if dialogue_id:
-            logger.info(f"Fetching dialogue {dialogue_id}")
-            dialogue = DialogueService.get_by_id(dialogue_id)
-            if not dialogue:
-                logger.warning(f"No dialogue found for ID: {dialogue_id}")
-                return
-            dialogues = [dialogue]
-        else:
-            dialogues = DialogueService.get_dialogues_to_sync()
-
-        client = await get_client()
-
-        for dialogue in dialogues:
-            logger.info(f"Submitting Temporal workflow for dialogue {dialogue.id}")
-            await client.start_workflow(
-                DialogueSyncWorkflow.run,
-                str(dialogue.id),
-                id=f"dialogue-sync-{dialogue.id}",
-                task_queue="sync-tasks"
-            )
-
-        logger.info(f"Queued {len(dialogues)} dialogues via Temporal")
-
-    except Exception as e:
-        logger.exception("Error while queuing dialogues with Temporal")
+    client = await get_client()
+
+    async def start(chatbot_id: UUID) -> None:
+        # signals the chatbot's running sync to rescan, or starts one
+        await client.start_workflow(
+            DialogueSyncWorkflow.run,
+            args=[chatbot_id, DIALOGUE_SYNC_BATCH_SIZE],
+            id=f"dialogue-sync-{chatbot_id}",
+            task_queue=SYNC_DOCUMENT_TASK_QUEUE,
+            start_signal='rescan'
+        )
+
+    if dialogue_id:
+        dialogue = DialogueService.get_by_id(dialogue_id)
+        if not dialogue:
+            logger.warning(f"No dialogue found for ID: {dialogue_id}")
+            return DrainResult()
+        result = await drain(single_page(dialogue.chatbot_id), start)
+    else:
+        result = await drain(DialogueService.aclaim_chatbot_ids_to_sync, start)
+
+    logger.info(
+        f"Queued dialogue syncs of {result.started} chatbots via Temporal, "
+        f"{result.failed} failed"
+    )
+    return result
+
+
+@shared_task(name="app.tasks.dialogues.process_dialogue_queue")
+def process_dialogue_queue() -> None:
+    """Start sync workflows for every dialogue waiting to be synced."""
+    run_drain(process_dialogue_queue_temporal())
 
 
 # @shared_task(
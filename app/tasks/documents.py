@@ -18,40 +18,45 @@ from app.services.rag.embeddings import EmbeddingsService
 from app.services.rag.vectorstore import VectorStoreService
 from app.schemas.chatbot_settings import ChatbotSettings, EmbeddingModel
 
-import asyncio
 from app.temporal.client import get_client
 from app.temporal.workflows import DocumentSyncWorkflow
+from app.temporal.shared import SYNC_DOCUMENT_TASK_QUEUE
+from app.tasks.drain import DrainResult, drain, run_drain, single_page
 from typing import Optional
 
 logger = logging.getLogger(__name__)
 
 markdown_parser = MarkdownNodeParser()
 
-async def process_document_queue_temporal(document_id: Optional[UUID] = None):
+async def process_document_queue_temporal(document_id: Optional[UUID] = None) -> DrainResult:
     logger.info("Scanning for documents to sync (Temporal)")
 
-    try:
-        if document_id:
-            documents = [DocumentService.get_by_id(document_id)]
-        else:
-            documents = DocumentService.get_documents_to_sync()
-
-        client = await get_client()
-
-        for document in documents:
-            logger.info(f"Submitting Temporal workflow for document {document.id}")
-            await asyncio.sleep(0.5)
-            await client.start_workflow(
-                DocumentSyncWorkflow.run,
-                str(document.id),
-                id=f"document-sync-{document.id}",
-                task_queue="sync-tasks"
-            )
+    client = await get_client()
+
+    async def start(document_id: UUID) -> None:
+        await client.start_workflow(
+            DocumentSyncWorkflow.run,
+            document_id,
+            id=f"document-sync-{document_id}",
+            task_queue=SYNC_DOCUMENT_TASK_QUEUE
+        )
 
-        logger.info(f"Queued {len(documents)} documents via Temporal")
+    if document_id:
+        result = await drain(single_page(document_id), start)
+    else:
+        result = await drain(DocumentService.aclaim_ids_to_sync, start)
 
-    except Exception as e:
-        logger.exception("Error while queuing documents with Temporal")
+    logger.info(
+        f"Queued {result.started} documents via Temporal, "
+        f"{result.already_running} already running, {result.failed} failed"
+    )
+    return result
+
+
+@shared_task(name="app.tasks.documents.process_document_queue")
+def process_document_queue() -> None:
+    """Start sync workflows for every document waiting to be synced."""
+    run_drain(process_document_queue_temporal())
 
 
 @shared_task(
@@ -116,7 +121,11 @@ def process_document(self: Task, document_id: str) -> None:
             logger.debug(f"Document chatbot settings: {document.chatbot.settings}")
             chatbot_settings = ChatbotSettings.model_validate(document.chatbot.settings)
             em_settings = EmbeddingModel.model_validate(chatbot_settings.embedding_model)
-            vector_store = VectorStoreService.get_vector_store(str(document.chatbot.id), em_settings.dimensions)
+            vector_store = VectorStoreService.get_vector_store(
+                str(document.chatbot.id),
+                em_settings.dimensions,
+                vector_index=chatbot_settings.vector_index
+            )
             logger.debug(f"Vector store gotten")
             
             doc_to_parse = LlamaIndexDocument(id_=str(doc_uuid), text=parsed_markdown)
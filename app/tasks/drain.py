@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Coroutine, TypeVar
+from uuid import UUID
+
+from temporalio.exceptions import WorkflowAlreadyStartedError
+
+from app.db.client import engine
+from app.temporal.client import reset_client
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# Ids fetched per page of the backlog
+SYNC_DRAIN_PAGE_SIZE = int(os.getenv('SYNC_DRAIN_PAGE_SIZE', '500'))
+# Workflow starts in flight at once
+SYNC_DRAIN_CONCURRENCY = int(os.getenv('SYNC_DRAIN_CONCURRENCY', '20'))
+# Workflow starts per second, 0 for no limit
+SYNC_DRAIN_RATE_PER_SECOND = float(os.getenv('SYNC_DRAIN_RATE_PER_SECOND', '50'))
+
+
+@dataclass
+class DrainResult:
+    started: int = 0
+    # a workflow with the same id is still running, e.g. queued by an earlier run
+    already_running: int = 0
+    failed: int = 0
+
+
+class RateLimiter:
+    """Spaces calls to `acquire` at least 1 / `rate` seconds apart."""
+
+    def __init__(self, rate: float) -> None:
+        self.interval = 1 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+async def drain(
+    claim: Callable[[int], Awaitable[list[UUID]]],
+    start: Callable[[UUID], Awaitable[None]],
+    page_size: int = SYNC_DRAIN_PAGE_SIZE,
+    concurrency: int = SYNC_DRAIN_CONCURRENCY,
+    rate: float = SYNC_DRAIN_RATE_PER_SECOND,
+) -> DrainResult:
+    """
+    Start a workflow for every id of a backlog.
+
+    Claims pages of ids with `claim(limit)` until it returns none and calls
+    `start` for each id, with at most `concurrency` calls in flight and at
+    most `rate` calls per second. Claimed ids are not handed out again, so
+    several drains can run at once. Ids whose workflow is already running
+    are skipped, other failures are logged and counted without stopping the
+    drain.
+    """
+    result = DrainResult()
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = RateLimiter(rate)
+
+    async def submit(item_id: UUID) -> None:
+        async with semaphore:
+            await limiter.acquire()
+            try:
+                await start(item_id)
+                result.started += 1
+            except WorkflowAlreadyStartedError:
+                result.already_running += 1
+            except Exception as e:
+                logger.error(f'failed to start sync workflow for {item_id}: {e}')
+                result.failed += 1
+
+    while page := await claim(page_size):
+        await asyncio.gather(*(submit(item_id) for item_id in page))
+
+    return result
+
+
+def single_page(item_id: UUID) -> Callable[[int], Awaitable[list[UUID]]]:
+    """A `claim` for draining a single id."""
+    pending = [item_id]
+
+    async def claim(limit: int) -> list[UUID]:
+        page = pending[:]
+        pending.clear()
+        return page
+
+    return claim
+
+
+def run_drain(drain: Coroutine[None, None, T]) -> T:
+    """
+    Run a drain from a synchronous Celery task.
+
+    Each run gets its own event loop, while the async engine's pooled
+    connections and the Temporal client stay bound to the loop that made
+    them, so both are released before the loop closes.
+    """
+    async def run() -> T:
+        try:
+            return await drain
+        finally:
+            reset_client()
+            await engine.dispose()
+
+    return asyncio.run(run())
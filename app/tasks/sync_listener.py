@@ -0,0 +1,96 @@
+"""
+Start sync workflows as soon as documents or dialogues need syncing.
+
+Listens on the `sync_pending` channel, notified by triggers on the
+`documents` and `dialogues` tables, and drains the notified backlog. The
+Celery beat scan only remains as a safety net for missed notifications.
+Documents created through the API are inserted already claimed, since the
+request starts their workflow, so they do not notify.
+
+    python -m app.tasks.sync_listener
+"""
+import asyncio
+import logging
+import os
+
+import asyncpg
+
+from app.db.client import asyncpg_dsn
+from app.tasks.dialogues import process_dialogue_queue_temporal
+from app.tasks.documents import process_document_queue_temporal
+
+logger = logging.getLogger(__name__)
+
+SYNC_PENDING_CHANNEL = 'sync_pending'
+# Notifications arriving within this window are drained together
+SYNC_LISTENER_DEBOUNCE_SECONDS = float(os.getenv('SYNC_LISTENER_DEBOUNCE_SECONDS', '0.2'))
+SYNC_LISTENER_RECONNECT_SECONDS = float(os.getenv('SYNC_LISTENER_RECONNECT_SECONDS', '5'))
+
+DRAINS = {
+    'documents': process_document_queue_temporal,
+    'dialogues': process_dialogue_queue_temporal,
+}
+
+
+class SyncListener:
+
+    def __init__(self, dsn: str) -> None:
+        self.dsn = dsn
+        self._pending: set[str] = set()
+        self._wakeup = asyncio.Event()
+
+    async def run(self) -> None:
+        drainer = asyncio.create_task(self._drain_forever())
+        try:
+            while True:
+                try:
+                    await self._listen()
+                except (OSError, asyncpg.PostgresError) as e:
+                    logger.warning(f'sync listener connection lost, reconnecting: {e}')
+                await asyncio.sleep(SYNC_LISTENER_RECONNECT_SECONDS)
+        finally:
+            drainer.cancel()
+
+    async def _listen(self) -> None:
+        connection = await asyncpg.connect(self.dsn)
+        lost = asyncio.Event()
+        connection.add_termination_listener(lambda _: lost.set())
+        try:
+            await connection.add_listener(SYNC_PENDING_CHANNEL, self._on_notify)
+            logger.info(f'listening on {SYNC_PENDING_CHANNEL}')
+            # rows may have been queued while not listening
+            self._notify(*DRAINS)
+            await lost.wait()
+        finally:
+            if not connection.is_closed():
+                await connection.close()
+
+    def _on_notify(self, connection, pid, channel, payload: str) -> None:
+        if payload in DRAINS:
+            self._notify(payload)
+
+    def _notify(self, *tables: str) -> None:
+        self._pending.update(tables)
+        self._wakeup.set()
+
+    async def _drain_forever(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            await asyncio.sleep(SYNC_LISTENER_DEBOUNCE_SECONDS)
+            self._wakeup.clear()
+            tables, self._pending = self._pending, set()
+            for table in tables:
+                try:
+                    await DRAINS[table]()
+                except Exception as e:
+                    logger.exception(f'failed to drain {table}: {e}')
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    listener = SyncListener(asyncpg_dsn(os.environ['DATABASE_URL']))
+    asyncio.run(listener.run())
+
+
+if __name__ == '__main__':
+    main()
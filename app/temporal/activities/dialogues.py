@@ -0,0 +1,151 @@
+from uuid import UUID
+
+from llama_index.core.schema import NodeRelationship, RelatedNodeInfo, TextNode
+from llama_index.core.vector_stores.types import FilterOperator, MetadataFilter, MetadataFilters
+from pydantic import BaseModel, ConfigDict
+from sqlalchemy import select, update
+from temporalio import activity
+
+from app.core.invalidation import CHATBOT, invalidation_bus
+from app.db.client import async_session_factory
+from app.models.chatbot import Chatbot
+from app.models.dialogue import Dialogue, SyncStatus
+from app.schemas.chatbot_settings import ChatbotSettings, EmbeddingModel
+from app.services.chatbot import ChatbotService
+from app.services.rag.embeddings import EmbeddingsService
+from app.services.rag.vectorstore import VectorStoreService
+from app.services.sync_queue import PENDING_SYNC_STATUSES
+from app.temporal.activities.documents import ChatbotDTO
+from app.temporal.errors import ChatbotNotFoundError
+
+
+class DialogueDTO(BaseModel):
+    id: UUID
+    questions: list[str]
+    answer: str
+
+
+class DialogueBatchRequest(BaseModel):
+    chatbot_id: UUID
+    limit: int
+    # dialogues that already failed in this workflow run
+    exclude_ids: list[UUID] = []
+
+
+class DialogueBatchDTO(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    chatbot: ChatbotDTO
+    dialogues: list[DialogueDTO]
+
+
+class DialogueBatchStatusUpdateRequest(BaseModel):
+    chatbot_id: UUID
+    dialogue_ids: list[UUID]
+    sync_status: SyncStatus
+    sync_msg: str
+
+
+class DialogueActivities:
+
+    @activity.defn
+    async def start_dialogue_batch(self, request: DialogueBatchRequest) -> DialogueBatchDTO:
+        """Mark up to `limit` pending dialogues of the chatbot in progress and return them."""
+        async with async_session_factory() as session:
+            chatbot = await session.get(Chatbot, request.chatbot_id)
+            if not chatbot:
+                raise ChatbotNotFoundError(f'Chatbot with id {request.chatbot_id} not found')
+
+            # only one sync workflow runs per chatbot, so dialogues in progress
+            # were left behind by an interrupted run and are picked up again
+            pending = (
+                select(Dialogue.id)
+                .where(
+                    Dialogue.chatbot_id == request.chatbot_id,
+                    Dialogue.sync_status.in_([*PENDING_SYNC_STATUSES, 'IN_PROGRESS']),
+                    Dialogue.id.not_in(request.exclude_ids),
+                )
+                # dialogues that failed before are retried after the new ones
+                .order_by(Dialogue.sync_status == SyncStatus.FAILED, Dialogue.id)
+                .limit(request.limit)
+                .with_for_update(skip_locked=True)
+                .cte('pending')
+            )
+            result = await session.execute(
+                update(Dialogue)
+                .where(Dialogue.id == pending.c.id)
+                .values(sync_status=SyncStatus.IN_PROGRESS, sync_msg='Dialogue sync started')
+                .returning(Dialogue.id, Dialogue.questions, Dialogue.answer)
+            )
+            dialogues = [
+                DialogueDTO(id=dialogue_id, questions=questions, answer=answer)
+                for dialogue_id, questions, answer in result.all()
+            ]
+            await session.commit()
+
+        return DialogueBatchDTO(
+            chatbot=ChatbotDTO(id=chatbot.id, name=chatbot.name, settings=chatbot.settings),
+            dialogues=dialogues,
+        )
+
+    @activity.defn
+    async def sync_dialogues_to_vector_store(self, batch: DialogueBatchDTO) -> None:
+        chatbot_settings = ChatbotSettings.model_validate(batch.chatbot.settings)
+        em_settings = EmbeddingModel.model_validate(chatbot_settings.embedding_model)
+        vector_store = VectorStoreService.get_vector_store(
+            str(batch.chatbot.id),
+            em_settings.dimensions,
+            vector_index=chatbot_settings.vector_index
+        )
+        embedding_model = EmbeddingsService.get_embedding_model(em_settings)
+
+        # the dialogue id is both the node id and its source document id, so
+        # syncing a dialogue again replaces its node
+        nodes = [
+            TextNode(
+                id_=str(dialogue.id),
+                text=_dialogue_text(dialogue),
+                relationships={NodeRelationship.SOURCE: RelatedNodeInfo(node_id=str(dialogue.id))},
+            )
+            for dialogue in batch.dialogues
+        ]
+
+        activity.logger.info(f'embedding {len(nodes)} dialogues of chatbot {batch.chatbot.id}')
+        # batched by the model's embed_batch_size
+        embeddings = await embedding_model.aget_text_embedding_batch([node.get_content() for node in nodes])
+        for node, embedding in zip(nodes, embeddings):
+            node.embedding = embedding
+
+        # also removes nodes of earlier syncs, which had random node ids
+        await vector_store.adelete_nodes(filters=MetadataFilters(filters=[
+            MetadataFilter(
+                key='doc_id',
+                value=[str(dialogue.id) for dialogue in batch.dialogues],
+                operator=FilterOperator.IN,
+            ),
+        ]))
+        await vector_store.async_add(nodes)
+
+    @activity.defn
+    async def update_dialogue_batch_sync_status(self, request: DialogueBatchStatusUpdateRequest) -> None:
+        if not request.dialogue_ids:
+            return
+
+        async with async_session_factory() as session:
+            await session.execute(
+                update(Dialogue)
+                # a dialogue edited while it synced is back to NA and left to sync again
+                .where(Dialogue.id.in_(request.dialogue_ids), Dialogue.sync_status == SyncStatus.IN_PROGRESS)
+                .values(sync_status=request.sync_status, sync_msg=request.sync_msg)
+            )
+            if request.sync_status == SyncStatus.SYNCED:
+                await session.execute(ChatbotService.bump_knowledge_version(request.chatbot_id))
+            await session.commit()
+
+        if request.sync_status == SyncStatus.SYNCED:
+            await invalidation_bus.apublish(CHATBOT, request.chatbot_id)
+
+
+def _dialogue_text(dialogue: DialogueDTO) -> str:
+    questions = "\n".join(dialogue.questions)
+    return f"Questions: {questions}\n\nAnswer: {dialogue.answer}\n\n"
@@ -1,13 +1,17 @@
+import hashlib
 from temporalio import activity
 from uuid import UUID
 from app.services.document import DocumentService
+from app.core.invalidation import CHATBOT, invalidation_bus
+from app.services.chatbot import ChatbotService
 from app.models.document import Document, SyncStatus
 from app.services.s3 import S3Service
-from app.services.parse import DocumentParserService
+from app.services.parse import OCR_MAX_CONCURRENT_RANGES, PDF_PARSER, DocumentParserService
+from app.services.ocr_cache import ocr_cache
 from llama_index.core.node_parser import MarkdownNodeParser
 from llama_index.core.schema import Document as LlamaIndexDocument
 from llama_index.core.ingestion import IngestionPipeline
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.orm import selectinload
 from app.services.rag.embeddings import EmbeddingsService
 from app.services.rag.vectorstore import VectorStoreService
@@ -39,6 +43,7 @@ class DocumentDTO(BaseModel):
     sync_status: str
     sync_msg: str | None = None
     chatbot_id: UUID
+    content_hash: str | None = None
 
 
 class DocumentWithChatbotDTO(BaseModel):
@@ -55,8 +60,125 @@ class DocumentSyncDTO(BaseModel):
     text_to_sync: str
 
 
+class ParsedPage(BaseModel):
+    index: int
+    markdown: str
+
+
+class DocumentParsePlan(BaseModel):
+    # set when the document was parsed before and nothing is left to do
+    markdown: str | None = None
+    # pages parsed from the text layer
+    pages: list[ParsedPage] = []
+    # page indexes to OCR, one activity each; None, the whole document, only
+    # appears in plans recorded by earlier versions
+    ocr_ranges: list[list[int] | None] = []
+    max_concurrency: int = 1
+    content_hash: str | None = None
+
+
+class OcrPagesRequest(BaseModel):
+    document: DocumentDTO
+    pages: list[int] | None = None
+
+
+class ParsedDocumentDTO(BaseModel):
+    document: DocumentDTO
+    markdown: str
+
+
+class DocumentBatchSyncRequest(BaseModel):
+    document_ids: list[UUID]
+    # documents parsed at once, and embedding groups synced at once
+    max_concurrency: int = 10
+    # documents embedded together, so embedding requests are batched across files
+    embed_batch_size: int = 20
+    # page ranges OCRed at once across the whole batch
+    ocr_max_concurrency: int = 8
+
+
+class DocumentBatchDTO(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    chatbot: ChatbotDTO
+    documents: list[DocumentDTO]
+
+
+class DocumentBatchSyncDTO(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    chatbot: ChatbotDTO
+    documents: list[ParsedDocumentDTO]
+
+
+class DocumentBatchStatusUpdateRequest(BaseModel):
+    document_ids: list[UUID]
+    sync_status: SyncStatus
+    sync_msg: str
+
+
 class DocumentActivities:
 
+    @activity.defn
+    async def start_batch_sync(self, document_ids: list[UUID]) -> DocumentBatchDTO:
+        """Mark the PDFs of a batch in progress, and the other documents failed."""
+        async with async_session_factory() as session:
+            query = select(Document).options(selectinload(Document.chatbot)).where(Document.id.in_(document_ids))
+            documents = (await session.execute(query)).scalars().all()
+            if not documents:
+                raise DocumentNotFoundError(f'Documents with ids {document_ids} not found')
+
+            for document in documents:
+                if document.mime_type == 'application/pdf':
+                    document.sync_status = SyncStatus.IN_PROGRESS
+                    document.sync_msg = 'Document sync started'
+                else:
+                    document.sync_status = SyncStatus.FAILED
+                    document.sync_msg = 'Only PDF documents are supported'
+            await session.commit()
+
+        chatbot = documents[0].chatbot
+        return DocumentBatchDTO(
+            chatbot=ChatbotDTO(id=chatbot.id, name=chatbot.name, settings=chatbot.settings),
+            documents=[
+                DocumentDTO(
+                    id=document.id,
+                    file_url=document.file_url,
+                    mime_type=document.mime_type,
+                    sync_status=document.sync_status,
+                    sync_msg=document.sync_msg,
+                    chatbot_id=document.chatbot_id,
+                    content_hash=document.content_hash
+                )
+                for document in documents
+                if document.sync_status == SyncStatus.IN_PROGRESS
+            ],
+        )
+
+    @activity.defn
+    async def update_batch_sync_status(self, request: DocumentBatchStatusUpdateRequest) -> None:
+        if not request.document_ids:
+            return
+
+        async with async_session_factory() as session:
+            result = await session.execute(
+                update(Document)
+                # a document reset while it synced, e.g. by an embedding resize, is left to sync again
+                .where(Document.id.in_(request.document_ids), Document.sync_status == SyncStatus.IN_PROGRESS)
+                .values(sync_status=request.sync_status, sync_msg=request.sync_msg)
+                .returning(Document.chatbot_id)
+            )
+            chatbot_ids = set(result.scalars().all())
+            if request.sync_status == SyncStatus.SYNCED:
+                # one bump for the whole batch
+                for chatbot_id in chatbot_ids:
+                    await session.execute(ChatbotService.bump_knowledge_version(chatbot_id))
+            await session.commit()
+
+        if request.sync_status == SyncStatus.SYNCED:
+            for chatbot_id in chatbot_ids:
+                await invalidation_bus.apublish(CHATBOT, chatbot_id)
+
     @activity.defn
     async def update_sync_status(self, request: DocumentSyncStatusUpdateRequest) -> DocumentWithChatbotDTO:
         async with async_session_factory() as session:
@@ -73,9 +195,14 @@ class DocumentActivities:
             if request.sync_msg:
                 document.sync_msg = request.sync_msg
             session.add(document)
+            if request.sync_status == SyncStatus.SYNCED:
+                await session.execute(ChatbotService.bump_knowledge_version(document.chatbot_id))
             await session.commit()
             await session.refresh(document)
 
+        if request.sync_status == SyncStatus.SYNCED:
+            await invalidation_bus.apublish(CHATBOT, document.chatbot_id)
+
         # Convert to DTOs
         document_dto = DocumentDTO(
             id=document.id,
@@ -83,7 +210,8 @@ class DocumentActivities:
             mime_type=document.mime_type,
             sync_status=document.sync_status,
             sync_msg=document.sync_msg,
-            chatbot_id=document.chatbot.id
+            chatbot_id=document.chatbot.id,
+            content_hash=document.content_hash
         )
         
         chatbot_dto = ChatbotDTO(
@@ -99,29 +227,104 @@ class PdfDocumentActivities:
 
     @activity.defn
     async def parse_document(self, document: DocumentDTO) -> str:
-        signed_url = S3Service.generate_presigned_url(document.file_url)
-        return DocumentParserService.parse_pdf_to_markdown(signed_url)
+        if document.content_hash:
+            cached = await ocr_cache.get(document.content_hash, PDF_PARSER)
+            if cached is not None:
+                activity.logger.info(f'reusing OCR result of identical file for document {document.id}')
+                return cached
+
+        signed_url = await S3Service.agenerate_presigned_url(document.file_url)
+        content = await S3Service.adownload_file(document.file_url)
+        try:
+            markdown = await DocumentParserService.aparse_pdf(signed_url, content)
+        except ValueError as e:
+            raise DocumentUnsupportedError(f'Document with id {document.id} is not a readable PDF: {e}')
+
+        if document.content_hash:
+            await ocr_cache.set(document.content_hash, PDF_PARSER, markdown)
+        return markdown
         
     @activity.defn
-    async def sync_to_vector_store(self, dto: DocumentSyncDTO) -> None:
+    async def plan_parse(self, document: DocumentDTO) -> DocumentParsePlan:
+        content = None
+        content_hash = document.content_hash
+        if not content_hash:
+            # uploaded directly to S3, so not hashed yet
+            content = await S3Service.adownload_file(document.file_url)
+            content_hash = hashlib.sha256(content).hexdigest()
+            await DocumentService.aset_content_hash(document.id, content_hash)
 
-        chatbot_settings = ChatbotSettings.model_validate(dto.chatbot.settings)
-        em_settings = EmbeddingModel.model_validate(chatbot_settings.embedding_model)
-        vector_store = VectorStoreService.get_vector_store(str(dto.chatbot.id), em_settings.dimensions)
+        cached = await ocr_cache.get(content_hash, PDF_PARSER)
+        if cached is not None:
+            activity.logger.info(f'reusing OCR result of identical file for document {document.id}')
+            return DocumentParsePlan(markdown=cached, content_hash=content_hash)
 
-        activity.logger.info(f'Vector store gotten')
-        
+        if content is None:
+            content = await S3Service.adownload_file(document.file_url)
+        try:
+            pages, ocr_pages = await DocumentParserService.aplan_pdf(content)
+        except ValueError as e:
+            # without a page count the whole document would be one OCR call
+            raise DocumentUnsupportedError(f'Document with id {document.id} is not a readable PDF: {e}')
+        ocr_ranges = DocumentParserService.split_page_ranges(ocr_pages)
+        activity.logger.info(f'OCR of document {document.id} split into {len(ocr_ranges)} page ranges')
+
+        return DocumentParsePlan(
+            pages=[ParsedPage(index=index, markdown=text) for index, text in pages.items()],
+            ocr_ranges=ocr_ranges,
+            max_concurrency=OCR_MAX_CONCURRENT_RANGES,
+            content_hash=content_hash,
+        )
+
+    @activity.defn
+    async def ocr_pages(self, request: OcrPagesRequest) -> list[ParsedPage]:
+        # presigned per attempt, so a retry late in a long fan-out has a valid URL
+        signed_url = await S3Service.agenerate_presigned_url(request.document.file_url)
+        pages = await DocumentParserService.aocr_pages(signed_url, request.pages)
+        return [ParsedPage(index=index, markdown=markdown) for index, markdown in pages.items()]
+
+    @activity.defn
+    async def cache_parsed_document(self, dto: ParsedDocumentDTO) -> None:
+        if dto.document.content_hash:
+            await ocr_cache.set(dto.document.content_hash, PDF_PARSER, dto.markdown)
+
+    @activity.defn
+    async def sync_to_vector_store(self, dto: DocumentSyncDTO) -> None:
         doc_to_parse = LlamaIndexDocument(id_=str(dto.document.id), text=dto.text_to_sync)
+        await _ingest(dto.chatbot, [doc_to_parse])
 
-        embedding_model = EmbeddingsService.get_embedding_model(em_settings)
+    @activity.defn
+    async def sync_batch_to_vector_store(self, dto: DocumentBatchSyncDTO) -> None:
+        # one pipeline run, so chunks of all documents share embedding requests
+        docs_to_parse = [
+            LlamaIndexDocument(id_=str(parsed.document.id), text=parsed.markdown)
+            for parsed in dto.documents
+        ]
+        await _ingest(dto.chatbot, docs_to_parse)
 
-        activity.logger.info('running ingestion pipeline to vector store')
-        pipeline = IngestionPipeline(
-            transformations=[
-                MarkdownNodeParser(),
-                embedding_model
-            ],
-            vector_store=vector_store
-        )
 
-        pipeline.run(documents=[doc_to_parse])
+async def _ingest(chatbot: ChatbotDTO, documents: list[LlamaIndexDocument]) -> None:
+    chatbot_settings = ChatbotSettings.model_validate(chatbot.settings)
+    em_settings = EmbeddingModel.model_validate(chatbot_settings.embedding_model)
+    vector_store = VectorStoreService.get_vector_store(
+        str(chatbot.id),
+        em_settings.dimensions,
+        vector_index=chatbot_settings.vector_index
+    )
+
+    activity.logger.info(f'Vector store gotten')
+
+    embedding_model = EmbeddingsService.get_embedding_model(em_settings)
+
+    activity.logger.info(f'running ingestion pipeline to vector store for {len(documents)} documents')
+    pipeline = IngestionPipeline(
+        transformations=[
+            MarkdownNodeParser(),
+            embedding_model
+        ],
+        vector_store=vector_store
+    )
+
+    # async all the way down (embeddings and vector store inserts) so the
+    # worker's event loop keeps serving other activities meanwhile
+    await pipeline.arun(documents=documents)
@@ -1,6 +1,10 @@
+import dataclasses
 from temporalio.client import Client
+from temporalio.converter import DataConverter
 import os
 
+from app.temporal.codec import get_claim_check_codec
+
 TEMPORAL_SERVER_URL = os.getenv('TEMPORAL_SERVER_URL') or 'localhost:7233'
 
 _client = None
@@ -9,5 +13,13 @@ _client = None
 async def get_client() -> Client:
     global _client
     if _client is None:
-        _client = await Client.connect(TEMPORAL_SERVER_URL)
+        # the API and the workers must use the same codec to read each other's payloads
+        data_converter = dataclasses.replace(DataConverter.default, payload_codec=get_claim_check_codec())
+        _client = await Client.connect(TEMPORAL_SERVER_URL, data_converter=data_converter)
     return _client
+
+
+def reset_client() -> None:
+    """Drop the cached client, which is bound to the event loop that connected it."""
+    global _client
+    _client = None
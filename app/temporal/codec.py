@@ -0,0 +1,158 @@
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import List, Protocol, Sequence
+
+import zstandard
+from temporalio.api.common.v1 import Payload
+from temporalio.converter import PayloadCodec
+
+logger = logging.getLogger(__name__)
+
+# Payloads at least this large are stored in the blob store instead of workflow history
+TEMPORAL_CLAIM_CHECK_THRESHOLD_BYTES = int(os.getenv('TEMPORAL_CLAIM_CHECK_THRESHOLD_BYTES', str(128 * 1024)))
+# 's3' by default, since the API and the workers run as separate processes;
+# 'local' keeps blobs on the filesystem, only for development setups where
+# every process shares it
+TEMPORAL_CLAIM_CHECK_STORE = os.getenv('TEMPORAL_CLAIM_CHECK_STORE', 's3')
+TEMPORAL_CLAIM_CHECK_PATH = os.getenv(
+    'TEMPORAL_CLAIM_CHECK_PATH',
+    os.path.join(tempfile.gettempdir(), 'temporal-payloads'),
+)
+TEMPORAL_CLAIM_CHECK_BUCKET = os.getenv('TEMPORAL_CLAIM_CHECK_BUCKET') or os.getenv('S3_BUCKET_NAME')
+TEMPORAL_CLAIM_CHECK_PREFIX = os.getenv('TEMPORAL_CLAIM_CHECK_PREFIX', 'temporal-payloads/')
+
+CLAIM_CHECK_ENCODING = b'binary/claim-check'
+
+
+class BlobStore(Protocol):
+
+    async def put(self, key: str, data: bytes) -> None:
+        ...
+
+    async def get(self, key: str) -> bytes:
+        ...
+
+
+class LocalBlobStore:
+    """Blob store on the local filesystem."""
+
+    def __init__(self, root: str | Path) -> None:
+        self.root = Path(root)
+
+    async def put(self, key: str, data: bytes) -> None:
+        await asyncio.to_thread(self._put, key, data)
+
+    async def get(self, key: str) -> bytes:
+        return await asyncio.to_thread((self.root / key).read_bytes)
+
+    def _put(self, key: str, data: bytes) -> None:
+        path = self.root / key
+        if path.exists():
+            return
+        self.root.mkdir(parents=True, exist_ok=True)
+        # write then rename so a concurrent reader never sees a partial blob
+        with tempfile.NamedTemporaryFile(dir=self.root, delete=False) as f:
+            f.write(data)
+        os.replace(f.name, path)
+
+
+class S3BlobStore:
+    """
+    Blob store in an S3 bucket.
+
+    Blobs are never deleted by the codec; expire the prefix with a bucket
+    lifecycle rule longer than the namespace's workflow retention.
+    """
+
+    def __init__(self, bucket: str, prefix: str = TEMPORAL_CLAIM_CHECK_PREFIX) -> None:
+        self.bucket = bucket
+        self.prefix = prefix
+
+    async def put(self, key: str, data: bytes) -> None:
+        from app.services.s3 import S3Service
+
+        await asyncio.to_thread(
+            S3Service.get_s3_client().put_object,
+            Bucket=self.bucket,
+            Key=self.prefix + key,
+            Body=data,
+        )
+
+    async def get(self, key: str) -> bytes:
+        from app.services.s3 import S3Service
+
+        def read() -> bytes:
+            response = S3Service.get_s3_client().get_object(Bucket=self.bucket, Key=self.prefix + key)
+            return response['Body'].read()
+
+        return await asyncio.to_thread(read)
+
+
+class ClaimCheckCodec(PayloadCodec):
+    """
+    Payload codec that moves large payloads out of workflow history.
+
+    Payloads of at least `threshold` bytes are compressed and written to the
+    blob store under the hash of their content; only a reference payload is
+    recorded in history. Decoding fetches and restores them transparently, so
+    workflows and activities keep passing plain values such as the OCR text.
+    """
+
+    def __init__(self, store: BlobStore, threshold: int = TEMPORAL_CLAIM_CHECK_THRESHOLD_BYTES) -> None:
+        self.store = store
+        self.threshold = threshold
+
+    async def encode(self, payloads: Sequence[Payload]) -> List[Payload]:
+        encoded = []
+        for payload in payloads:
+            data = payload.SerializeToString()
+            if len(data) < self.threshold:
+                encoded.append(payload)
+                continue
+
+            compression, blob = _compress(data)
+            # content addressed, so activity retries and replays reuse the blob
+            key = hashlib.sha256(data).hexdigest()
+            await self.store.put(key, blob)
+            logger.debug(f'offloaded {len(data)} byte payload as {key} ({len(blob)} bytes {compression})')
+            encoded.append(Payload(
+                metadata={'encoding': CLAIM_CHECK_ENCODING, 'compression': compression.encode()},
+                data=key.encode(),
+            ))
+        return encoded
+
+    async def decode(self, payloads: Sequence[Payload]) -> List[Payload]:
+        decoded = []
+        for payload in payloads:
+            if payload.metadata.get('encoding') != CLAIM_CHECK_ENCODING:
+                decoded.append(payload)
+                continue
+
+            blob = await self.store.get(payload.data.decode())
+            data = _decompress(payload.metadata['compression'].decode(), blob)
+            decoded.append(Payload.FromString(data))
+        return decoded
+
+
+def get_claim_check_codec() -> ClaimCheckCodec:
+    if TEMPORAL_CLAIM_CHECK_STORE == 's3':
+        if not TEMPORAL_CLAIM_CHECK_BUCKET:
+            raise ValueError('TEMPORAL_CLAIM_CHECK_BUCKET or S3_BUCKET_NAME must be set for the s3 claim check store')
+        return ClaimCheckCodec(S3BlobStore(TEMPORAL_CLAIM_CHECK_BUCKET))
+    if TEMPORAL_CLAIM_CHECK_STORE == 'local':
+        return ClaimCheckCodec(LocalBlobStore(TEMPORAL_CLAIM_CHECK_PATH))
+    raise ValueError(f'Unknown claim check store {TEMPORAL_CLAIM_CHECK_STORE}')
+
+
+def _compress(data: bytes) -> tuple[str, bytes]:
+    return 'zstd', zstandard.ZstdCompressor(level=3).compress(data)
+
+
+def _decompress(compression: str, blob: bytes) -> bytes:
+    if compression == 'zstd':
+        return zstandard.ZstdDecompressor().decompress(blob)
+    raise ValueError(f'Unknown payload compression {compression}')
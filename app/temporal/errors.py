@@ -11,4 +11,10 @@ class DocumentNotFoundError(Exception):
 class DocumentUnsupportedError(Exception):
     def __init__(self, message: str) -> None:
         self.message = message
-        super().__init__(self.message)
\ No newline at end of file
+        super().__init__(self.message)
+
+@dataclass
+class ChatbotNotFoundError(Exception):
+    def __init__(self, message: str) -> None:
+        self.message = message
+        super().__init__(self.message)
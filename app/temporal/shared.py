@@ -1 +1,11 @@
+import os
+
 SYNC_DOCUMENT_TASK_QUEUE = 'sync-document-task-queue'
+
+# Fan-out of DocumentBatchSyncWorkflow: documents parsed at once, and
+# documents embedded together
+DOCUMENT_BATCH_MAX_CONCURRENCY = int(os.getenv('DOCUMENT_BATCH_MAX_CONCURRENCY', '10'))
+DOCUMENT_BATCH_EMBED_SIZE = int(os.getenv('DOCUMENT_BATCH_EMBED_SIZE', '20'))
+
+# Dialogues embedded and written per activity of DialogueSyncWorkflow
+DIALOGUE_SYNC_BATCH_SIZE = int(os.getenv('DIALOGUE_SYNC_BATCH_SIZE', '500'))
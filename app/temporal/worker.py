@@ -1,8 +1,10 @@
 import logging
 import asyncio
+import os
 from temporalio.worker import Worker
 from app.temporal.activities.documents import DocumentActivities, PdfDocumentActivities
-from app.temporal.workflows import DocumentSyncWorkflow
+from app.temporal.activities.dialogues import DialogueActivities
+from app.temporal.workflows import DialogueSyncWorkflow, DocumentBatchSyncWorkflow, DocumentSyncWorkflow
 from app.temporal.client import get_client
 from app.temporal.shared import SYNC_DOCUMENT_TASK_QUEUE
 
@@ -14,23 +16,40 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+# Activities are async and share the worker's event loop; these bound how many
+# documents one worker processes at once (OCR, embedding and DB connections)
+MAX_CONCURRENT_ACTIVITIES = int(os.getenv('TEMPORAL_MAX_CONCURRENT_ACTIVITIES', '20'))
+MAX_CONCURRENT_WORKFLOW_TASKS = int(os.getenv('TEMPORAL_MAX_CONCURRENT_WORKFLOW_TASKS', '50'))
+
 
 async def main():
     client = await get_client()
     # Create instances of the activity classes
     document_activities = DocumentActivities()
     pdf_document_activities = PdfDocumentActivities()
+    dialogue_activities = DialogueActivities()
 
     # Register the instance methods
     worker = Worker(
         client,
         task_queue=SYNC_DOCUMENT_TASK_QUEUE,
-        workflows=[DocumentSyncWorkflow],
+        workflows=[DocumentSyncWorkflow, DocumentBatchSyncWorkflow, DialogueSyncWorkflow],
         activities=[
             document_activities.update_sync_status, 
+            document_activities.start_batch_sync,
+            document_activities.update_batch_sync_status,
             pdf_document_activities.parse_document, 
-            pdf_document_activities.sync_to_vector_store
+            pdf_document_activities.plan_parse,
+            pdf_document_activities.ocr_pages,
+            pdf_document_activities.cache_parsed_document,
+            pdf_document_activities.sync_to_vector_store,
+            pdf_document_activities.sync_batch_to_vector_store,
+            dialogue_activities.start_dialogue_batch,
+            dialogue_activities.sync_dialogues_to_vector_store,
+            dialogue_activities.update_dialogue_batch_sync_status,
         ],
+        max_concurrent_activities=MAX_CONCURRENT_ACTIVITIES,
+        max_concurrent_workflow_tasks=MAX_CONCURRENT_WORKFLOW_TASKS,
     )
     logger.info("Starting Temporal worker...")
     await worker.run()
@@ -1,7 +1,9 @@
+import asyncio
 from datetime import timedelta
 from uuid import UUID
 from temporalio import workflow
 from temporalio.common import RetryPolicy
+from temporalio.exceptions import ActivityError
 
 with workflow.unsafe.imports_passed_through():
     from app.schemas.document import DocumentSyncStatusUpdateRequest
@@ -10,6 +12,14 @@ with workflow.unsafe.imports_passed_through():
     from app.models.dialogue import SyncStatus
     from app.models.document import Document
     from app.temporal.activities.documents import DocumentSyncDTO
+    from app.temporal.activities.documents import DocumentDTO, OcrPagesRequest, ParsedDocumentDTO, ParsedPage
+    from app.temporal.activities.documents import (
+        DocumentBatchStatusUpdateRequest, DocumentBatchSyncDTO, DocumentBatchSyncRequest
+    )
+    from app.services.parse import DocumentParserService
+    from app.temporal.activities.dialogues import (
+        DialogueActivities, DialogueBatchDTO, DialogueBatchRequest, DialogueBatchStatusUpdateRequest
+    )
 
 
 
@@ -27,12 +37,14 @@ class DocumentSyncWorkflow:
         initial_interval=timedelta(minutes=1),
         maximum_attempts=5,
         maximum_interval=timedelta(minutes=1),
+        non_retryable_error_types=['DocumentUnsupportedError'],
     )
 
     document_sync_retry_policy = RetryPolicy(
         initial_interval=timedelta(seconds=5),
         maximum_attempts=5,
         maximum_interval=timedelta(seconds=5),
+        non_retryable_error_types=['DocumentUnsupportedError'],
     )
     
     @workflow.run
@@ -51,12 +63,16 @@ class DocumentSyncWorkflow:
         )
 
         
-        parsed_markdown = await workflow.execute_activity_method(
-            PdfDocumentActivities.parse_document,
-            document_with_chatbot_dto.document,
-            start_to_close_timeout=timedelta(minutes=5),
-            retry_policy=self.document_parse_retry_policy,
-        )
+        # workflows started before the OCR fan-out replay the single parse activity
+        if workflow.patched('parallel-ocr'):
+            parsed_markdown = await _parse_document(document_with_chatbot_dto.document)
+        else:
+            parsed_markdown = await workflow.execute_activity_method(
+                PdfDocumentActivities.parse_document,
+                document_with_chatbot_dto.document,
+                start_to_close_timeout=timedelta(minutes=5),
+                retry_policy=self.document_parse_retry_policy,
+            )
 
         document_sync_dto = DocumentSyncDTO(
             document=document_with_chatbot_dto.document,
@@ -86,18 +102,265 @@ class DocumentSyncWorkflow:
         
         return f"Document {str(document_id)} synced"
 
-# @workflow.defn
-# class DialogueSyncWorkflow:
-#     @workflow.run
-#     async def run(self, dialogue_id: str) -> str:
-#         await workflow.execute_activity(
-#             "sync_dialogue_activity",
-#             dialogue_id,
-#             schedule_to_close_timeout=timedelta(minutes=3),
-#             retry_policy=RetryPolicy(
-#             initial_interval=timedelta(seconds=5),
-#             maximum_interval=timedelta(minutes=1),
-#             maximum_attempts=5,
-#         ),
-#         )
-#         return "Dialogue synced"
\ No newline at end of file
+
+async def _parse_document(document: DocumentDTO, ocr_semaphore: asyncio.Semaphore | None = None) -> str:
+    """
+    Parse a document, OCRing its page ranges in parallel.
+
+    Each range is its own activity, so a failed range is retried on its
+    own without redoing the others. Documents parsed together share
+    `ocr_semaphore`, otherwise the document bounds its own ranges.
+    """
+    plan = await workflow.execute_activity_method(
+        PdfDocumentActivities.plan_parse,
+        document,
+        start_to_close_timeout=timedelta(minutes=5),
+        retry_policy=DocumentSyncWorkflow.document_sync_retry_policy,
+    )
+    if plan.markdown is not None:
+        return plan.markdown
+
+    semaphore = ocr_semaphore or asyncio.Semaphore(plan.max_concurrency)
+
+    async def ocr_range(pages: list[int] | None) -> list[ParsedPage]:
+        async with semaphore:
+            return await workflow.execute_activity_method(
+                PdfDocumentActivities.ocr_pages,
+                OcrPagesRequest(document=document, pages=pages),
+                start_to_close_timeout=timedelta(minutes=5),
+                retry_policy=DocumentSyncWorkflow.document_parse_retry_policy,
+            )
+
+    results = await asyncio.gather(*(ocr_range(pages) for pages in plan.ocr_ranges))
+
+    pages = {page.index: page.markdown for page in plan.pages}
+    for result in results:
+        pages.update({page.index: page.markdown for page in result})
+    markdown = DocumentParserService.merge_pages(pages)
+
+    await workflow.execute_activity_method(
+        PdfDocumentActivities.cache_parsed_document,
+        ParsedDocumentDTO(
+            document=document.model_copy(update={'content_hash': plan.content_hash or document.content_hash}),
+            markdown=markdown,
+        ),
+        start_to_close_timeout=timedelta(seconds=30),
+        retry_policy=DocumentSyncWorkflow.document_sync_retry_policy,
+    )
+    return markdown
+
+
+@workflow.defn
+class DocumentBatchSyncWorkflow:
+    """
+    Sync a batch of documents of one chatbot.
+
+    Documents are parsed concurrently, at most `max_concurrency` at a time
+    with at most `ocr_max_concurrency` page ranges OCRed across them, then
+    embedded in groups of `embed_batch_size` so embedding requests are
+    shared across files. A document that fails is marked failed without
+    failing the rest of the batch; a group that fails to sync is split in
+    halves until the documents that fail are isolated.
+    """
+
+    # parts of a failed group already went through the retries of the whole group
+    document_split_retry_policy = RetryPolicy(maximum_attempts=1)
+
+    @workflow.run
+    async def run(self, request: DocumentBatchSyncRequest) -> str:
+        batch = await workflow.execute_activity_method(
+            DocumentActivities.start_batch_sync,
+            request.document_ids,
+            start_to_close_timeout=timedelta(seconds=30),
+            retry_policy=DocumentSyncWorkflow.document_retry_policy,
+        )
+        semaphore = asyncio.Semaphore(request.max_concurrency)
+        ocr_semaphore = asyncio.Semaphore(request.ocr_max_concurrency)
+        failed: list[UUID] = []
+
+        async def parse(document: DocumentDTO) -> ParsedDocumentDTO | None:
+            async with semaphore:
+                try:
+                    markdown = await _parse_document(document, ocr_semaphore)
+                except ActivityError as e:
+                    workflow.logger.warning(f'failed to parse document {document.id}: {e}')
+                    failed.append(document.id)
+                    return None
+                return ParsedDocumentDTO(document=document, markdown=markdown)
+
+        parsed = [result for result in await asyncio.gather(*(parse(d) for d in batch.documents)) if result]
+
+        async def sync(documents: list[ParsedDocumentDTO]) -> list[UUID]:
+            group = DocumentBatchSyncDTO(chatbot=batch.chatbot, documents=documents)
+            async with semaphore:
+                try:
+                    await self._sync(group, DocumentSyncWorkflow.document_sync_retry_policy)
+                except ActivityError as e:
+                    workflow.logger.warning(f'failed to sync {len(documents)} documents: {e}')
+                    group_failed = await self._isolate_failures(group)
+                    failed.extend(group_failed)
+                    isolated = set(group_failed)
+                    return [parsed.document.id for parsed in documents if parsed.document.id not in isolated]
+                return [parsed.document.id for parsed in documents]
+
+        groups = [
+            parsed[i:i + request.embed_batch_size]
+            for i in range(0, len(parsed), request.embed_batch_size)
+        ]
+        synced = [document_id for ids in await asyncio.gather(*(sync(g) for g in groups)) for document_id in ids]
+
+        for document_ids, sync_status, sync_msg in (
+            (synced, SyncStatus.SYNCED, 'Document sync completed'),
+            (failed, SyncStatus.FAILED, 'Document sync failed'),
+        ):
+            await workflow.execute_activity_method(
+                DocumentActivities.update_batch_sync_status,
+                DocumentBatchStatusUpdateRequest(
+                    document_ids=document_ids,
+                    sync_status=sync_status,
+                    sync_msg=sync_msg,
+                ),
+                start_to_close_timeout=timedelta(seconds=30),
+                retry_policy=DocumentSyncWorkflow.document_retry_policy,
+            )
+
+        return f"{len(synced)} of {len(request.document_ids)} documents synced"
+
+    async def _sync(self, group: DocumentBatchSyncDTO, retry_policy: RetryPolicy) -> None:
+        await workflow.execute_activity_method(
+            PdfDocumentActivities.sync_batch_to_vector_store,
+            group,
+            start_to_close_timeout=timedelta(minutes=10),
+            retry_policy=retry_policy,
+        )
+
+    async def _isolate_failures(self, group: DocumentBatchSyncDTO) -> list[UUID]:
+        """Sync the halves of a failed group on their own, returning the ids that still fail."""
+        if len(group.documents) == 1:
+            return [group.documents[0].document.id]
+
+        failed: list[UUID] = []
+        middle = len(group.documents) // 2
+        for documents in (group.documents[:middle], group.documents[middle:]):
+            half = DocumentBatchSyncDTO(chatbot=group.chatbot, documents=documents)
+            try:
+                await self._sync(half, self.document_split_retry_policy)
+            except ActivityError as e:
+                if len(documents) == 1:
+                    workflow.logger.warning(f'failed to sync document {documents[0].document.id}: {e}')
+                failed.extend(await self._isolate_failures(half))
+        return failed
+
+
+@workflow.defn
+class DialogueSyncWorkflow:
+    """
+    Sync every pending dialogue of a chatbot.
+
+    Dialogues are taken in batches of `batch_size`, each
+    embedded with batched embedding requests and written to the vector
+    table at once. One workflow runs per chatbot; schedulers start it with a
+    `rescan` signal, so a running sync also picks up dialogues queued
+    after its last batch.
+
+    A batch that fails is split in halves until the dialogues that fail
+    are isolated, so one bad dialogue does not fail the others. Failed
+    dialogues are not taken again by the same run; the next scheduled scan
+    retries them.
+    """
+
+    dialogue_retry_policy = RetryPolicy(
+        initial_interval=timedelta(seconds=5),
+        maximum_attempts=5,
+        maximum_interval=timedelta(seconds=5),
+        non_retryable_error_types=['ChatbotNotFoundError'],
+    )
+
+    # parts of a failed batch already went through the retries of the whole batch
+    dialogue_split_retry_policy = RetryPolicy(maximum_attempts=1)
+
+    # keeps the history bounded when a chatbot has a very large backlog
+    max_batches_per_run = 50
+
+    def __init__(self) -> None:
+        self._rescan = False
+
+    @workflow.signal
+    def rescan(self) -> None:
+        self._rescan = True
+
+    @workflow.run
+    async def run(self, chatbot_id: UUID, batch_size: int) -> str:
+        synced = 0
+        failed: list[UUID] = []
+        for _ in range(self.max_batches_per_run):
+            batch = await workflow.execute_activity_method(
+                DialogueActivities.start_dialogue_batch,
+                DialogueBatchRequest(chatbot_id=chatbot_id, limit=batch_size, exclude_ids=failed),
+                start_to_close_timeout=timedelta(seconds=30),
+                retry_policy=self.dialogue_retry_policy,
+            )
+            if not batch.dialogues:
+                if self._rescan:
+                    self._rescan = False
+                    continue
+                return f"{synced} dialogues of chatbot {chatbot_id} synced, {len(failed)} failed"
+
+            dialogue_ids = [dialogue.id for dialogue in batch.dialogues]
+            try:
+                await self._sync(batch, DocumentSyncWorkflow.document_sync_retry_policy)
+            except ActivityError:
+                batch_failed = await self._isolate_failures(batch)
+                failed.extend(batch_failed)
+                await self._update_status(chatbot_id, batch_failed, SyncStatus.FAILED, 'Dialogue sync failed')
+                isolated = set(batch_failed)
+                dialogue_ids = [dialogue_id for dialogue_id in dialogue_ids if dialogue_id not in isolated]
+
+            await self._update_status(chatbot_id, dialogue_ids, SyncStatus.SYNCED, 'Dialogue sync completed')
+            synced += len(dialogue_ids)
+
+        workflow.continue_as_new(args=[chatbot_id, batch_size])
+
+    async def _sync(self, batch: DialogueBatchDTO, retry_policy: RetryPolicy) -> None:
+        await workflow.execute_activity_method(
+            DialogueActivities.sync_dialogues_to_vector_store,
+            batch,
+            start_to_close_timeout=timedelta(minutes=5),
+            retry_policy=retry_policy,
+        )
+
+    async def _isolate_failures(self, batch: DialogueBatchDTO) -> list[UUID]:
+        """Sync the halves of a failed batch on their own, returning the ids that still fail."""
+        if len(batch.dialogues) == 1:
+            return [batch.dialogues[0].id]
+
+        failed: list[UUID] = []
+        middle = len(batch.dialogues) // 2
+        for dialogues in (batch.dialogues[:middle], batch.dialogues[middle:]):
+            half = DialogueBatchDTO(chatbot=batch.chatbot, dialogues=dialogues)
+            try:
+                await self._sync(half, self.dialogue_split_retry_policy)
+            except ActivityError as e:
+                if len(dialogues) == 1:
+                    workflow.logger.warning(f'failed to sync dialogue {dialogues[0].id}: {e}')
+                failed.extend(await self._isolate_failures(half))
+        return failed
+
+    async def _update_status(
+        self,
+        chatbot_id: UUID,
+        dialogue_ids: list[UUID],
+        sync_status: SyncStatus,
+        sync_msg: str,
+    ) -> None:
+        await workflow.execute_activity_method(
+            DialogueActivities.update_dialogue_batch_sync_status,
+            DialogueBatchStatusUpdateRequest(
+                chatbot_id=chatbot_id,
+                dialogue_ids=dialogue_ids,
+                sync_status=sync_status,
+                sync_msg=sync_msg,
+            ),
+            start_to_close_timeout=timedelta(seconds=30),
+            retry_policy=self.dialogue_retry_policy,
+        )
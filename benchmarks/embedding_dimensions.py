@@ -0,0 +1,89 @@
+"""
+Compare retrieval recall and search latency of shortened embeddings.
+
+Embeds a corpus and a set of queries once at the model's full size, then for
+each requested size shortens the embeddings the same way the API does
+(leading dimensions, re-normalized) and measures:
+
+- recall@k of exact cosine search against the full-size ranking
+- median brute-force search latency per query
+- storage per vector as `vector` and `halfvec`
+
+    python benchmarks/embedding_dimensions.py --corpus chunks.txt --queries questions.txt
+
+Both files hold one text per line. Requires OPENAI_API_KEY.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+from llama_index.embeddings.openai import OpenAIEmbedding
+
+from app.schemas.chatbot_settings import NATIVE_EMBEDDING_DIMENSIONS
+
+
+def shorten(embeddings: np.ndarray, dimensions: int) -> np.ndarray:
+    shortened = embeddings[:, :dimensions]
+    return shortened / np.linalg.norm(shortened, axis=1, keepdims=True)
+
+
+def top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    similarities = queries @ corpus.T
+    return np.argsort(-similarities, axis=1)[:, :k]
+
+
+def recall(expected: np.ndarray, actual: np.ndarray) -> float:
+    hits = sum(len(set(e) & set(a)) for e, a in zip(expected, actual))
+    return hits / expected.size
+
+
+def search_latency_ms(corpus: np.ndarray, queries: np.ndarray, k: int) -> float:
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        similarities = corpus @ query
+        np.argpartition(-similarities, min(k, len(similarities) - 1))[:k]
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+
+def read_lines(path: str) -> list[str]:
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', required=True)
+    parser.add_argument('--queries', required=True)
+    parser.add_argument('--model', default='text-embedding-3-large')
+    parser.add_argument('--dimensions', type=int, nargs='+', default=[256, 512, 1024, 1536, 3072])
+    parser.add_argument('--top-k', type=int, default=10)
+    args = parser.parse_args()
+
+    native = NATIVE_EMBEDDING_DIMENSIONS[args.model]
+    model = OpenAIEmbedding(api_key=os.getenv('OPENAI_API_KEY'), model=args.model)
+    corpus = np.asarray(model.get_text_embedding_batch(read_lines(args.corpus), show_progress=True), dtype=np.float32)
+    queries = np.asarray([model.get_query_embedding(q) for q in read_lines(args.queries)], dtype=np.float32)
+    k = min(args.top_k, len(corpus))
+
+    expected = top_k(shorten(corpus, native), shorten(queries, native), k)
+    print(f'{len(corpus)} chunks, {len(queries)} queries, recall@{k} against {native} dimensions\n')
+    print(f'{"dimensions":>10} {"recall":>8} {"latency ms":>11} {"vector B":>9} {"halfvec B":>10}')
+    for dimensions in sorted(d for d in args.dimensions if d <= native):
+        shortened_corpus = shorten(corpus, dimensions)
+        shortened_queries = shorten(queries, dimensions)
+        actual = top_k(shortened_corpus, shortened_queries, k)
+        print(
+            f'{dimensions:>10} '
+            f'{recall(expected, actual):>8.3f} '
+            f'{search_latency_ms(shortened_corpus, shortened_queries, k):>11.3f} '
+            # pgvector stores an 8 byte header plus 4 (vector) or 2 (halfvec) bytes per dimension
+            f'{8 + 4 * dimensions:>9} '
+            f'{8 + 2 * dimensions:>10}'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -17,6 +17,7 @@ from app.models.base import Base
 from app.services.users import create_user, find_user_by_cognito_id
 import pytest_asyncio
 import uuid
+from temporalio import workflow
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -34,13 +35,13 @@ async def postgres_db():
     TestSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False, autocommit=False, autoflush=False)
     
     logger.debug("Creating schema")
-    async with engine.connect() as conn:
+    async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
     
     yield TestSessionLocal, engine
     
     logger.debug("Dropping schema")
-    async with engine.connect() as conn:
+    async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
     
     logger.debug("Disposing engine")
@@ -119,3 +120,15 @@ def override_dependencies():
     app.dependency_overrides[get_authenticated_user] = override_get_authenticated_user
     app.dependency_overrides[security] = FakeSecurity()
 
+
+
+@pytest.fixture
+def run_workflow(monkeypatch):
+    """Run a workflow body outside of a worker, with its activities replaced by a `FakeActivities`."""
+
+    async def run(activities, workflow_run, *args):
+        monkeypatch.setattr(workflow, 'execute_activity_method', activities)
+        monkeypatch.setattr(workflow, 'logger', logging.getLogger(__name__))
+        return await workflow_run(*args)
+
+    return run
@@ -0,0 +1,43 @@
+import uuid
+
+from temporalio.exceptions import ActivityError
+
+from app.config.settings import load_default_chatbot_settings_dict
+from app.schemas.chatbot_settings import ChatbotSettings
+from app.temporal.activities.documents import ChatbotDTO
+
+
+def activity_error(activity_type: str) -> ActivityError:
+    """An activity failure as a workflow sees it once the activity's retries are exhausted."""
+    return ActivityError(
+        f'{activity_type} failed',
+        scheduled_event_id=1,
+        started_event_id=2,
+        identity='worker',
+        activity_type=activity_type,
+        activity_id='1',
+        retry_state=None,
+    )
+
+
+def chatbot_dto() -> ChatbotDTO:
+    return ChatbotDTO(
+        id=uuid.uuid4(),
+        name='support',
+        settings=ChatbotSettings.model_validate(load_default_chatbot_settings_dict()),
+    )
+
+
+class FakeActivities:
+    """
+    Runs the activities of a workflow in process.
+
+    Stands in for `workflow.execute_activity_method`: each activity is
+    dispatched by name to the method of the same name on the subclass.
+    """
+
+    def __init__(self):
+        self.chatbot = chatbot_dto()
+
+    async def __call__(self, activity, arg, **kwargs):
+        return await getattr(self, activity.__name__)(arg)
@@ -0,0 +1,33 @@
+import uuid
+
+from app.services.rag.answer_cache import AnswerCache
+
+
+def test_similar_question_hits_cache():
+    cache = AnswerCache(max_chatbots=10, max_entries=10, ttl=60)
+    chatbot_id = uuid.uuid4()
+    cache.store(chatbot_id, 1, 'Where are you located?', [1.0, 0.0, 0.0], 'At 81 Victoria St')
+
+    assert cache.lookup(chatbot_id, 1, [0.99, 0.05, 0.0], 0.95) == 'At 81 Victoria St'
+    assert cache.lookup(chatbot_id, 1, [0.0, 1.0, 0.0], 0.95) is None
+
+
+def test_knowledge_version_change_discards_answers():
+    cache = AnswerCache(max_chatbots=10, max_entries=10, ttl=60)
+    chatbot_id = uuid.uuid4()
+    cache.store(chatbot_id, 1, 'q', [1.0, 0.0], 'old answer')
+
+    assert cache.lookup(chatbot_id, 2, [1.0, 0.0], 0.9) is None
+    # the stale entry is gone even for the old version
+    assert cache.lookup(chatbot_id, 1, [1.0, 0.0], 0.9) is None
+
+
+def test_oldest_answers_are_dropped_when_full():
+    cache = AnswerCache(max_chatbots=10, max_entries=2, ttl=60)
+    chatbot_id = uuid.uuid4()
+    cache.store(chatbot_id, 1, 'a', [1.0, 0.0, 0.0], 'answer a')
+    cache.store(chatbot_id, 1, 'b', [0.0, 1.0, 0.0], 'answer b')
+    cache.store(chatbot_id, 1, 'c', [0.0, 0.0, 1.0], 'answer c')
+
+    assert cache.lookup(chatbot_id, 1, [1.0, 0.0, 0.0], 0.9) is None
+    assert cache.lookup(chatbot_id, 1, [0.0, 0.0, 1.0], 0.9) == 'answer c'
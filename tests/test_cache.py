@@ -0,0 +1,43 @@
+import time
+
+from app.core.cache import TTLCache
+
+
+def test_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1  # 'b' is now the least recently used
+
+    cache.set('c', 3)
+
+    assert 'b' not in cache
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.evictions == 1
+
+
+def test_cache_expires_entries_after_ttl():
+    cache = TTLCache(maxsize=10, ttl=0.01)
+    cache.set('a', 1)
+    time.sleep(0.02)
+
+    assert cache.get('a') is None
+    assert len(cache) == 0
+
+
+def test_cache_invalidate_where_and_stats():
+    cache = TTLCache(maxsize=10)
+    cache.set(('bot-1', 'v1'), 'x')
+    cache.set(('bot-1', 'v2'), 'y')
+    cache.set(('bot-2', 'v1'), 'z')
+
+    removed = cache.invalidate_where(lambda key: key[0] == 'bot-1')
+
+    assert removed == 2
+    assert cache.get(('bot-2', 'v1')) == 'z'
+    assert cache.get(('bot-1', 'v1')) is None
+    stats = cache.stats()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['hit_rate'] == 0.5
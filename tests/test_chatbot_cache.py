@@ -0,0 +1,104 @@
+import json
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app.config.settings import load_default_chatbot_settings_dict
+from app.core.invalidation import CHATBOT, invalidation_bus
+from app.schemas.chatbot_settings import ChatbotSettings
+from app.services import chatbot as chatbot_service
+from app.services.chatbot import ChatbotService
+
+
+@pytest.fixture
+def lookups(monkeypatch):
+    """Fake database lookup recording the ids it was called with."""
+    chatbot_id = uuid.uuid4()
+    now = datetime.now(timezone.utc)
+    rows = {
+        chatbot_id: SimpleNamespace(
+            id=chatbot_id,
+            name='support',
+            description=None,
+            owner_id=uuid.uuid4(),
+            is_public=True,
+            settings=load_default_chatbot_settings_dict(),
+            knowledge_version=3,
+            created_at=now,
+            updated_at=now,
+        ),
+    }
+    calls = []
+
+    async def fake_afind_by_id(id, **kwargs):
+        calls.append(id)
+        return rows.get(id)
+
+    chatbot_service._chatbot_cache.clear()
+    monkeypatch.setattr(ChatbotService, 'afind_by_id', fake_afind_by_id)
+    yield chatbot_id, calls
+    chatbot_service._chatbot_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_aget_cached_parses_settings_once(lookups):
+    chatbot_id, calls = lookups
+
+    first = await ChatbotService.aget_cached(chatbot_id)
+    second = await ChatbotService.aget_cached(chatbot_id)
+
+    assert first is second
+    assert isinstance(first.settings, ChatbotSettings)
+    assert first.knowledge_version == 3
+    assert calls == [chatbot_id]
+
+
+@pytest.mark.asyncio
+async def test_aget_cached_does_not_cache_missing_chatbots(lookups):
+    _, calls = lookups
+    missing_id = uuid.uuid4()
+
+    assert await ChatbotService.aget_cached(missing_id) is None
+    assert await ChatbotService.aget_cached(missing_id) is None
+    assert calls == [missing_id, missing_id]
+
+
+@pytest.mark.asyncio
+async def test_invalidate_forces_a_fresh_lookup(lookups):
+    chatbot_id, calls = lookups
+    await ChatbotService.aget_cached(chatbot_id)
+
+    ChatbotService.invalidate(chatbot_id)
+    await ChatbotService.aget_cached(chatbot_id)
+
+    assert calls == [chatbot_id, chatbot_id]
+
+
+@pytest.mark.asyncio
+async def test_invalidation_from_another_process_drops_the_entry(lookups):
+    chatbot_id, calls = lookups
+    await ChatbotService.aget_cached(chatbot_id)
+
+    invalidation_bus._receive(json.dumps({'origin': 'another-process', 'topic': CHATBOT, 'key': str(chatbot_id)}))
+    await ChatbotService.aget_cached(chatbot_id)
+
+    assert calls == [chatbot_id, chatbot_id]
+
+
+@pytest.mark.asyncio
+async def test_lookup_racing_with_an_invalidation_is_not_cached(lookups, monkeypatch):
+    chatbot_id, calls = lookups
+    afind_by_id = ChatbotService.afind_by_id
+
+    async def updated_during_lookup(id, **kwargs):
+        found = await afind_by_id(id, **kwargs)
+        ChatbotService.invalidate(id)
+        return found
+
+    monkeypatch.setattr(ChatbotService, 'afind_by_id', updated_during_lookup)
+    assert await ChatbotService.aget_cached(chatbot_id) is not None
+    await ChatbotService.aget_cached(chatbot_id)
+
+    assert calls == [chatbot_id, chatbot_id]
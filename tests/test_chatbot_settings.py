@@ -0,0 +1,21 @@
+import pytest
+from pydantic import ValidationError
+
+from app.schemas.chatbot_settings import EmbeddingModel
+from app.services.rag.embeddings import EmbeddingsService
+
+
+def test_text_embedding_3_can_be_shortened():
+    em = EmbeddingModel(provider='openai', name='text-embedding-3-large', dimensions=1024)
+    model = EmbeddingsService.get_embedding_model(em)
+
+    assert model.dimensions == 1024
+    assert model._inner.dimensions == 1024
+
+
+def test_dimensions_are_checked_against_the_model():
+    with pytest.raises(ValidationError):
+        EmbeddingModel(provider='openai', name='text-embedding-3-small', dimensions=3072)
+    with pytest.raises(ValidationError):
+        EmbeddingModel(provider='openai', name='text-embedding-ada-002', dimensions=512)
+    EmbeddingModel(provider='openai', name='text-embedding-ada-002', dimensions=1536)
@@ -0,0 +1,90 @@
+import asyncio
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from llama_index.core.embeddings import MockEmbedding
+
+from app.services.dialogues import DialogueService
+from app.services.rag.dialogue_matcher import DialogueIndex, DialogueMatcher
+
+
+class KeywordEmbedding(MockEmbedding):
+    """Embeds text as keyword counts so similar questions get similar vectors."""
+
+    def _get_vector(self, text: str) -> list[float]:
+        words = text.lower().split()
+        return [float('located' in words), float('open' in words), float('price' in words)]
+
+    def _get_text_embedding(self, text: str) -> list[float]:
+        return self._get_vector(text)
+
+    async def _aget_text_embedding(self, text: str) -> list[float]:
+        return self._get_vector(text)
+
+
+def dialogue(questions: list[str], answer: str) -> SimpleNamespace:
+    return SimpleNamespace(questions=questions, answer=answer)
+
+
+@pytest.mark.asyncio
+async def test_exact_match_ignores_case_and_whitespace():
+    index = await DialogueIndex.build(
+        [dialogue(['Where are you located?'], 'At 81 Victoria St')],
+        KeywordEmbedding(embed_dim=3),
+        ('mock', 3),
+    )
+
+    assert index.match_text('  where are YOU   located? ') == 'At 81 Victoria St'
+    assert index.match_text('Where are you?') is None
+
+
+@pytest.mark.asyncio
+async def test_semantic_match_respects_threshold():
+    index = await DialogueIndex.build(
+        [
+            dialogue(['Where is the campus located'], 'At 81 Victoria St'),
+            dialogue(['When are you open', 'What are your open hours'], '9am to 5pm'),
+        ],
+        KeywordEmbedding(embed_dim=3),
+        ('mock', 3),
+    )
+
+    assert len(index) == 3
+    assert index.match_embedding([0.0, 1.0, 0.0], 0.9) == '9am to 5pm'
+    assert index.match_embedding([0.0, 0.0, 1.0], 0.9) is None
+    # a vector from a different embedding model never matches
+    assert index.match_embedding([0.0, 1.0], 0.0) is None
+
+
+@pytest.mark.asyncio
+async def test_no_dialogues_builds_empty_index():
+    index = await DialogueIndex.build([], KeywordEmbedding(embed_dim=3), ('mock', 3))
+
+    assert len(index) == 0
+    assert index.match_embedding([1.0, 0.0, 0.0], 0.0) is None
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_one_index_build(monkeypatch):
+    loads = []
+
+    async def fake_find_dialogue_by_chatbot(chatbot_id):
+        loads.append(chatbot_id)
+        await asyncio.sleep(0.01)
+        return [dialogue(['Where are you located?'], 'At 81 Victoria St')]
+
+    monkeypatch.setattr(DialogueService, 'find_dialogue_by_chatbot', fake_find_dialogue_by_chatbot)
+    matcher = DialogueMatcher()
+    chatbot_id = uuid.uuid4()
+    model = KeywordEmbedding(embed_dim=3)
+
+    indexes = await asyncio.gather(*(matcher.get_index(chatbot_id, model, ('mock', 3)) for _ in range(5)))
+
+    assert loads == [chatbot_id]
+    assert all(index is indexes[0] for index in indexes)
+    # served from the cache afterwards, a new build only follows an invalidation
+    await matcher.get_index(chatbot_id, model, ('mock', 3))
+    matcher.invalidate(chatbot_id)
+    await matcher.get_index(chatbot_id, model, ('mock', 3))
+    assert loads == [chatbot_id, chatbot_id]
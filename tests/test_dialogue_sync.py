@@ -0,0 +1,260 @@
+import logging
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from app.config.settings import load_default_chatbot_settings_dict
+from app.core.invalidation import CHATBOT, invalidation_bus
+from app.models.chatbot import Chatbot
+from app.models.dialogue import Dialogue, SyncStatus
+from app.models.users import User
+from app.services import dialogues as dialogue_service
+from app.services.dialogues import DialogueService
+from app.services.rag.embeddings import EmbeddingsService
+from app.services.rag.vectorstore import VectorStoreService
+from app.temporal.activities import dialogues as dialogue_activities
+from app.temporal.activities.dialogues import (
+    DialogueActivities, DialogueBatchDTO, DialogueBatchRequest, DialogueBatchStatusUpdateRequest, DialogueDTO
+)
+from app.temporal.workflows import DialogueSyncWorkflow
+from tests.temporal_helpers import FakeActivities, activity_error, chatbot_dto
+
+
+def _dialogues(count):
+    return [DialogueDTO(id=uuid.uuid4(), questions=[f'question {i}'], answer=f'answer {i}') for i in range(count)]
+
+
+class FakeDialogueActivities(FakeActivities):
+    """Runs the activities of a dialogue sync in process over an in-memory backlog."""
+
+    def __init__(self, dialogues, poisoned=()):
+        super().__init__()
+        self.pending = list(dialogues)
+        self.poisoned = set(poisoned)
+        self.sync_calls = []
+        self.statuses = {}
+
+    async def start_dialogue_batch(self, request):
+        batch = [dialogue for dialogue in self.pending if dialogue.id not in request.exclude_ids][:request.limit]
+        return DialogueBatchDTO(chatbot=self.chatbot, dialogues=batch)
+
+    async def sync_dialogues_to_vector_store(self, batch):
+        self.sync_calls.append(len(batch.dialogues))
+        if any(dialogue.id in self.poisoned for dialogue in batch.dialogues):
+            raise activity_error('sync_dialogues_to_vector_store')
+
+    async def update_dialogue_batch_sync_status(self, request):
+        for dialogue_id in request.dialogue_ids:
+            self.statuses[dialogue_id] = request.sync_status
+        self.pending = [dialogue for dialogue in self.pending if dialogue.id not in request.dialogue_ids]
+
+
+@pytest.mark.asyncio
+async def test_dialogues_are_synced_in_batches(run_workflow):
+    dialogues = _dialogues(5)
+    activities = FakeDialogueActivities(dialogues)
+
+    result = await run_workflow(activities, DialogueSyncWorkflow().run, activities.chatbot.id, 2)
+
+    assert result == f'5 dialogues of chatbot {activities.chatbot.id} synced, 0 failed'
+    assert activities.sync_calls == [2, 2, 1]
+    assert set(activities.statuses.values()) == {SyncStatus.SYNCED}
+
+
+@pytest.mark.asyncio
+async def test_failed_dialogue_is_isolated_from_its_batch(run_workflow):
+    dialogues = _dialogues(8)
+    poisoned = dialogues[5]
+    activities = FakeDialogueActivities(dialogues, poisoned=[poisoned.id])
+
+    result = await run_workflow(activities, DialogueSyncWorkflow().run, activities.chatbot.id, 8)
+
+    assert result == f'7 dialogues of chatbot {activities.chatbot.id} synced, 1 failed'
+    assert activities.statuses.pop(poisoned.id) == SyncStatus.FAILED
+    assert set(activities.statuses.values()) == {SyncStatus.SYNCED}
+    assert len(activities.statuses) == 7
+    # the whole batch, then the halves of each failing part
+    assert activities.sync_calls == [8, 4, 4, 2, 1, 1, 2]
+
+
+@pytest.mark.asyncio
+async def test_failed_dialogue_is_not_taken_again_by_the_run(run_workflow):
+    dialogues = _dialogues(3)
+    activities = FakeDialogueActivities(dialogues, poisoned=[dialogues[0].id])
+    # the failed dialogue stays pending, as FAILED rows do
+    update_status = activities.update_dialogue_batch_sync_status
+
+    async def keep_failed_pending(request):
+        pending = activities.pending
+        await update_status(request)
+        if request.sync_status == SyncStatus.FAILED:
+            activities.pending = pending
+
+    activities.update_dialogue_batch_sync_status = keep_failed_pending
+
+    result = await run_workflow(activities, DialogueSyncWorkflow().run, activities.chatbot.id, 1)
+
+    assert result == f'2 dialogues of chatbot {activities.chatbot.id} synced, 1 failed'
+    assert activities.sync_calls == [1, 1, 1]
+
+
+class FakeSession:
+    """Records the statements run through an async session."""
+
+    def __init__(self, chatbot=None, rows=()):
+        self.chatbot = chatbot
+        self.rows = list(rows)
+        self.statements = []
+        self.committed = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def get(self, model, id):
+        return self.chatbot
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        return SimpleNamespace(all=lambda: self.rows)
+
+    async def commit(self):
+        self.committed = True
+
+
+@pytest.mark.asyncio
+async def test_start_dialogue_batch_skips_the_excluded_dialogues(monkeypatch):
+    chatbot = chatbot_dto()
+    dialogue = _dialogues(1)[0]
+    excluded = uuid.uuid4()
+    session = FakeSession(chatbot=chatbot, rows=[(dialogue.id, dialogue.questions, dialogue.answer)])
+    monkeypatch.setattr(dialogue_activities, 'async_session_factory', lambda: session)
+
+    batch = await DialogueActivities().start_dialogue_batch(
+        DialogueBatchRequest(chatbot_id=chatbot.id, limit=10, exclude_ids=[excluded])
+    )
+
+    assert batch.dialogues == [dialogue]
+    assert session.committed
+    compiled = session.statements[0].compile(dialect=postgresql.dialect())
+    assert [excluded] in compiled.params.values()
+    assert 'ORDER BY dialogues.sync_status = ' in str(compiled)
+
+
+@pytest.mark.asyncio
+async def test_sync_dialogues_replaces_their_nodes(monkeypatch):
+    calls = {}
+
+    class FakeVectorStore:
+        async def adelete_nodes(self, filters):
+            calls['deleted'] = filters.filters[0].value
+
+        async def async_add(self, nodes):
+            calls['added'] = nodes
+
+    class FakeEmbeddingModel:
+        async def aget_text_embedding_batch(self, texts):
+            return [[float(i)] for i in range(len(texts))]
+
+    monkeypatch.setattr(VectorStoreService, 'get_vector_store', lambda *args, **kwargs: FakeVectorStore())
+    monkeypatch.setattr(EmbeddingsService, 'get_embedding_model', lambda em_settings: FakeEmbeddingModel())
+    monkeypatch.setattr(dialogue_activities.activity, 'logger', logging.getLogger(__name__))
+    dialogues = _dialogues(2)
+
+    batch = DialogueBatchDTO(chatbot=chatbot_dto(), dialogues=dialogues)
+    await DialogueActivities().sync_dialogues_to_vector_store(batch)
+
+    ids = [str(dialogue.id) for dialogue in dialogues]
+    assert calls['deleted'] == ids
+    assert [node.id_ for node in calls['added']] == ids
+    assert [node.embedding for node in calls['added']] == [[0.0], [1.0]]
+    assert 'Answer: answer 1' in calls['added'][1].text
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('sync_status, statements, published', [
+    (SyncStatus.SYNCED, 2, True),
+    (SyncStatus.FAILED, 1, False),
+])
+async def test_update_dialogue_batch_sync_status(monkeypatch, sync_status, statements, published):
+    session = FakeSession()
+    published_keys = []
+
+    async def fake_apublish(topic, key):
+        published_keys.append((topic, key))
+
+    monkeypatch.setattr(dialogue_activities, 'async_session_factory', lambda: session)
+    monkeypatch.setattr(invalidation_bus, 'apublish', fake_apublish)
+    chatbot_id = uuid.uuid4()
+
+    await DialogueActivities().update_dialogue_batch_sync_status(DialogueBatchStatusUpdateRequest(
+        chatbot_id=chatbot_id, dialogue_ids=[uuid.uuid4()], sync_status=sync_status, sync_msg='done'
+    ))
+
+    assert len(session.statements) == statements
+    # only the dialogues still in progress, edited ones went back to NA
+    assert 'AND dialogues.sync_status = ' in str(session.statements[0].compile(dialect=postgresql.dialect()))
+    assert session.committed
+    assert published_keys == ([(CHATBOT, chatbot_id)] if published else [])
+
+
+@pytest.mark.asyncio
+async def test_update_dialogue_batch_sync_status_without_dialogues_does_nothing(monkeypatch):
+    def no_session():
+        raise AssertionError('no session should be opened')
+
+    monkeypatch.setattr(dialogue_activities, 'async_session_factory', no_session)
+
+    await DialogueActivities().update_dialogue_batch_sync_status(DialogueBatchStatusUpdateRequest(
+        chatbot_id=uuid.uuid4(), dialogue_ids=[], sync_status=SyncStatus.SYNCED, sync_msg='done'
+    ))
+
+
+@pytest.mark.asyncio
+async def test_dialogue_edited_during_its_sync_is_not_marked_synced(postgres_db, monkeypatch):
+    session_factory, _ = postgres_db
+
+    async def fake_apublish(topic, key):
+        pass
+
+    monkeypatch.setattr(dialogue_activities, 'async_session_factory', session_factory)
+    monkeypatch.setattr(dialogue_service, 'async_session_factory', session_factory)
+    monkeypatch.setattr(invalidation_bus, 'apublish', fake_apublish)
+
+    async with session_factory() as session:
+        user = User(cognito_id='fake-cognito-id', handle='testuser')
+        session.add(user)
+        await session.commit()
+        chatbot = Chatbot(
+            name='support',
+            description='A description',
+            owner_id=user.id,
+            is_public=False,
+            settings=load_default_chatbot_settings_dict(),
+        )
+        session.add(chatbot)
+        await session.commit()
+        session.add_all([
+            Dialogue(name=f'dialogue {i}', questions=[f'question {i}'], answer=f'answer {i}', chatbot_id=chatbot.id, sync_msg='')
+            for i in range(2)
+        ])
+        await session.commit()
+
+    activities = DialogueActivities()
+    batch = await activities.start_dialogue_batch(DialogueBatchRequest(chatbot_id=chatbot.id, limit=10))
+    edited, synced = [dialogue.id for dialogue in batch.dialogues]
+    await DialogueService.edit_dialogue(edited, ['edited question'], 'edited answer')
+    await activities.update_dialogue_batch_sync_status(DialogueBatchStatusUpdateRequest(
+        chatbot_id=chatbot.id, dialogue_ids=[edited, synced], sync_status=SyncStatus.SYNCED, sync_msg='done'
+    ))
+
+    async with session_factory() as session:
+        statuses = dict((await session.execute(
+            select(Dialogue.id, Dialogue.sync_status).where(Dialogue.chatbot_id == chatbot.id)
+        )).all())
+    assert statuses == {edited: SyncStatus.NA, synced: SyncStatus.SYNCED}
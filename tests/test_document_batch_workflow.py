@@ -0,0 +1,118 @@
+import asyncio
+import uuid
+
+import pytest
+
+from app.models.document import SyncStatus
+from app.temporal.activities.documents import (
+    DocumentBatchDTO, DocumentBatchSyncRequest, DocumentDTO, DocumentParsePlan, ParsedPage
+)
+from app.temporal.workflows import DocumentBatchSyncWorkflow
+from tests.temporal_helpers import FakeActivities, activity_error
+
+
+class FakeBatchActivities(FakeActivities):
+    """Runs the activities of a batch sync in process, recording their calls."""
+
+    def __init__(self, documents, ranges_per_document=3, failing=(), poisoned=()):
+        super().__init__()
+        self.documents = documents
+        self.ranges_per_document = ranges_per_document
+        self.failing = set(failing)
+        self.poisoned = set(poisoned)
+        self.ocr_in_flight = 0
+        self.max_ocr_in_flight = 0
+        self.synced_groups = []
+        self.statuses = {}
+
+    async def start_batch_sync(self, document_ids):
+        return DocumentBatchDTO(chatbot=self.chatbot, documents=self.documents)
+
+    async def plan_parse(self, document):
+        return DocumentParsePlan(ocr_ranges=[[i] for i in range(self.ranges_per_document)], max_concurrency=8)
+
+    async def ocr_pages(self, request):
+        self.ocr_in_flight += 1
+        self.max_ocr_in_flight = max(self.max_ocr_in_flight, self.ocr_in_flight)
+        try:
+            for _ in range(3):
+                await asyncio.sleep(0)
+            if request.document.id in self.failing:
+                raise activity_error('ocr_pages')
+            return [ParsedPage(index=page, markdown=f'page {page}') for page in request.pages]
+        finally:
+            self.ocr_in_flight -= 1
+
+    async def cache_parsed_document(self, parsed):
+        return None
+
+    async def sync_batch_to_vector_store(self, batch):
+        self.synced_groups.append([parsed.document.id for parsed in batch.documents])
+        if any(parsed.document.id in self.poisoned for parsed in batch.documents):
+            raise activity_error('sync_batch_to_vector_store')
+
+    async def update_batch_sync_status(self, request):
+        self.statuses[request.sync_status] = set(request.document_ids)
+
+
+def _documents(count):
+    chatbot_id = uuid.uuid4()
+    return [
+        DocumentDTO(
+            id=uuid.uuid4(),
+            file_url=f'{i}.pdf',
+            mime_type='application/pdf',
+            sync_status='IN_PROGRESS',
+            chatbot_id=chatbot_id,
+        )
+        for i in range(count)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_ocr_limit_is_shared_by_the_batch(run_workflow):
+    documents = _documents(4)
+    activities = FakeBatchActivities(documents)
+
+    result = await run_workflow(activities, DocumentBatchSyncWorkflow().run, DocumentBatchSyncRequest(
+        document_ids=[document.id for document in documents],
+        max_concurrency=4,
+        ocr_max_concurrency=2,
+    ))
+
+    assert result == '4 of 4 documents synced'
+    assert activities.max_ocr_in_flight == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_document_does_not_fail_the_batch(run_workflow):
+    documents = _documents(5)
+    activities = FakeBatchActivities(documents, failing=[documents[1].id])
+
+    result = await run_workflow(activities, DocumentBatchSyncWorkflow().run, DocumentBatchSyncRequest(
+        document_ids=[document.id for document in documents],
+        embed_batch_size=2,
+    ))
+
+    assert result == '4 of 5 documents synced'
+    assert activities.statuses[SyncStatus.FAILED] == {documents[1].id}
+    assert activities.statuses[SyncStatus.SYNCED] == {document.id for document in documents} - {documents[1].id}
+    assert [len(group) for group in activities.synced_groups] == [2, 2]
+
+
+@pytest.mark.asyncio
+async def test_failed_document_is_isolated_from_its_group(run_workflow):
+    documents = _documents(6)
+    poisoned = documents[4]
+    activities = FakeBatchActivities(documents, poisoned=[poisoned.id])
+
+    result = await run_workflow(activities, DocumentBatchSyncWorkflow().run, DocumentBatchSyncRequest(
+        document_ids=[document.id for document in documents],
+        embed_batch_size=6,
+    ))
+
+    assert result == '5 of 6 documents synced'
+    assert activities.statuses[SyncStatus.FAILED] == {poisoned.id}
+    assert activities.statuses[SyncStatus.SYNCED] == {document.id for document in documents} - {poisoned.id}
+    # the whole group, then the halves of each failing part
+    assert [len(group) for group in activities.synced_groups] == [6, 3, 3, 1, 2, 1, 1]
@@ -0,0 +1,192 @@
+import asyncio
+import io
+import uuid
+
+import pytest
+from fastapi import UploadFile
+from sqlalchemy import func, select
+from temporalio.exceptions import WorkflowAlreadyStartedError
+
+from app.config.settings import load_default_chatbot_settings_dict
+from app.models.chatbot import Chatbot
+from app.models.document import Document, SyncStatus
+from app.models.users import User
+from app.routers import document as document_router
+from app.schemas.document import DocumentCreate
+from app.services import document as document_service
+from app.services.document import DocumentService
+from app.services.s3 import FileTooLargeError, S3Service
+
+
+class FakeSession:
+    """Records what a service adds and commits through an async session."""
+
+    def __init__(self, fail_commit=False):
+        self.added = []
+        self.committed = False
+        self.fail_commit = fail_commit
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def add_all(self, instances):
+        self.added.extend(instances)
+
+    async def commit(self):
+        if self.fail_commit:
+            raise RuntimeError('commit failed')
+        self.committed = True
+
+
+@pytest.fixture
+def uploads(monkeypatch):
+    """Fake S3 recording the objects uploaded and deleted by key."""
+    objects = {}
+    deleted = []
+
+    async def fake_upload_file(file, key, max_bytes=None):
+        content = await file.read()
+        if content == b'too large':
+            raise FileTooLargeError(1)
+        objects[key] = content
+        return f'hash-{content.decode()}'
+
+    async def fake_adelete_files(keys):
+        deleted.extend(keys)
+        for key in keys:
+            objects.pop(key)
+
+    monkeypatch.setattr(S3Service, 'upload_file', fake_upload_file)
+    monkeypatch.setattr(S3Service, 'adelete_files', fake_adelete_files)
+    return objects, deleted
+
+
+def _upload_file(content: bytes, filename: str = 'file.pdf') -> UploadFile:
+    return UploadFile(io.BytesIO(content), filename=filename)
+
+
+@pytest.mark.asyncio
+async def test_acreate_many_inserts_every_document_in_one_commit(monkeypatch):
+    session = FakeSession()
+    monkeypatch.setattr(document_service, 'async_session_factory', lambda: session)
+    chatbot_id = uuid.uuid4()
+
+    documents = await DocumentService.acreate_many([
+        DocumentCreate(
+            chatbot_id=chatbot_id, title=f'{i}.pdf', key=f'key-{i}', mime_type='application/pdf', content_hash=f'hash-{i}'
+        )
+        for i in range(3)
+    ])
+
+    assert session.committed
+    assert session.added == documents
+    assert [document.file_url for document in documents] == ['key-0', 'key-1', 'key-2']
+    assert {document.sync_status for document in documents} == {SyncStatus.NA}
+    # the request starts their sync, not the sync listener
+    assert all(document.claimed_at is not None for document in documents)
+    assert len({document.id for document in documents}) == 3
+
+
+@pytest.mark.asyncio
+async def test_uploaded_documents_are_created_together(uploads, monkeypatch):
+    objects, deleted = uploads
+    session = FakeSession()
+    monkeypatch.setattr(document_service, 'async_session_factory', lambda: session)
+    chatbot_id = uuid.uuid4()
+
+    documents = await document_router._acreate_uploaded_documents(
+        [_upload_file(b'a', 'a.pdf'), _upload_file(b'b', '../b.pdf')],
+        chatbot_id,
+    )
+
+    assert [document.title for document in documents] == ['a.pdf', 'b.pdf']
+    assert sorted(document.content_hash for document in documents) == ['hash-a', 'hash-b']
+    assert sorted(objects) == sorted(document.file_url for document in documents)
+    assert all(key.startswith(f'uploads/{chatbot_id}/') for key in objects)
+    assert deleted == []
+
+
+@pytest.mark.asyncio
+async def test_failed_upload_deletes_the_other_uploads(uploads, monkeypatch):
+    objects, deleted = uploads
+    session = FakeSession()
+    monkeypatch.setattr(document_service, 'async_session_factory', lambda: session)
+
+    with pytest.raises(FileTooLargeError):
+        await document_router._acreate_uploaded_documents(
+            [_upload_file(b'a'), _upload_file(b'too large'), _upload_file(b'c')],
+            uuid.uuid4(),
+        )
+
+    assert objects == {}
+    assert len(deleted) == 2
+    assert session.added == []
+
+
+@pytest.mark.asyncio
+async def test_failed_insert_deletes_the_uploads(uploads, monkeypatch):
+    objects, deleted = uploads
+    monkeypatch.setattr(document_service, 'async_session_factory', lambda: FakeSession(fail_commit=True))
+
+    with pytest.raises(RuntimeError):
+        await document_router._acreate_uploaded_documents([_upload_file(b'a'), _upload_file(b'b')], uuid.uuid4())
+
+    assert objects == {}
+    assert len(deleted) == 2
+
+
+@pytest.mark.asyncio
+async def test_sync_started_by_a_scheduler_is_not_an_error(monkeypatch):
+    document_id = uuid.uuid4()
+    started = []
+
+    class FakeClient:
+        async def start_workflow(self, workflow, arg, id, task_queue):
+            if id in started:
+                raise WorkflowAlreadyStartedError(id, 'DocumentSyncWorkflow')
+            started.append(id)
+
+    client = FakeClient()
+
+    async def fake_get_client():
+        return client
+
+    monkeypatch.setattr(document_router, 'get_client', fake_get_client)
+    await document_router._astart_document_sync(document_id)
+    await document_router._astart_document_sync(document_id)
+
+    assert started == [f'document-sync-{document_id}']
+
+
+@pytest.mark.asyncio
+async def test_upload_completed_concurrently_creates_one_document(postgres_db, monkeypatch):
+    session_factory, _ = postgres_db
+    monkeypatch.setattr(document_service, 'async_session_factory', session_factory)
+
+    async with session_factory() as session:
+        user = User(cognito_id='fake-cognito-id', handle='testuser')
+        session.add(user)
+        await session.commit()
+        chatbot = Chatbot(
+            name='support',
+            description='A description',
+            owner_id=user.id,
+            is_public=False,
+            settings=load_default_chatbot_settings_dict(),
+        )
+        session.add(chatbot)
+        await session.commit()
+
+    document_create = DocumentCreate(
+        chatbot_id=chatbot.id, title='a.pdf', key=f'uploads/{chatbot.id}/a.pdf', mime_type='application/pdf'
+    )
+    results = await asyncio.gather(*(DocumentService.acreate_from_upload(document_create) for _ in range(3)))
+
+    assert sorted(created for _, created in results) == [False, False, True]
+    assert len({document.id for document, _ in results}) == 1
+    async with session_factory() as session:
+        count = (await session.execute(select(func.count()).select_from(Document))).scalar_one()
+    assert count == 1
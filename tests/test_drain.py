@@ -0,0 +1,111 @@
+import asyncio
+import uuid
+
+import pytest
+from temporalio.exceptions import WorkflowAlreadyStartedError
+
+from app.tasks import drain as drain_module
+from app.tasks.drain import RateLimiter, drain, run_drain, single_page
+from app.temporal import client as temporal_client
+
+
+def _backlog(ids):
+    pending = sorted(ids)
+
+    async def claim(limit):
+        page = pending[:limit]
+        del pending[:limit]
+        return page
+
+    return claim
+
+
+@pytest.mark.asyncio
+async def test_drain_pages_through_the_backlog():
+    ids = [uuid.uuid4() for _ in range(25)]
+    started = []
+
+    async def start(item_id):
+        started.append(item_id)
+
+    result = await drain(_backlog(ids), start, page_size=10, concurrency=4, rate=0)
+
+    assert sorted(started) == sorted(ids)
+    assert result.started == 25
+
+
+@pytest.mark.asyncio
+async def test_drain_bounds_concurrency():
+    in_flight = 0
+    peak = 0
+
+    async def start(item_id):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.001)
+        in_flight -= 1
+
+    await drain(_backlog([uuid.uuid4() for _ in range(20)]), start, page_size=20, concurrency=3, rate=0)
+
+    assert peak == 3
+
+
+@pytest.mark.asyncio
+async def test_drain_skips_running_workflows_and_counts_failures():
+    ids = [uuid.uuid4() for _ in range(3)]
+    running, broken = sorted(ids)[:2]
+
+    async def start(item_id):
+        if item_id == running:
+            raise WorkflowAlreadyStartedError(f'sync-{item_id}', 'SyncWorkflow')
+        if item_id == broken:
+            raise RuntimeError('temporal unavailable')
+
+    result = await drain(_backlog(ids), start, rate=0)
+
+    assert (result.started, result.already_running, result.failed) == (1, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_drain_single_id():
+    item_id = uuid.uuid4()
+    started = []
+
+    async def start(i):
+        started.append(i)
+
+    await drain(single_page(item_id), start)
+
+    assert started == [item_id]
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_spaces_calls():
+    limiter = RateLimiter(rate=100)
+    loop = asyncio.get_running_loop()
+
+    begin = loop.time()
+    for _ in range(5):
+        await limiter.acquire()
+
+    assert loop.time() - begin >= 0.035
+
+
+def test_run_drain_releases_what_is_bound_to_its_event_loop(monkeypatch):
+    disposed = []
+
+    class FakeEngine:
+        async def dispose(self):
+            disposed.append(asyncio.get_running_loop())
+
+    async def scan():
+        temporal_client._client = object()
+        return asyncio.get_running_loop()
+
+    monkeypatch.setattr(drain_module, 'engine', FakeEngine())
+    loops = [run_drain(scan()), run_drain(scan())]
+
+    assert disposed == loops
+    assert loops[0] is not loops[1]
+    assert temporal_client._client is None
@@ -0,0 +1,79 @@
+import pytest
+from llama_index.core import MockEmbedding
+
+from app.services.rag.embedding_cache import CachedEmbedding, EmbeddingCache
+
+
+class CountingEmbedding(MockEmbedding):
+    """Mock embedding model that records the texts sent to the provider."""
+
+    def __init__(self, **kwargs):
+        super().__init__(embed_dim=4, **kwargs)
+        object.__setattr__(self, 'requests', [])
+
+    def _get_text_embeddings(self, texts):
+        self.requests.append(list(texts))
+        return super()._get_text_embeddings(texts)
+
+    def _get_query_embedding(self, query):
+        self.requests.append([query])
+        return super()._get_query_embedding(query)
+
+
+def test_repeated_query_is_served_from_cache():
+    inner = CountingEmbedding()
+    cache = EmbeddingCache(maxsize=100, ttl=60, redis_url=None)
+    model = CachedEmbedding(inner, dimensions=4, cache=cache)
+
+    first = model.get_query_embedding('What are your opening hours?')
+    second = model.get_query_embedding('  what are your   OPENING hours?')
+
+    assert first == second
+    assert inner.requests == [['What are your opening hours?']]
+    stats = cache.stats()
+    assert stats['memory_hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['round_trips_saved'] == 1
+
+
+def test_batch_only_embeds_cache_misses():
+    inner = CountingEmbedding()
+    cache = EmbeddingCache(maxsize=100, ttl=60, redis_url=None)
+    model = CachedEmbedding(inner, dimensions=4, cache=cache)
+    model.get_text_embedding('chunk one')
+
+    embeddings = model.get_text_embedding_batch(['chunk one', 'chunk two'])
+
+    assert len(embeddings) == 2
+    assert inner.requests[-1] == ['chunk two']
+
+
+def test_cache_key_includes_model_and_dimensions():
+    key = EmbeddingCache.make_key('text-embedding-3-large', 3072, 'hello')
+
+    assert key != EmbeddingCache.make_key('text-embedding-3-large', 256, 'hello')
+    assert key != EmbeddingCache.make_key('text-embedding-3-small', 3072, 'hello')
+    assert key != EmbeddingCache.make_key('text-embedding-3-large', 3072, ' Hello ')
+    assert key == EmbeddingCache.make_key('text-embedding-3-large', 3072, ' Hello ', normalize=True)
+
+
+def test_documents_differing_in_case_are_embedded_separately():
+    inner = CountingEmbedding()
+    cache = EmbeddingCache(maxsize=100, ttl=60, redis_url=None)
+    model = CachedEmbedding(inner, dimensions=4, cache=cache)
+
+    model.get_text_embedding_batch(['Opening Hours', 'opening  hours'])
+
+    assert inner.requests == [['Opening Hours', 'opening  hours']]
+
+
+@pytest.mark.asyncio
+async def test_async_query_uses_cache():
+    inner = CountingEmbedding()
+    cache = EmbeddingCache(maxsize=100, ttl=60, redis_url=None)
+    model = CachedEmbedding(inner, dimensions=4, cache=cache)
+
+    await model.aget_query_embedding('hello')
+    await model.aget_query_embedding('hello')
+
+    assert cache.stats()['memory_hits'] == 1
@@ -0,0 +1,85 @@
+import json
+import uuid
+
+import pytest
+
+from app.core.invalidation import CHATBOT, DIALOGUES, LocalInvalidationBus, by_chatbot_id
+
+
+class LinkedBus(LocalInvalidationBus):
+    """Delivers published messages to the other buses, like a shared channel would."""
+
+    def __init__(self, peers: list['LinkedBus']) -> None:
+        super().__init__()
+        self.peers = peers
+        peers.append(self)
+
+    def _send(self, message: str) -> None:
+        for peer in self.peers:
+            peer._receive(message)
+
+    async def _asend(self, message: str) -> None:
+        self._send(message)
+
+
+def test_publish_invalidates_the_publishing_process():
+    bus = LocalInvalidationBus()
+    received = []
+    bus.subscribe(CHATBOT, received.append)
+
+    chatbot_id = uuid.uuid4()
+    bus.publish(CHATBOT, chatbot_id)
+    bus.publish(DIALOGUES, chatbot_id)
+
+    assert received == [str(chatbot_id)]
+
+
+@pytest.mark.asyncio
+async def test_apublish_reaches_every_process_once():
+    peers = []
+    publisher, other = LinkedBus(peers), LinkedBus(peers)
+    received = {'publisher': [], 'other': []}
+    publisher.subscribe(CHATBOT, received['publisher'].append)
+    other.subscribe(CHATBOT, received['other'].append)
+
+    await publisher.apublish(CHATBOT, 'a')
+
+    # the publisher skips its own message coming back from the channel
+    assert received == {'publisher': ['a'], 'other': ['a']}
+
+
+def test_malformed_messages_are_ignored():
+    bus = LocalInvalidationBus()
+    received = []
+    bus.subscribe(CHATBOT, received.append)
+
+    bus._receive('not json')
+    bus._receive(json.dumps({'origin': 'elsewhere', 'topic': CHATBOT, 'key': 'a'}))
+
+    assert received == ['a']
+
+
+def test_failing_handler_does_not_stop_the_others():
+    bus = LocalInvalidationBus()
+    received = []
+
+    def fail(key):
+        raise RuntimeError('boom')
+
+    bus.subscribe(CHATBOT, fail)
+    bus.subscribe(CHATBOT, received.append)
+    bus.publish(CHATBOT, 'a')
+
+    assert received == ['a']
+
+
+def test_by_chatbot_id_clears_everything_without_a_key():
+    invalidated, cleared = [], []
+    handler = by_chatbot_id(invalidated.append, lambda: cleared.append(True))
+    chatbot_id = uuid.uuid4()
+
+    handler(str(chatbot_id))
+    handler(None)
+
+    assert invalidated == [chatbot_id]
+    assert cleared == [True]
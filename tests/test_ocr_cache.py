@@ -0,0 +1,29 @@
+import pytest
+
+from app.services.ocr_cache import DiskOcrCache, NullOcrCache
+
+
+@pytest.mark.asyncio
+async def test_disk_ocr_cache_round_trip(tmp_path):
+    cache = DiskOcrCache(tmp_path)
+    await cache.set('abc123', 'mistral-ocr-latest', '# Title\n\nbody')
+
+    assert await cache.get('abc123', 'mistral-ocr-latest') == '# Title\n\nbody'
+
+
+@pytest.mark.asyncio
+async def test_disk_ocr_cache_miss(tmp_path):
+    cache = DiskOcrCache(tmp_path)
+    await cache.set('abc123', 'mistral-ocr-latest', 'text')
+
+    assert await cache.get('def456', 'mistral-ocr-latest') is None
+    # results of another model are not reused
+    assert await cache.get('abc123', 'mistral-ocr-2503') is None
+
+
+@pytest.mark.asyncio
+async def test_null_ocr_cache_never_hits():
+    cache = NullOcrCache()
+    await cache.set('abc123', 'mistral-ocr-latest', 'text')
+
+    assert await cache.get('abc123', 'mistral-ocr-latest') is None
@@ -0,0 +1,80 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from app.core.pagination import apaginate, decode_cursor, encode_cursor
+from app.models.document import Document
+
+
+class FakeSession:
+    """Returns the given rows and records the executed query."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    async def execute(self, query):
+        self.queries.append(query)
+        limit = query._limit_clause.value
+        return SimpleNamespace(all=lambda: self.rows[:limit])
+
+
+def _rows(count):
+    now = datetime.now(timezone.utc)
+    return [SimpleNamespace(id=uuid.uuid4(), created_at=now - timedelta(minutes=i)) for i in range(count)]
+
+
+def _sql(query) -> str:
+    return str(query.compile(dialect=postgresql.dialect()))
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2026, 10, 18, 12, 30, tzinfo=timezone.utc)
+    id = uuid.uuid4()
+
+    assert decode_cursor(encode_cursor(created_at, id)) == (created_at, id)
+
+
+@pytest.mark.parametrize('cursor', ['', 'not a cursor', encode_cursor(datetime.now(), uuid.uuid4())[:-4]])
+def test_invalid_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+@pytest.mark.asyncio
+async def test_apaginate_returns_a_cursor_to_the_last_row_of_a_full_page():
+    rows = _rows(3)
+    session = FakeSession(rows)
+
+    page = await apaginate(session, select(Document.id, Document.created_at), Document, limit=2)
+
+    assert page.items == rows[:2]
+    assert decode_cursor(page.next_cursor) == (rows[1].created_at, rows[1].id)
+    sql = _sql(session.queries[0])
+    assert 'ORDER BY documents.created_at DESC, documents.id DESC' in sql
+    assert 'LIMIT' in sql
+
+
+@pytest.mark.asyncio
+async def test_apaginate_last_page_has_no_cursor():
+    rows = _rows(2)
+    session = FakeSession(rows)
+
+    page = await apaginate(session, select(Document.id, Document.created_at), Document, limit=2)
+
+    assert page.items == rows
+    assert page.next_cursor is None
+
+
+@pytest.mark.asyncio
+async def test_apaginate_continues_after_the_cursor():
+    session = FakeSession([])
+    cursor = encode_cursor(datetime.now(timezone.utc), uuid.uuid4())
+
+    await apaginate(session, select(Document.id, Document.created_at), Document, limit=10, cursor=cursor)
+
+    assert '(documents.created_at, documents.id) < (' in _sql(session.queries[0])
@@ -0,0 +1,74 @@
+import io
+
+import pypdf
+import pytest
+
+from app.services import parse
+from app.services.parse import PDF_TEXT_LAYER_MIN_CHARS, DocumentParserService, _usable_text
+
+
+def test_text_layer_is_used():
+    text = 'The quick brown fox jumps over the lazy dog. ' * 3
+
+    assert _usable_text(f'  {text}\n') == text.strip()
+
+
+def test_short_text_layer_is_ocred():
+    assert _usable_text('') is None
+    assert _usable_text('Page 3') is None
+    assert _usable_text('x' * (PDF_TEXT_LAYER_MIN_CHARS - 1)) is None
+
+
+def test_unmapped_font_text_layer_is_ocred():
+    text = 'Invoice ' + '�' * 20
+
+    assert _usable_text(text) is None
+
+
+def test_split_page_ranges():
+    pages = [0, 1, 2, 5, 6, 9, 10]
+
+    assert DocumentParserService.split_page_ranges(pages, 3) == [[0, 1, 2], [5, 6, 9], [10]]
+    assert DocumentParserService.split_page_ranges([], 3) == []
+
+
+def test_merge_pages_in_page_order():
+    # OCR ranges complete in any order
+    pages = {10: 'ten', 2: 'two', 0: 'zero', 5: ''}
+
+    assert DocumentParserService.merge_pages(pages) == 'zero\n\ntwo\n\nten'
+
+
+def _blank_pdf(pages: int) -> bytes:
+    writer = pypdf.PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=612, height=792)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def test_pages_without_text_layer_are_ocred():
+    assert DocumentParserService.extract_text_layer(_blank_pdf(3)) == [None, None, None]
+
+
+@pytest.mark.asyncio
+async def test_plan_ocrs_every_page_without_text_layer():
+    pages, ocr_pages = await DocumentParserService.aplan_pdf(_blank_pdf(45))
+
+    assert pages == {}
+    assert ocr_pages == list(range(45))
+    assert len(DocumentParserService.split_page_ranges(ocr_pages)) == 3
+
+
+@pytest.mark.asyncio
+async def test_plan_counts_pages_when_text_layer_is_disabled(monkeypatch):
+    monkeypatch.setattr(parse, 'PDF_TEXT_LAYER_ENABLED', False)
+
+    assert await DocumentParserService.aplan_pdf(_blank_pdf(2)) == ({}, [0, 1])
+
+
+@pytest.mark.asyncio
+async def test_plan_of_unreadable_pdf_fails():
+    with pytest.raises(ValueError):
+        await DocumentParserService.aplan_pdf(b'not a pdf')
@@ -0,0 +1,145 @@
+import json
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+from llama_index.core.llms import MessageRole
+from llama_index.core.memory import ChatMemoryBuffer
+from llama_index.core.schema import NodeWithScore, TextNode
+
+from app.agents import rag
+from app.agents.qa import QaAgentWorkflow
+from app.agents.rag import RagWorkflow, _format_context
+from app.config.settings import load_default_chatbot_settings_dict
+from app.core.limiter import limiter
+from app.main import app
+from app.schemas.chatbot_settings import ChatbotSettings
+from app.services.chatbot import ChatbotService
+from app.services.rag.vsi import VsiService
+
+
+def _settings(mode: str = 'agent') -> ChatbotSettings:
+    settings = ChatbotSettings.model_validate(load_default_chatbot_settings_dict())
+    settings.chat.mode = mode
+    return settings
+
+
+def _nodes(*texts: str) -> list[NodeWithScore]:
+    return [NodeWithScore(node=TextNode(text=text), score=1.0) for text in texts]
+
+
+def _memory() -> ChatMemoryBuffer:
+    # counts words, so the default tokenizer is not downloaded
+    return ChatMemoryBuffer.from_defaults(tokenizer_fn=str.split)
+
+
+class FakeLLM:
+    """Streams a canned answer, recording the messages it was sent."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.messages = None
+
+    async def astream_chat(self, messages):
+        self.messages = messages
+
+        async def stream():
+            answer = ''
+            for chunk in self.chunks:
+                answer += chunk
+                yield SimpleNamespace(message=SimpleNamespace(content=answer))
+
+        return stream()
+
+
+@pytest.fixture
+def retrieved(monkeypatch):
+    """Stub the chatbot's index, returning the retrieved nodes and the queries made."""
+    nodes = []
+    queries = []
+
+    class FakeRetriever:
+        async def aretrieve(self, query):
+            queries.append(query)
+            return nodes
+
+    async def fake_aget_vsi(chatbot_id, chatbot_settings):
+        return SimpleNamespace(as_retriever=lambda **kwargs: FakeRetriever())
+
+    monkeypatch.setattr(VsiService, 'aget_vsi', fake_aget_vsi)
+    return nodes, queries
+
+
+@pytest.mark.asyncio
+async def test_retrieved_nodes_are_the_prompt_context(retrieved, monkeypatch):
+    nodes, queries = retrieved
+    nodes.extend(_nodes('We open at 9am.', 'We close at 5pm.'))
+    llm = FakeLLM(['We open ', 'at 9am.'])
+    monkeypatch.setattr(rag, 'OpenAI', lambda model: llm)
+    memory = _memory()
+
+    workflow = RagWorkflow(str(uuid.uuid4()), _settings('rag'))
+    answers = [answer async for answer in workflow._agenerate('When do you open?', [0.5], memory, [])]
+
+    assert answers == ['We open ', 'We open at 9am.']
+    # the embedding computed before retrieval is reused
+    assert queries[0].query_str == 'When do you open?'
+    assert queries[0].embedding == [0.5]
+    system, question = llm.messages
+    assert system.role == MessageRole.SYSTEM
+    assert 'We open at 9am.\n\n---\n\nWe close at 5pm.' in system.content
+    assert question.content == 'When do you open?'
+    assert [message.content for message in memory.get_all()] == ['When do you open?', 'We open at 9am.']
+
+
+@pytest.mark.asyncio
+async def test_chat_history_is_sent_before_the_question(retrieved, monkeypatch):
+    llm = FakeLLM(['Still 9am.'])
+    monkeypatch.setattr(rag, 'OpenAI', lambda model: llm)
+    memory = _memory()
+    workflow = RagWorkflow(str(uuid.uuid4()), _settings('rag'))
+    async for _ in workflow._agenerate('When do you open?', None, memory, []):
+        pass
+
+    async for _ in workflow._agenerate('And on Sundays?', None, memory, []):
+        pass
+
+    assert [message.content for message in llm.messages[1:]] == [
+        'When do you open?', 'Still 9am.', 'And on Sundays?'
+    ]
+
+
+def test_context_without_nodes_says_so():
+    assert _format_context([]) == '(no matching documents)'
+    assert _format_context(_nodes('only chunk')) == 'only chunk'
+
+
+@pytest.mark.parametrize('mode, workflow_class', [
+    ('rag', RagWorkflow),
+    ('agent', QaAgentWorkflow),
+])
+def test_chat_mode_selects_the_workflow(monkeypatch, mode, workflow_class):
+    chatbot_id = uuid.uuid4()
+    used = []
+
+    async def fake_aget_cached(id):
+        return SimpleNamespace(id=id, settings=_settings(mode), knowledge_version=1)
+
+    async def fake_arespond(self, question, thread_id):
+        used.append(type(self))
+        yield 'answer'
+
+    monkeypatch.setattr(ChatbotService, 'aget_cached', fake_aget_cached)
+    monkeypatch.setattr(QaAgentWorkflow, 'arespond', fake_arespond)
+    monkeypatch.setattr(limiter, 'enabled', False)
+
+    response = TestClient(app).post(
+        '/api/v1/chatbots/public/chat',
+        json={'chatbot_id': str(chatbot_id), 'message': 'When do you open?'},
+    )
+
+    assert response.status_code == 200
+    event = response.text.split('data: ', 1)[1]
+    assert json.loads(event)['message'] == 'answer'
+    assert used == [workflow_class]
@@ -0,0 +1,122 @@
+import hashlib
+import io
+import threading
+
+import pytest
+from fastapi import UploadFile
+
+from app.services import s3
+from app.services.s3 import FileTooLargeError, S3Service
+
+
+class FakeS3Client:
+    """Records the calls of the upload paths of a boto3 S3 client."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.objects = {}
+        self.uploads = {}
+        self.aborted = []
+
+    def put_object(self, Bucket, Key, Body, ContentType):
+        self.objects[Key] = Body
+
+    def create_multipart_upload(self, Bucket, Key, ContentType):
+        self.uploads['upload-1'] = {}
+        return {'UploadId': 'upload-1'}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        with self.lock:
+            self.uploads[UploadId][PartNumber] = Body
+        return {'ETag': f'etag-{PartNumber}'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        parts = self.uploads.pop(UploadId)
+        numbers = [part['PartNumber'] for part in MultipartUpload['Parts']]
+        assert numbers == sorted(parts)
+        self.objects[Key] = b''.join(parts[number] for number in numbers)
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.uploads.pop(UploadId)
+        self.aborted.append(UploadId)
+
+
+@pytest.fixture
+def s3_client(monkeypatch):
+    client = FakeS3Client()
+    monkeypatch.setattr(S3Service, 'get_s3_client', classmethod(lambda cls: client))
+    monkeypatch.setattr(s3, 'S3_UPLOAD_PART_SIZE', 4)
+    return client
+
+
+def _upload_file(content: bytes) -> UploadFile:
+    return UploadFile(io.BytesIO(content), filename='file.pdf')
+
+
+@pytest.mark.asyncio
+async def test_small_file_is_put_in_one_request(s3_client):
+    content_hash = await S3Service.upload_file(_upload_file(b'abc'), 'small')
+
+    assert s3_client.objects['small'] == b'abc'
+    assert content_hash == hashlib.sha256(b'abc').hexdigest()
+
+
+@pytest.mark.asyncio
+async def test_large_file_is_uploaded_in_parts(s3_client):
+    content = bytes(range(30))
+
+    content_hash = await S3Service.upload_file(_upload_file(content), 'large')
+
+    assert s3_client.objects['large'] == content
+    assert content_hash == hashlib.sha256(content).hexdigest()
+
+
+@pytest.mark.asyncio
+async def test_too_large_file_is_aborted(s3_client):
+    with pytest.raises(FileTooLargeError):
+        await S3Service.upload_file(_upload_file(bytes(30)), 'huge', max_bytes=20)
+
+    assert 'huge' not in s3_client.objects
+    assert s3_client.aborted == ['upload-1']
+
+
+class SigningS3Client:
+
+    def __init__(self):
+        self.signed = 0
+
+    def generate_presigned_url(self, method, Params, ExpiresIn):
+        self.signed += 1
+        return f"https://bucket/{Params['Key']}?expires={ExpiresIn}&n={self.signed}"
+
+
+@pytest.fixture
+def signing_client(monkeypatch):
+    client = SigningS3Client()
+    monkeypatch.setattr(S3Service, 'get_s3_client', classmethod(lambda cls: client))
+    s3._presigned_url_cache.clear()
+    yield client
+    s3._presigned_url_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_presigned_urls_are_reused(signing_client):
+    first = await S3Service.agenerate_presigned_url('doc.pdf')
+    second = await S3Service.agenerate_presigned_url('doc.pdf')
+
+    assert first == second == S3Service.generate_presigned_url('doc.pdf')
+    assert signing_client.signed == 1
+    assert await S3Service.agenerate_presigned_url('other.pdf') != first
+
+
+def test_short_lived_presigned_urls_are_not_cached(signing_client):
+    S3Service.generate_presigned_url('doc.pdf', expiry=60)
+    S3Service.generate_presigned_url('doc.pdf', expiry=60)
+
+    assert signing_client.signed == 2
+
+
+def test_s3_client_is_shared(monkeypatch):
+    monkeypatch.setattr(s3, '_s3_client', None)
+
+    assert S3Service.get_s3_client() is S3Service.get_s3_client()
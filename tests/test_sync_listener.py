@@ -0,0 +1,34 @@
+import asyncio
+
+import pytest
+
+from app.db.client import asyncpg_dsn
+from app.tasks import sync_listener
+from app.tasks.sync_listener import SyncListener
+
+
+def test_asyncpg_dsn_drops_the_driver():
+    assert asyncpg_dsn('postgresql+asyncpg://u:p@db:5432/app') == 'postgresql://u:p@db:5432/app'
+    assert asyncpg_dsn('postgresql://u:p@db:5432/app') == 'postgresql://u:p@db:5432/app'
+
+
+@pytest.mark.asyncio
+async def test_notifications_are_coalesced(monkeypatch):
+    drained = []
+
+    async def drain_documents():
+        drained.append('documents')
+
+    monkeypatch.setattr(sync_listener, 'SYNC_LISTENER_DEBOUNCE_SECONDS', 0.01)
+    monkeypatch.setitem(sync_listener.DRAINS, 'documents', drain_documents)
+    listener = SyncListener('postgresql://unused')
+    task = asyncio.create_task(listener._drain_forever())
+    try:
+        for _ in range(5):
+            listener._on_notify(None, 1, 'sync_pending', 'documents')
+        listener._on_notify(None, 1, 'sync_pending', 'users')
+        await asyncio.sleep(0.05)
+    finally:
+        task.cancel()
+
+    assert drained == ['documents']
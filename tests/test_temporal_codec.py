@@ -0,0 +1,32 @@
+import pytest
+from temporalio.api.common.v1 import Payload
+
+from app.temporal.codec import CLAIM_CHECK_ENCODING, ClaimCheckCodec, LocalBlobStore
+
+
+@pytest.mark.asyncio
+async def test_small_payloads_stay_inline(tmp_path):
+    codec = ClaimCheckCodec(LocalBlobStore(tmp_path), threshold=1024)
+    payload = Payload(metadata={'encoding': b'json/plain'}, data=b'"short"')
+
+    assert await codec.encode([payload]) == [payload]
+    assert not any(tmp_path.iterdir())
+
+
+@pytest.mark.asyncio
+async def test_large_payloads_round_trip_through_the_blob_store(tmp_path):
+    codec = ClaimCheckCodec(LocalBlobStore(tmp_path), threshold=1024)
+    payload = Payload(metadata={'encoding': b'json/plain'}, data=b'"' + b'# page\n' * 10_000 + b'"')
+
+    encoded = await codec.encode([payload])
+
+    assert encoded[0].metadata['encoding'] == CLAIM_CHECK_ENCODING
+    assert encoded[0].metadata['compression'] == b'zstd'
+    assert encoded[0].ByteSize() < 200
+    blobs = list(tmp_path.iterdir())
+    assert len(blobs) == 1 and blobs[0].stat().st_size < payload.ByteSize() / 10
+    assert await codec.decode(encoded) == [payload]
+
+    # encoding the same payload again reuses the blob
+    await codec.encode([payload])
+    assert len(list(tmp_path.iterdir())) == 1
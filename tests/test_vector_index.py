@@ -0,0 +1,79 @@
+import pytest
+from llama_index.vector_stores.postgres.base import DBEmbeddingRow
+from pydantic import ValidationError
+
+from app.schemas.chatbot_settings import ChatbotSettings, RetrievalSettings, VectorIndexSettings
+from app.services.rag.vectorstore import _create_index_statement, _index_matches, reciprocal_rank_fusion
+
+
+def settings(dimensions: int, name: str = 'text-embedding-3-large', **vector_index) -> ChatbotSettings:
+    return ChatbotSettings.model_validate({
+        'embedding_model': {'provider': 'openai', 'name': name, 'dimensions': dimensions},
+        'vector_index': vector_index,
+    })
+
+
+def test_halfvec_only_when_needed_for_indexing():
+    assert not VectorIndexSettings(type='none').use_halfvec(3072)
+    assert not VectorIndexSettings(type='hnsw').use_halfvec(1536)
+    assert VectorIndexSettings(type='hnsw').use_halfvec(3072)
+    assert VectorIndexSettings(type='hnsw', halfvec=True).use_halfvec(1536)
+
+
+def test_index_dimension_limits():
+    assert settings(3072, type='hnsw').vector_index.use_halfvec(3072)
+    with pytest.raises(ValidationError):
+        settings(3072, type='hnsw', halfvec=False)
+    with pytest.raises(ValidationError):
+        settings(4096, name='custom-model', type='ivfflat')
+    # unindexed tables have no limit
+    settings(4096, name='custom-model', type='none')
+
+
+def test_search_parameters():
+    assert VectorIndexSettings(type='hnsw', ef_search=100).search_parameters() == {'hnsw.ef_search': 100}
+    assert VectorIndexSettings(type='ivfflat', probes=5).search_parameters() == {'ivfflat.probes': 5}
+    assert VectorIndexSettings(type='none').search_parameters() == {}
+
+
+def test_index_statement_matches_pg_indexes_definition():
+    vector_index = VectorIndexSettings(type='hnsw', m=24, ef_construction=100)
+    statement = _create_index_statement('"data_x"', '"data_x_embedding_idx"', vector_index, True)
+    assert 'USING hnsw (embedding halfvec_cosine_ops) WITH (m = 24, ef_construction = 100)' in statement
+
+    # as reported by pg_indexes.indexdef
+    indexdef = (
+        'CREATE INDEX "data_x_embedding_idx" ON public."data_x" '
+        "USING hnsw (embedding halfvec_cosine_ops) WITH (m='24', ef_construction='100')"
+    )
+    assert _index_matches(indexdef, vector_index, True)
+    assert not _index_matches(indexdef, vector_index.model_copy(update={'m': 16}), True)
+    assert not _index_matches(indexdef, VectorIndexSettings(type='ivfflat'), True)
+    assert _create_index_statement('"data_x"', '"data_x_embedding_idx"', VectorIndexSettings(), False) is None
+
+
+def row(node_id: str) -> DBEmbeddingRow:
+    return DBEmbeddingRow(node_id=node_id, text=node_id, metadata={}, similarity=0.0)
+
+
+def test_reciprocal_rank_fusion_favours_rows_found_by_both_searches():
+    dense = [row('a'), row('b'), row('c')]
+    sparse = [row('c'), row('d')]
+
+    fused = reciprocal_rank_fusion([dense, sparse], k=60)
+
+    # b and d tie, ties keep the order in which rows were first seen
+    assert [r.node_id for r in fused] == ['c', 'a', 'b', 'd']
+    assert fused[0].similarity == pytest.approx(1 / 63 + 1 / 61)
+
+
+def test_hybrid_retrieval_fetches_candidates_and_keeps_top_k():
+    kwargs = RetrievalSettings(mode='hybrid', top_k=3, candidates=20).retriever_kwargs()
+
+    assert kwargs == {
+        'vector_store_query_mode': 'hybrid',
+        'similarity_top_k': 20,
+        'sparse_top_k': 20,
+        'hybrid_top_k': 3,
+    }
+    assert RetrievalSettings(top_k=3).retriever_kwargs() == {'similarity_top_k': 3}